@@ -1,53 +1,48 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select, WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import time
 import datetime
 import os
+import artifact_store
+import deadline
+import rate_limit
+from checkpoint import CheckpointStore, clear_checkpoint
+from driver_pool import acquire_driver, release_driver
+from instrumentation import stage
+from waits import wait_for_network_idle
+from downloads import DownloadWatcher
+from network_capture import CAPTURE_EXPORTS, ExportCapture
 
 class FloridaElectionsDownloader:
-    def __init__(self, headless=False, download_dir=None):
+    def __init__(self, headless=False, download_dir=None, capture_exports=CAPTURE_EXPORTS):
         """
         Initialize the Florida Elections Downloader
         
         Args:
             headless (bool): Run browser in headless mode
             download_dir (str): Directory to save downloaded files
+            capture_exports (bool): Keep the candidate lists in memory (self.payloads)
+                                    instead of downloading them
         """
         self.driver = None
         self.wait = None
         self.headless = headless
         self.download_dir = download_dir or os.path.join(os.getcwd(), 'downloads')
+        self.capture_exports = capture_exports
+        self.capture = None
+        self.payloads = []
+        # Set when some election was not downloaded completely (it is in the checkpoint
+        # until then)
+        self.incomplete = False
         
         # Create download directory if it doesn't exist
         os.makedirs(self.download_dir, exist_ok=True)
         
     def setup_driver(self):
-        """Setup Chrome WebDriver with appropriate options"""
-        chrome_options = Options()
-        
-        if self.headless:
-            chrome_options.add_argument('--headless')
-            
-        # Set download preferences
-        prefs = {
-            "download.default_directory": self.download_dir,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
-        
-        # Additional options for stability
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
+        """Borrow a Chrome WebDriver from the shared pool, downloading to self.download_dir"""
+        self.driver = acquire_driver(download_dir=self.download_dir, headless=self.headless,
+                                     profile="throughput", site="florida")
         self.wait = WebDriverWait(self.driver, 10)
         
     def get_current_election_year(self):
@@ -116,7 +111,7 @@ class FloridaElectionsDownloader:
             # Select by value
             election_year_select.select_by_value(election_value)
             print(f"Selected election: {election_text}")
-            time.sleep(1)  # Small delay after selection
+            wait_for_network_idle(self.driver, "florida")
             
         except Exception as e:
             print(f"Error selecting election '{election_text}': {e}")
@@ -138,7 +133,7 @@ class FloridaElectionsDownloader:
             # Select the specified office type
             office_select.select_by_visible_text(office_type)
             print(f"  Selected office type: {office_type}")
-            time.sleep(1)  # Small delay after selection
+            wait_for_network_idle(self.driver, "florida")
             
         except Exception as e:
             print(f"  Error selecting office type '{office_type}': {e}")
@@ -152,11 +147,15 @@ class FloridaElectionsDownloader:
                 EC.element_to_be_clickable((By.NAME, "FormSubmit"))
             )
             
-            print("  Clicking Download Candidate List button...")
-            download_button.click()
+            if self.capture is not None:
+                # Submit the form from inside the page and keep the response in memory
+                print("  Requesting candidate list...")
+                self.capture.trigger_form(download_button)
+            else:
+                print("  Clicking Download Candidate List button...")
+                download_button.click()
             
-            # Wait a moment for download to start
-            time.sleep(3)
+            # The download finishes in the background, see download_for_all_current_year_elections
             print("  Download initiated")
             
         except Exception as e:
@@ -182,32 +181,55 @@ class FloridaElectionsDownloader:
             return
         
         download_count = 0
+        finished = []
+        unrecorded = []
+        
+        # (election, office type) pairs finished by an interrupted run are not downloaded again
+        checkpoint = CheckpointStore("florida", self.download_dir)
+        
+        # Downloads run in the background while we move on to the next office type
+        if self.capture_exports:
+            self.capture = ExportCapture(self.driver).start()
+        else:
+            watcher = DownloadWatcher(self.download_dir, extensions=(".txt",)).start()
         
         # Loop through each election
-        for election_value, election_text in current_year_elections:
+        for i, (election_value, election_text) in enumerate(current_year_elections):
+            if deadline.expired():
+                # Out of time: the elections finished so far are in the checkpoint
+                deadline.mark_incomplete("florida", done=i, total=len(current_year_elections))
+                self.incomplete = True
+                break
+            
             print(f"\n=== Processing Election: {election_text} ===")
             
+            remaining = checkpoint.remaining(office_types, key=lambda office: (election_value, office))
+            if not remaining:
+                print("   Already downloaded by a previous run")
+                continue
+            
+            started = []
             try:
                 # Select this election
                 self.select_election_by_value(election_value, election_text)
                 
                 # Download for each office type
-                for office_type in office_types:
+                for office_type in remaining:
                     try:
                         print(f"\n--- Downloading {office_type} for {election_text} ---")
                         
-                        # Select the office type
-                        self.select_office_type(office_type)
-                        
-                        # Click download button
-                        self.click_download_button()
+                        # Paced per host by the adaptive limiter instead of a fixed sleep
+                        with rate_limit.request(self.driver.current_url):
+                            # Select the office type
+                            self.select_office_type(office_type)
+                            
+                            # Click download button
+                            self.click_download_button()
                         
                         download_count += 1
+                        started.append(office_type)
                         
-                        # Wait between downloads to be respectful to the server
-                        # time.sleep(2)
-                        
-                        print(f"   Successfully downloaded {office_type}")
+                        print(f"   Started download of {office_type}")
                         
                     except Exception as e:
                         print(f"   Failed to download {office_type}: {e}")
@@ -215,10 +237,48 @@ class FloridaElectionsDownloader:
                 
             except Exception as e:
                 print(f"Failed to process election '{election_text}': {e}")
+            
+            # The office types of one election download together; the election is
+            # checkpointed once all of them have finished
+            timeout = 30 + 10 * len(started)
+            if self.capture is not None:
+                results = [body for _, body in self.capture.wait_for_bodies(len(started), timeout)]
+            else:
+                results = watcher.wait_for_downloads(len(started), timeout)
+            finished.extend(results)
+            if len(started) < len(remaining):
+                # The office types that didn't start are downloaded by the next run
+                self.incomplete = True
+            if len(results) < len(started):
+                # Can't tell which one is missing, so the whole election is retried by the next run
+                print(f"   Only {len(results)} of {len(started)} downloads finished for {election_text}")
+                self.incomplete = True
+                if self.capture is not None:
+                    unrecorded.extend(results)
                 continue
+            for office_type, result in zip(started, results):
+                if self.capture is not None:
+                    name = f"CandidateList({election_value}-{office_type.split()[0]}).txt"
+                    checkpoint.record((election_value, office_type), {"file": name}, payload=result)
+                else:
+                    checkpoint.record((election_value, office_type), {"file": os.path.basename(result)})
+        
+        if self.capture is not None:
+            self.capture.stop()
+            self.capture = None
+            # Include the lists captured by an interrupted run
+            self.payloads = []
+            for key in checkpoint.keys():
+                payload = checkpoint.payload(key)
+                if payload is not None:
+                    self.payloads.append((checkpoint.result(key)["file"], payload))
+            self.payloads.extend((f"CandidateList(partial-{i}).txt", body) for i, body in enumerate(unrecorded, 1))
+        else:
+            watcher.close()
         
         print(f"\n=== Summary ===")
-        print(f"Total downloads completed: {download_count}")
+        print(f"Total downloads started: {download_count}")
+        print(f"Total downloads completed: {len(finished)}")
         print(f"Elections processed: {len(current_year_elections)}")
         print(f"Office types per election: {len(office_types)}")
     
@@ -252,8 +312,9 @@ class FloridaElectionsDownloader:
             raise
         finally:
             if self.driver:
-                print("Closing browser...")
-                self.driver.quit()
+                print("Releasing browser...")
+                release_driver(self.driver)
+                self.driver = None
 
 def main():
     """Main function to run the scraper"""
@@ -279,64 +340,52 @@ def main():
         downloader.run(OFFICE_TYPES)
     except Exception as e:
         print(f"Script failed: {e}")
+        downloader.incomplete = True
+    
+    # Candidate lists captured in memory (empty when they were downloaded to disk),
+    # and whether some election still has to be downloaded
+    return downloader.payloads, downloader.incomplete
 import pandas as pd
 import os
+import io
 import glob
 from pathlib import Path
 
-def process_florida_candidate_files():
-    """
-    Dynamically processes all CandidateList.txt files and consolidates them into all_data_florida.csv
+# Bump when the way a candidate list is read changes
+PARSER_VERSION = 1
+
+def consolidate_candidate_lists(sources, current_dir):
     """
+    Combine tab-separated candidate lists and save them as all_data_florida.csv
     
-    # Get the current directory (where the script is running)
-    current_dir = Path.cwd()
-    
-    # Find all CandidateList files (both numbered and unnumbered)
-    candidate_files = []
-    
-    # Look for CandidateList.txt files with various patterns
-    patterns = [
-        "CandidateList.txt",
-        "CandidateList(*).txt",
-        "candidatelist*.txt"  # in case of different capitalization
-    ]
-    
-    for pattern in patterns:
-        files = glob.glob(str(current_dir / pattern), recursive=False)
-        candidate_files.extend(files)
-    
-    # Also check in florida_candidate_data subdirectory if it exists
-    florida_data_dir = current_dir / "florida_candidate_data"
-    if florida_data_dir.exists():
-        for pattern in patterns:
-            files = glob.glob(str(florida_data_dir / pattern), recursive=False)
-            candidate_files.extend(files)
-    
-    # Remove duplicates and sort
-    candidate_files = sorted(list(set(candidate_files)))
-    
-    print(f"Found {len(candidate_files)} candidate files:")
-    for file in candidate_files:
-        print(f"  - {os.path.basename(file)}")
-    
-    if not candidate_files:
-        print("No CandidateList.txt files found!")
-        return
+    Args:
+        sources (list): (name, path or file object) tuples to read
+        current_dir (Path): Directory to write all_data_florida.csv to
     
+    Returns:
+        DataFrame: The combined data, or None if nothing could be read
+    """
     # List to store all dataframes
     all_dataframes = []
     
     # Process each file
-    for file_path in candidate_files:
+    for name, source in sources:
         try:
-            print(f"\nProcessing: {os.path.basename(file_path)}")
+            print(f"\nProcessing: {name}")
             
-            # Read the tab-separated file
-            df = pd.read_csv(file_path, sep='\t', encoding='utf-8', low_memory=False)
+            # Keep the raw list (the files are deleted below) and read each content only once
+            with stage("florida", "parse"):
+                if isinstance(source, io.BytesIO):
+                    sha = artifact_store.keep(content=source.getvalue(), name=name)
+                else:
+                    sha = artifact_store.keep(source, name=name)
+                df = artifact_store.memoize(
+                    sha, "florida.candidate_list", PARSER_VERSION,
+                    lambda: pd.read_csv(source, sep='\t', encoding='utf-8', low_memory=False)
+                )
             
             # Add a source column to track which file the data came from
-            df['SourceFile'] = os.path.basename(file_path)
+            df['SourceFile'] = name
             
             print(f"  - Loaded {len(df)} records")
             print(f"  - Columns: {list(df.columns)}")
@@ -344,7 +393,7 @@ def process_florida_candidate_files():
             all_dataframes.append(df)
             
         except Exception as e:
-            print(f"  - Error processing {file_path}: {str(e)}")
+            print(f"  - Error processing {name}: {str(e)}")
             continue
     
     if not all_dataframes:
@@ -353,7 +402,8 @@ def process_florida_candidate_files():
     
     # Combine all dataframes
     print(f"\nCombining {len(all_dataframes)} dataframes...")
-    combined_df = pd.concat(all_dataframes, ignore_index=True, sort=False)
+    with stage("florida", "merge"):
+        combined_df = pd.concat(all_dataframes, ignore_index=True, sort=False)
     
     print(f"Total records after combining: {len(combined_df)}")
     
@@ -373,12 +423,70 @@ def process_florida_candidate_files():
     
     # Save to CSV
     output_file = current_dir / "all_data_florida.csv"
-    combined_df.to_csv(output_file, index=False, encoding='utf-8')
+    with stage("florida", "write"):
+        combined_df.to_csv(output_file, index=False, encoding='utf-8')
     
     print(f"\n Successfully saved consolidated data to: {output_file}")
     print(f"File size: {os.path.getsize(output_file) / (1024*1024):.2f} MB")
     
-    # Delete the processed txt files after successful consolidation
+    return combined_df
+
+def process_florida_candidate_files(payloads=None):
+    """
+    Dynamically processes all CandidateList.txt files and consolidates them into all_data_florida.csv
+    
+    Args:
+        payloads (list): Optional (name, bytes) candidate lists captured in memory.
+                         When given, they are used instead of the files on disk.
+    """
+    
+    # Get the current directory (where the script is running)
+    current_dir = Path.cwd()
+    
+    if payloads:
+        return consolidate_candidate_lists(
+            [(name, io.BytesIO(body)) for name, body in payloads], current_dir
+        )
+    
+    # Find all CandidateList files (both numbered and unnumbered)
+    candidate_files = []
+    
+    # Look for CandidateList.txt files with various patterns
+    patterns = [
+        "CandidateList.txt",
+        "CandidateList(*).txt",
+        "candidatelist*.txt"  # in case of different capitalization
+    ]
+    
+    for pattern in patterns:
+        files = glob.glob(str(current_dir / pattern), recursive=False)
+        candidate_files.extend(files)
+    
+    # Also check in florida_candidate_data subdirectory if it exists
+    florida_data_dir = current_dir / "florida_candidate_data"
+    if florida_data_dir.exists():
+        for pattern in patterns:
+            files = glob.glob(str(florida_data_dir / pattern), recursive=False)
+            candidate_files.extend(files)
+    
+    # Remove duplicates and sort
+    candidate_files = sorted(list(set(candidate_files)))
+    
+    print(f"Found {len(candidate_files)} candidate files:")
+    for file in candidate_files:
+        print(f"  - {os.path.basename(file)}")
+    
+    if not candidate_files:
+        print("No CandidateList.txt files found!")
+        return
+    
+    combined_df = consolidate_candidate_lists(
+        [(os.path.basename(file_path), file_path) for file_path in candidate_files], current_dir
+    )
+    if combined_df is None:
+        return
+    
+    # Delete the processed txt files after successful consolidation (the artifact store keeps a copy)
     print(f"\n Cleaning up processed files...")
     deleted_count = 0
     failed_deletions = []
@@ -444,14 +552,18 @@ def analyze_florida_data(df=None):
             print(f"  {status}: {count}")
 
 if __name__ == "__main__":
-    main()
+    payloads, incomplete = main()
     print(" Florida Candidate Data Processor")
     print("=" * 40)
     
     # Process all candidate files
-    consolidated_data = process_florida_candidate_files()
+    consolidated_data = process_florida_candidate_files(payloads)
     
     if consolidated_data is not None:
+        if not incomplete:
+            # Every election is in all_data_florida.csv, the next run starts fresh
+            clear_checkpoint("florida")
+        
         # Run analysis
         print("\n" + "=" * 40)
         analyze_florida_data(consolidated_data)
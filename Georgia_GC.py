@@ -1,49 +1,43 @@
-from selenium import webdriver #done
-from selenium.webdriver.common.by import By
+from selenium.webdriver.common.by import By #done
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 import time
 import pandas as pd
-import time
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 import re
 import os 
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import csv
+import deadline
+import rate_limit
+import work_queue
+from checkpoint import CheckpointStore
+from driver_pool import acquire_driver, release_driver
+from instrumentation import stage
+from waits import wait_for_element, wait_for_network_idle, wait_for_stable_count, wait_for_staleness
+
+CANDIDATE_LINK = (By.XPATH, "//a[contains(@href, 'exploreDetails')]")
+
+# Seconds one candidate detail page may take before it is given up for this run
+DETAIL_PAGE_BUDGET = 90
 
 def scrape_candidate_links():
     """
     Scrapes candidate profile links from Georgia Campaign Finance System
     Handles pagination to get all candidates across multiple pages
     """
-    # Set up Chrome options
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Remove this line to see the browser
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    
-    # Initialize the driver
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # Borrow a driver from the shared pool (pass headless=False to see the browser)
+    driver = acquire_driver(headless=True, profile="throughput", site="georgia")
     
     try:
         # Navigate to the website
         url = "https://efile.ethics.ga.gov/index.html#/explore/candidate"
         print(f"Opening URL: {url}")
-        driver.get(url)
+        with stage("georgia", "navigate"):
+            driver.get(url)
         
-        # Wait for the page to load
+        # Wait for the candidate table to be populated
         print("Waiting for page to load...")
-        time.sleep(30)
+        wait_for_stable_count(driver, CANDIDATE_LINK, "georgia", name="candidate_table")
         
         # Wait for the candidate table to be present
         wait = WebDriverWait(driver, 20)
@@ -55,11 +49,12 @@ def scrape_candidate_links():
         page_number = 1
         
         while True:
+            if deadline.expired():
+                deadline.mark_incomplete("georgia", "deadline reached while paging the candidate list",
+                                         done=page_number - 1)
+                break
             print(f"\n--- Processing Page {page_number} ---")
             
-            # Wait for the current page to load
-            time.sleep(3)
-            
             # Get candidates from current page
             page_candidate_data = []
             
@@ -68,7 +63,7 @@ def scrape_candidate_links():
                 wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "tbody[md-body], table")))
                 
                 # Find all links that contain exploreDetails in href on current page
-                candidate_links = driver.find_elements(By.XPATH, "//a[contains(@href, 'exploreDetails')]")
+                candidate_links = driver.find_elements(*CANDIDATE_LINK)
                 print(f"Found {len(candidate_links)} candidate profile links on page {page_number}")
                 
                 for link in candidate_links:
@@ -134,7 +129,7 @@ def scrape_candidate_links():
                                     
                                     # Scroll to button and click
                                     driver.execute_script("arguments[0].scrollIntoView(true);", next_button)
-                                    time.sleep(1)
+                                    first_links = driver.find_elements(*CANDIDATE_LINK)[:1]
                                     
                                     # Try clicking with JavaScript if regular click fails
                                     try:
@@ -145,7 +140,10 @@ def scrape_candidate_links():
                                     next_button_found = True
                                     page_number += 1
                                     print(f"Clicked Next button, moving to page {page_number}")
-                                    time.sleep(3)  # Wait for page to load
+                                    # Wait for the old rows to be replaced by the next page
+                                    if first_links:
+                                        wait_for_staleness(driver, first_links[0], "georgia", name="next_page")
+                                    wait_for_stable_count(driver, CANDIDATE_LINK, "georgia", name="candidate_table")
                                     break
                                     
                         if next_button_found:
@@ -210,7 +208,7 @@ def scrape_candidate_links():
         return []
         
     finally:
-        driver.quit()
+        release_driver(driver)
 
 def safe_extract_field(driver, field_name, xpath_selector, max_retries=3, wait_time=1):
     """
@@ -254,9 +252,108 @@ def safe_extract_field(driver, field_name, xpath_selector, max_retries=3, wait_t
     
     return "N/A"
 
-def scrape_candidate_data(input_csv='candidate_data.csv', output_csv='all_data_georgia.csv'):
+# The fields to extract from a detail page with their XPath selectors
+FIELD_SELECTORS = {
+    'Status': "//div[contains(text(), 'Status')]/following-sibling::div",
+    'Candidate Email': "//div[contains(text(), 'Candidate Email')]/following-sibling::div",
+    'Candidate Address': "//div[contains(text(), 'Candidate Address')]/following-sibling::div",
+    'Treasurer': "//div[contains(text(), 'Treasurer')]/following-sibling::div",
+    'Chairperson': "//div[contains(text(), 'Chairperson')]/following-sibling::div",
+    'Committee Name': "//div[contains(text(), 'Committee Name')]/following-sibling::div",
+    'Committee Email': "//div[contains(text(), 'Committee Email')]/following-sibling::div",
+    'Election(s)': "//div[contains(text(), 'Election(s)')]/following-sibling::div",
+    'Date Registered': "//div[contains(text(), 'Date Registered')]/following-sibling::div"
+}
+
+# A detail page has rendered once any of the field labels is there; pages that
+# lack some field (or error pages) must not wait the full Georgia timeout for it
+DETAIL_READY = "//div[" + " or ".join(f"contains(text(), '{field}')" for field in FIELD_SELECTORS) + "]"
+
+# Seconds the labels may take to appear after the page's requests have finished
+DETAIL_FIELDS_TIMEOUT = 5
+
+def scrape_detail_page(driver, url, name, office):
+    """
+    Scrape one candidate's detail page
+
+    Returns:
+        dict: The candidate's record, or None if the page took longer than DETAIL_PAGE_BUDGET
+    """
+    print(f"Scraping {name} - {url}")
+    
+    with deadline.unit(DETAIL_PAGE_BUDGET) as budget:
+        # Paced by the adaptive limiter; a page that doesn't render counts as a failure
+        with rate_limit.request(url) as req:
+            with stage("georgia", "navigate"):
+                driver.get(url)
+            # The page is loaded when its requests are done, then the fields get a short grace period
+            wait_for_network_idle(driver, "georgia")
+            if wait_for_element(driver, (By.XPATH, DETAIL_READY), "georgia",
+                                timeout=DETAIL_FIELDS_TIMEOUT, name="detail_page") is None:
+                req.error = True
+        
+        # Initialize data dictionary with basic info
+        data = {
+            'Name': name,
+            'Office': office
+        }
+        
+        # Extract each field safely
+        print(f"  Extracting data for {name}...")
+        with stage("georgia", "extract"):
+            for field_name, xpath_selector in FIELD_SELECTORS.items():
+                field_value = safe_extract_field(driver, field_name, xpath_selector)
+                data[field_name] = field_value
+    
+    if budget.expired():
+        print(f"  Gave up on {name} after {DETAIL_PAGE_BUDGET}s")
+        return None
+    
+    print(f"  Successfully extracted data for {name}")
+    print(f"  Data: {data}")
+    return data
+
+def scrape_details_distributed(queue, df, existing_names, driver):
+    """
+    Scrape the detail pages together with the other nodes sharing the work queue
+
+    Every node adds all candidates to the job and scrapes the ones it leases;
+    the results of all nodes are returned, so each node writes the full file.
+
+    Returns:
+        tuple: (records of every node, candidates that failed for good, True if stopped by the deadline)
+    """
+    job = work_queue.job_name("georgia-details")
+    units = [(row['href'], {"url": row['href'], "name": row['name'], "office": row['office']})
+             for _, row in df.iterrows() if row['name'].strip().lower() not in existing_names]
+    added = queue.put_many(job, units)
+    print(f"Work queue job {job}: {added} new candidates, {len(units) - added} already queued")
+    
+    def handle(unit):
+        data = scrape_detail_page(driver, unit['url'], unit['name'], unit['office'])
+        if data is None:
+            raise RuntimeError(f"gave up after {DETAIL_PAGE_BUDGET}s")
+        return data
+    
+    counts = work_queue.drain(queue, job, handle, stop=deadline.expired)
+    stats = queue.stats(job)
+    print(f"This node scraped {counts['done']} candidates; job status: {stats}")
+    
+    incomplete = deadline.expired() and bool(stats['pending'] or stats['leased'])
+    if incomplete:
+        deadline.mark_incomplete("georgia", done=stats['done'], total=sum(stats.values()))
+    
+    records = [record for record in queue.results(job).values()
+               if record['Name'].strip().lower() not in existing_names]
+    return records, stats['failed'], incomplete
+
+def scrape_candidate_data(input_csv='candidate_data.csv', output_csv='all_data_georgia.csv', checkpoint=None):
     """
     Scrape candidate data from individual candidate pages with improved error handling
+
+    Args:
+        checkpoint (CheckpointStore): The store main() opened (a second store would
+                                      discard it again on a fresh run)
     """
     # Read input CSV
     df = pd.read_csv(input_csv)
@@ -277,63 +374,57 @@ def scrape_candidate_data(input_csv='candidate_data.csv', output_csv='all_data_g
             existing_data = []
             existing_names = set()
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    # Candidates finished by an interrupted run are taken from the checkpoint
+    if checkpoint is None:
+        checkpoint = CheckpointStore("georgia")
+    new_data = checkpoint.results("detail")
+    existing_names.update(record['Name'].strip().lower() for record in new_data)
+    if new_data:
+        print(f"Restored {len(new_data)} candidates from the checkpoint")
+
+    driver = acquire_driver(headless=True, profile="throughput", site="georgia")
     
-    new_data = []
     skipped_count = 0
     failed_count = 0
+    incomplete = False
 
-    # Define the fields to extract with their XPath selectors
-    field_selectors = {
-        'Status': "//div[contains(text(), 'Status')]/following-sibling::div",
-        'Candidate Email': "//div[contains(text(), 'Candidate Email')]/following-sibling::div",
-        'Candidate Address': "//div[contains(text(), 'Candidate Address')]/following-sibling::div",
-        'Treasurer': "//div[contains(text(), 'Treasurer')]/following-sibling::div",
-        'Chairperson': "//div[contains(text(), 'Chairperson')]/following-sibling::div",
-        'Committee Name': "//div[contains(text(), 'Committee Name')]/following-sibling::div",
-        'Committee Email': "//div[contains(text(), 'Committee Email')]/following-sibling::div",
-        'Election(s)': "//div[contains(text(), 'Election(s)')]/following-sibling::div",
-        'Date Registered': "//div[contains(text(), 'Date Registered')]/following-sibling::div"
-    }
-
-    for index, row in df.iterrows():
+    rows = df.iterrows()
+    queue = work_queue.from_env()
+    if queue is not None:
+        # Several nodes share the detail pages through the work queue instead of the loop below
+        distributed_data, failed_count, incomplete = scrape_details_distributed(queue, df, existing_names, driver)
+        new_data.extend(distributed_data)
+        rows = []
+    
+    for index, row in rows:
         url = row['href']
         name = row['name']
         office = row['office']
         
+        if ("detail", url) in checkpoint:
+            continue
+        
+        if deadline.expired():
+            # Out of time: save what we have, the checkpoint lets the next run continue
+            deadline.mark_incomplete("georgia", done=index, total=len(df))
+            incomplete = True
+            break
+        
         # Check if candidate already exists (case-insensitive comparison)
         if name.strip().lower() in existing_names:
             print(f"Skipping {name} - already exists in output file")
             skipped_count += 1
             continue
-            
-        print(f"Scraping {name} - {url}")
         
         try:
-            driver.get(url)
-            time.sleep(3)
-            
-            # Initialize data dictionary with basic info
-            data = {
-                'Name': name,
-                'Office': office
-            }
+            data = scrape_detail_page(driver, url, name, office)
+            if data is None:
+                # Not recorded in the checkpoint, so the next run tries this page again
+                failed_count += 1
+                continue
             
-            # Extract each field safely
-            print(f"  Extracting data for {name}...")
-            for field_name, xpath_selector in field_selectors.items():
-                field_value = safe_extract_field(driver, field_name, xpath_selector)
-                data[field_name] = field_value
-            
-            print(f"  Successfully extracted data for {name}")
-            print(f"  Data: {data}")
             new_data.append(data)
+            checkpoint.record(("detail", url), data)
             
             # Add to existing names set to avoid duplicates within the same run
             existing_names.add(name.strip().lower())
@@ -342,10 +433,8 @@ def scrape_candidate_data(input_csv='candidate_data.csv', output_csv='all_data_g
             print(f"  Critical error processing {name}: {e}")
             failed_count += 1
             continue
-            
-        time.sleep(1)  # Rate limiting
 
-    driver.quit()
+    release_driver(driver)
 
     # Combine existing data with new data
     all_data = existing_data + new_data
@@ -359,11 +448,16 @@ def scrape_candidate_data(input_csv='candidate_data.csv', output_csv='all_data_g
         
         fieldnames = list(all_fieldnames)
         
-        with open(output_csv, 'w', newline='', encoding='utf-8') as output_file:
+        with stage("georgia", "write"), open(output_csv, 'w', newline='', encoding='utf-8') as output_file:
             writer = csv.DictWriter(output_file, fieldnames=fieldnames)
             writer.writeheader()
             writer.writerows(all_data)
 
+    # Every candidate has been handled, the next run starts from scratch
+    # (a run stopped by its deadline keeps the checkpoint and resumes)
+    if not incomplete:
+        checkpoint.finish()
+
     # Delete the input CSV file after successful scraping
     try:
         os.remove(input_csv)
@@ -384,7 +478,16 @@ def main():
     print("Georgia Campaign Finance System - Candidate Link Scraper")
     print("=" * 60)
     
-    links = scrape_candidate_links()
+    # Reuse the link list of an interrupted run instead of paging through the table again
+    checkpoint = CheckpointStore("georgia")
+    if "links" in checkpoint:
+        links = checkpoint.result("links")
+        print(f"Using {len(links)} candidate links from the checkpoint")
+    else:
+        links = scrape_candidate_links()
+        # A list cut short by the deadline is paged through again next time
+        if links and not deadline.expired():
+            checkpoint.record("links", links)
     
     if links:
         import csv
@@ -409,8 +512,8 @@ def main():
         print("Links only saved to 'candidate_links.txt'")
     else:
         print("\nNo candidate links found. Check the debug output above.")
+    return checkpoint
         
 if __name__ == "__main__":
-    main()
-    time.sleep(2)
-    scrape_candidate_data()
\ No newline at end of file
+    checkpoint = main()
+    scrape_candidate_data(checkpoint=checkpoint)
\ No newline at end of file
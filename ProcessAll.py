@@ -0,0 +1,323 @@
+import argparse
+import contextlib
+import json
+import os
+import runpy
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import deadline
+from checkpoint import has_checkpoint
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Each scraper runs in its own working directory so that the download
+# watchers (which look for "new" CSV files in the cwd) never pick up files
+# produced by another scraper running at the same time.
+WORK_ROOT = os.path.join(BASE_DIR, "runs")
+
+# name -> script, files it produces, and the tasks it depends on
+TASKS = {
+    "florida": {"script": "Florida_div.py", "outputs": ["all_data_florida.csv"], "browser": True, "after": []},
+    "georgia": {"script": "Georgia_GC.py", "outputs": ["all_data_georgia.csv"], "browser": True, "after": []},
+    "louisiana": {"script": "votersportalSos.py", "outputs": ["all_data_louisiana.csv"], "browser": True, "after": []},
+    "putman": {"script": "putmanCounty.py", "outputs": ["all_data_Putman.csv"], "browser": True, "after": []},
+    "shawnee": {"script": "ShawneeCounty.py", "outputs": ["all_data_shawnee.csv"], "browser": True, "after": []},
+    "southcarolina": {"script": "SouthCarolina.py", "outputs": ["all_data_SouthCarolina.csv"], "browser": True, "after": []},
+    "texas": {"script": "Texas_Elections.py", "outputs": ["all_data_texas.csv"], "browser": True, "after": []},
+    "virginia": {"script": "Virginia_el.py", "outputs": ["all_data_virginia.csv"], "browser": True, "after": []},
+}
+SCRAPERS = list(TASKS)
+
+# Seconds a scraper may run before it stops with partial results (see deadline.py).
+# --budget SECONDS overrides them all (SCRAPER_BUDGET_SECONDS, 0 = no limit).
+DEFAULT_BUDGET = 1800
+TASK_BUDGETS = {"georgia": 3600, "southcarolina": 3600, "florida": 2700}
+
+TASKS["integrate"] = {"script": "DATA_INTEGRATION.py", "outputs": [], "browser": False, "after": SCRAPERS}
+
+
+def use_cassettes(mode, root):
+    """
+    Record or replay every scraper's HTTP traffic, one cassette per scraper in root/<name>
+
+    Checkpoints and the HTTP cache would hide requests from the cassette, so
+    these runs always start from scratch.
+    """
+    os.environ["SCRAPER_CASSETTE_MODE"] = mode
+    os.environ["SCRAPER_CASSETTE_ROOT"] = os.path.abspath(root)
+    os.environ["SCRAPER_FRESH_RUN"] = "1"
+
+
+def task_budget(name):
+    """Return the time budget of a scraper in seconds (None: unlimited)"""
+    override = os.environ.get("SCRAPER_BUDGET_SECONDS")
+    if override is not None:
+        return float(override) or None
+    return TASK_BUDGETS.get(name, DEFAULT_BUDGET)
+
+
+def write_source_status(statuses, directory=BASE_DIR):
+    """
+    Record which sources finished in source_status.json (read by DATA_INTEGRATION.py)
+
+    Args:
+        statuses (dict): name -> incomplete.json contents, or None for a finished scraper
+    """
+    path = os.path.join(directory, deadline.STATUS_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            sources = json.load(f).get("sources", {})
+    except (OSError, ValueError):
+        sources = {}
+    for name, marker in statuses.items():
+        sources[name] = {"complete": True} if marker is None else {"complete": False, **marker}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "sources": sources}, f, indent=2)
+
+
+def run_task(name):
+    """
+    Run one task's script in a worker process
+
+    Returns:
+        tuple: (name, ok, seconds, incomplete.json contents if the scraper ran out of time)
+    """
+    task = TASKS[name]
+    script = os.path.join(BASE_DIR, task["script"])
+
+    # Scrapers get a private working dir seeded with their previous output
+    # (Georgia, Texas and South Carolina append to it); integration runs in
+    # the main directory where the per-state files are collected.  A run that
+    # resumes from a checkpoint keeps the partial output it already wrote.
+    if task["browser"]:
+        workdir = os.path.join(WORK_ROOT, name)
+        os.makedirs(workdir, exist_ok=True)
+        resuming = has_checkpoint(name, workdir) and os.environ.get("SCRAPER_FRESH_RUN") != "1"
+        for output in [] if resuming else task["outputs"]:
+            src = os.path.join(BASE_DIR, output)
+            if os.path.exists(src):
+                shutil.copy2(src, os.path.join(workdir, output))
+    else:
+        workdir = BASE_DIR
+
+    # The deadline is a timestamp, so it is set right before the script starts (see deadline.py)
+    budget = task_budget(name) if task["browser"] else None
+    if task["browser"]:
+        deadline.clear_marker(workdir)
+
+    # Worker processes are reused, so the cassette is chosen per task (see cassette.py)
+    cassette_root = os.environ.get("SCRAPER_CASSETTE_ROOT")
+    if cassette_root and task["browser"]:
+        os.environ["SCRAPER_CASSETTE"] = os.path.join(cassette_root, name)
+    else:
+        os.environ.pop("SCRAPER_CASSETTE", None)
+
+    # Reports of this run go next to the scraper's files (stale ones are removed first)
+    report_dir = os.path.join(WORK_ROOT, name)
+    os.makedirs(report_dir, exist_ok=True)
+    for report in ("wait_times.json", "stage_times.json", "memory_profile.json"):
+        if os.path.exists(os.path.join(report_dir, report)):
+            os.remove(os.path.join(report_dir, report))
+
+    log_dir = os.path.join(WORK_ROOT, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, f"{name}.log")
+
+    ok = True
+    start = time.time()
+    if budget:
+        os.environ[deadline.DEADLINE_ENV] = str(start + budget)
+    else:
+        os.environ.pop(deadline.DEADLINE_ENV, None)
+    old_cwd = os.getcwd()
+    os.chdir(workdir)
+    sys.path.insert(0, BASE_DIR)
+    try:
+        with open(log_path, "w", encoding="utf-8") as log, \
+                contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            try:
+                runpy.run_path(script, run_name="__main__")
+            except SystemExit as e:
+                ok = e.code in (None, 0)
+            except Exception as e:
+                print(f"{name} failed: {e}")
+                ok = False
+    finally:
+        sys.path.remove(BASE_DIR)
+        os.chdir(old_cwd)
+        os.environ.pop(deadline.DEADLINE_ENV, None)
+    elapsed = time.time() - start
+    incomplete = deadline.read_marker(workdir) if task["browser"] else None
+
+    # Keep the wait and stage statistics of each scraper separate (the worker process is reused)
+    waits = sys.modules.get("waits")
+    if waits is not None:
+        waits.write_report(os.path.join(report_dir, "wait_times.json"))
+        waits.stats.reset()
+    instrumentation = sys.modules.get("instrumentation")
+    if instrumentation is not None:
+        instrumentation.write_report(os.path.join(report_dir, "stage_times.json"), job=name)
+        instrumentation.write_prometheus(
+            os.path.join(instrumentation.METRICS_DIR or report_dir, f"scraper_stages_{name}.prom"), job=name
+        )
+        instrumentation.stats.reset()
+    memory_profile = sys.modules.get("memory_profile")
+    if memory_profile is not None:
+        memory_profile.profiler.write_report(os.path.join(report_dir, "memory_profile.json"), job=name)
+        memory_profile.profiler.reset()
+
+    # Quit the pooled browsers now: pool workers never run atexit handlers, so
+    # driver_pool's own cleanup would leave Chrome and chromedriver running
+    driver_pool = sys.modules.get("driver_pool")
+    if driver_pool is not None:
+        driver_pool.close_all_pools()
+
+    # Copy the finished outputs back so DATA_INTEGRATION.py can find them
+    for output in task["outputs"]:
+        produced = os.path.join(workdir, output)
+        if task["browser"] and os.path.exists(produced):
+            shutil.copy2(produced, os.path.join(BASE_DIR, output))
+        elif task["browser"]:
+            ok = False
+
+    return name, ok, elapsed, incomplete
+
+
+def run_all(only=None, max_browsers=3, integrate=True):
+    """
+    Run the scrapers concurrently and DATA_INTEGRATION.py once they are done
+
+    Args:
+        only (list): Scraper names to run (default: all of them)
+        max_browsers (int): Maximum number of scrapers (Chrome instances) alive at once
+        integrate (bool): Run DATA_INTEGRATION.py after the scrapers finish
+    """
+    selected = list(only or SCRAPERS)
+    if integrate:
+        selected.append("integrate")
+
+    pending = {name: set(TASKS[name]["after"]) & set(selected) for name in selected}
+    results = {}
+    incomplete = {}
+    running = {}
+    run_start = time.time()
+
+    with ProcessPoolExecutor(max_workers=max(1, max_browsers)) as pool:
+        while pending or running:
+            # Submit every task whose dependencies have all finished
+            for name in [n for n, deps in pending.items() if not deps]:
+                del pending[name]
+                print(f"Queued {name}")
+                running[pool.submit(run_task, name)] = name
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    _, ok, elapsed, marker = future.result()
+                except Exception as e:
+                    print(f"{name} crashed: {e}")
+                    ok, elapsed, marker = False, 0.0, None
+                results[name] = (ok, elapsed)
+                if marker is not None:
+                    incomplete[name] = marker
+                if TASKS[name]["browser"]:
+                    # Written before the integration task is queued
+                    write_source_status({name: marker})
+                status = "FAILED" if not ok else "partial" if marker else "ok"
+                print(f"Finished {name} in {elapsed:.1f}s ({status})")
+                for deps in pending.values():
+                    deps.discard(name)
+
+    total = time.time() - run_start
+    print("\n=== Run Summary ===")
+    print(f"{'Task':<15} {'Status':<8} {'Wall time':>10}")
+    print("-" * 35)
+    for name in selected:
+        ok, elapsed = results.get(name, (False, 0.0))
+        status = "FAILED" if not ok else "partial" if name in incomplete else "ok"
+        print(f"{name:<15} {status:<8} {elapsed:>9.1f}s")
+    print("-" * 35)
+    print(f"Total wall time: {total:.1f}s")
+    if incomplete:
+        print(f"Stopped at their deadline (partial data, resumed next run): {', '.join(sorted(incomplete))}")
+    print(f"Logs saved to: {os.path.join(WORK_ROOT, 'logs')}")
+    write_run_report(selected, results, total, incomplete)
+    return results
+
+
+def write_run_report(selected, results, total, incomplete=None):
+    """Combine the per-task stage reports into runs/stage_times.json"""
+    tasks = []
+    for name in selected:
+        ok, elapsed = results.get(name, (False, 0.0))
+        stages = []
+        stage_report = os.path.join(WORK_ROOT, name, "stage_times.json")
+        if os.path.exists(stage_report):
+            with open(stage_report, encoding="utf-8") as f:
+                stages = json.load(f)["stages"]
+        tasks.append({"task": name, "ok": ok, "complete": name not in (incomplete or {}),
+                      "wall_seconds": round(elapsed, 3), "stages": stages})
+
+    os.makedirs(WORK_ROOT, exist_ok=True)
+    path = os.path.join(WORK_ROOT, "stage_times.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "wall_seconds": round(total, 3),
+            "tasks": tasks,
+        }, f, indent=2)
+    print(f"Stage timings saved to: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run all state scrapers, then DATA_INTEGRATION.py")
+    parser.add_argument("--max-browsers", type=int, default=3,
+                        help="Maximum number of Chrome instances running at the same time")
+    parser.add_argument("--only", nargs="+", choices=SCRAPERS,
+                        help="Run only these scrapers")
+    parser.add_argument("--no-integrate", action="store_true",
+                        help="Skip DATA_INTEGRATION.py at the end")
+    parser.add_argument("--capture-exports", action="store_true",
+                        help="Read export files from the browser's network traffic instead of the download directory")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore the checkpoints of interrupted runs and start every scraper from scratch")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Record peak RSS (including Chrome) and top allocation sites per stage")
+    parser.add_argument("--budget", type=float, metavar="SECONDS",
+                        help="Time budget of every scraper (default: TASK_BUDGETS, 0 = no limit)")
+    cassettes = parser.add_mutually_exclusive_group()
+    cassettes.add_argument("--record", metavar="DIR",
+                           help="Record every scraper's HTTP traffic into DIR/<scraper>")
+    cassettes.add_argument("--replay", metavar="DIR",
+                           help="Serve every scraper from the cassettes in DIR instead of the network")
+    args = parser.parse_args()
+
+    if args.capture_exports:
+        # Read by network_capture.py in the worker processes
+        os.environ["SCRAPER_CAPTURE_EXPORTS"] = "1"
+    if args.fresh:
+        # Read by checkpoint.py in the worker processes
+        os.environ["SCRAPER_FRESH_RUN"] = "1"
+    if args.profile_memory:
+        # Read by memory_profile.py in the worker processes
+        os.environ["SCRAPER_PROFILE_MEMORY"] = "1"
+    if args.budget is not None:
+        # Read by run_task in the worker processes
+        os.environ["SCRAPER_BUDGET_SECONDS"] = str(args.budget)
+    if args.record or args.replay:
+        use_cassettes("record" if args.record else "replay", args.record or args.replay)
+
+    results = run_all(args.only, args.max_browsers, not args.no_integrate)
+    if not all(ok for ok, _ in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,40 @@
+import io
 import requests
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import time
 from datetime import datetime, timedelta
 import logging
 import json
 import os
 import pandas as pd
-import glob
+import deadline
+import rate_limit
+from checkpoint import CheckpointStore
+from driver_pool import acquire_driver, release_driver
+from instrumentation import stage
+from waits import wait_for_network_idle
+from downloads import DownloadWatcher
+from network_capture import CAPTURE_EXPORTS, ExportCapture
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Seconds one election date (search plus export) may take before it is left for the next run
+DATE_BUDGET = 120
+
 class SCElectionScraper:
-    def __init__(self, headless=True, delay=2, download_dir=None):        
+    def __init__(self, headless=True, delay=2, download_dir=None, capture_exports=CAPTURE_EXPORTS):        
        
         self.url = "https://vrems.scvotes.sc.gov/Candidate/SearchElectionDate"
         self.delay = delay
+        # The delay is the starting pace; the limiter speeds up or backs off from there
+        if delay:
+            rate_limit.configure(self.url, rate=1.0 / delay)
+        # Read export CSVs from the DevTools Network domain instead of the download directory
+        self.capture_exports = capture_exports
         self.results = []
         
         # Set up download directory
@@ -34,29 +47,12 @@ class SCElectionScraper:
         # Master CSV file path
         self.master_csv = os.path.join(self.download_dir, "all_data_SouthCarolina.csv")
         
-        # Set up Chrome options
-        chrome_options = Options()
-        if headless:
-            chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        
-        # Configure download preferences
-        chrome_prefs = {
-            "download.default_directory": self.download_dir,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True
-        }
-        chrome_options.add_experimental_option("prefs", chrome_prefs)
-        
-        # Initialize the driver
+        # Borrow a driver from the shared pool
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
+            self.driver = acquire_driver(download_dir=self.download_dir, headless=headless,
+                                         profile="throughput", site="southcarolina")
             self.wait = WebDriverWait(self.driver, 10)
-            logger.info("Chrome WebDriver initialized successfully")
+            logger.info("Chrome WebDriver acquired successfully")
             logger.info(f"Downloads will be saved to: {self.download_dir}")
         except Exception as e:
             logger.error(f"Failed to initialize WebDriver: {e}")
@@ -85,56 +81,55 @@ class SCElectionScraper:
     def format_date_for_input(self, date_obj):
         return date_obj.strftime("%m/%d/%Y")
     
-    def wait_for_download(self, timeout=30):
+    def download_watcher(self):
+        """Return a watcher for CSV downloads, ignoring the master CSV file"""
+        return DownloadWatcher(
+            self.download_dir,
+            extensions=(".csv",),
+            exclude=(os.path.basename(self.master_csv),)
+        )
+    
+    def wait_for_download(self, watcher, timeout=30):
         """Wait for download to complete and return the downloaded file path"""
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout:
-            # Look for .csv files in download directory
-            csv_files = glob.glob(os.path.join(self.download_dir, "*.csv"))
-            
-            # Filter out the master CSV file
-            new_csv_files = [f for f in csv_files if not f.endswith("all_data_SouthCarolina.csv")]
-            
-            # Check if any new CSV files exist and are not being downloaded (.crdownload)
-            for csv_file in new_csv_files:
-                if not csv_file.endswith('.crdownload') and os.path.exists(csv_file):
-                    # Wait a bit more to ensure download is complete
-                    time.sleep(2)
-                    return csv_file
-            
-            time.sleep(1)
-        
-        return None
+        return watcher.wait_for_download(timeout)
     
     def append_csv_to_master(self, downloaded_csv_path,date):
-        """Append the downloaded CSV to the master CSV file"""
+        """Append the downloaded CSV (a file path or the captured bytes) to the master CSV file and return its row count"""
         
         try:
+            captured = isinstance(downloaded_csv_path, bytes)
+            with stage("southcarolina", "parse"):
+                if captured:
+                    new_data = pd.read_csv(io.BytesIO(downloaded_csv_path))
+                    logger.info(f"Read {len(new_data)} rows from captured export for {date}")
+                else:
+                    new_data = pd.read_csv(downloaded_csv_path)
+                    logger.info(f"Read {len(new_data)} rows from {downloaded_csv_path}")
             
-            new_data = pd.read_csv(downloaded_csv_path)
-            logger.info(f"Read {len(new_data)} rows from {downloaded_csv_path}")
-            
-            # Check if master CSV exists
-            if os.path.exists(self.master_csv):
-                # Read existing master CSV
-                existing_data = pd.read_csv(self.master_csv)
-                logger.info(f"Existing master CSV has {len(existing_data)} rows")
-                print("error here ")
-                # Append new data
-                combined_data = pd.concat([existing_data, new_data], ignore_index=True)
-            else:
-                # Create new master CSV
-                combined_data = new_data
-                logger.info("Creating new master CSV file")
-            
-            # Save combined data
-            combined_data.to_csv(self.master_csv, index=False)
+            with stage("southcarolina", "write"):
+                # Check if master CSV exists
+                if os.path.exists(self.master_csv):
+                    # Read existing master CSV
+                    existing_data = pd.read_csv(self.master_csv)
+                    logger.info(f"Existing master CSV has {len(existing_data)} rows")
+                    print("error here ")
+                    # Append new data
+                    combined_data = pd.concat([existing_data, new_data], ignore_index=True)
+                else:
+                    # Create new master CSV
+                    combined_data = new_data
+                    logger.info("Creating new master CSV file")
+                
+                # Save combined data
+                combined_data.to_csv(self.master_csv, index=False)
             logger.info(f"Master CSV updated with {len(combined_data)} total rows")
             
             # Delete the downloaded CSV file
-            os.remove(downloaded_csv_path)
-            logger.info(f"Deleted temporary file: {downloaded_csv_path}")
+            if not captured:
+                os.remove(downloaded_csv_path)
+                logger.info(f"Deleted temporary file: {downloaded_csv_path}")
+            
+            return len(new_data)
             
         except Exception as e:
             logger.error(f"Error processing CSV files: {e}")
@@ -156,46 +151,67 @@ class SCElectionScraper:
             print(f"Error deleting file: {e}")
     
     def search_election_date(self, date_str):
-       
+        """
+        Search one election date and append its export to the master CSV
+
+        Returns:
+            int: Rows added (0 when there is no election that day), None if the search failed
+        """
         try:
             logger.info(f"Searching for elections on: {date_str}")
 
-            self.driver.get(self.url)
-            
-            # Wait for the page to load and find the date input
-            date_input = self.wait.until(
-                EC.presence_of_element_located((By.ID, "ElectionDate"))
-            )
-            
-            # Clear any existing date and enter new date
-            date_input.clear()
-            date_input.send_keys(date_str)
-            curr = self.driver.current_url
-            # Find and click the "View Details" button
-            view_details_btn = self.wait.until(
-                EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'View Details')]"))
-            )
-            view_details_btn.click()     
+            with stage("southcarolina", "navigate"):
+                # Only the page load holds the host's slot: the search and export that
+                # follow take far longer than a response and would read as a slow host
+                with rate_limit.request(self.url):
+                    self.driver.get(self.url)
+                    
+                    # Wait for the page to load and find the date input
+                    date_input = self.wait.until(
+                        EC.presence_of_element_located((By.ID, "ElectionDate"))
+                    )
+                
+                # Clear any existing date and enter new date
+                date_input.clear()
+                date_input.send_keys(date_str)
+                curr = self.driver.current_url
+                # Find and click the "View Details" button
+                view_details_btn = self.wait.until(
+                    EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'View Details')]"))
+                )
+                view_details_btn.click()     
             print("View details clicked") 
             if self.driver.current_url != curr:
-                self.robust_click_search_export()
-                time.sleep(2)
-                print("The current path is ",os.getcwd())
-                print("date str is ",date_str)
-                date_s = f"{date_str[6:]}-{date_str[0:2]}-{date_str[3:5]}"
-                print(date_s)
-                downloaded_file = os.path.join(os.getcwd(), f"Candidate Data File for elections on {date_s}.csv")
-                print(downloaded_file)
-                self.append_csv_to_master(downloaded_file,date_str)
-
-                    
+                if self.capture_exports:
+                    with stage("southcarolina", "extract"):
+                        payload = self.capture_export()
+                    if payload is not None:
+                        return self.append_csv_to_master(payload, date_str)
+                    logger.warning(f"Export for {date_str} was not captured, downloading it instead")
                 
-                  
+                with stage("southcarolina", "extract"), self.download_watcher() as watcher:
+                    self.robust_click_search_export()
+                    downloaded_file = self.wait_for_download(watcher)
+                if downloaded_file is None:
+                    logger.error(f"Export for {date_str} did not finish downloading")
+                    return None
+                print(downloaded_file)
+                return self.append_csv_to_master(downloaded_file,date_str)
+            
+            return 0
             
         except TimeoutException:
             logger.error(f"Timeout while searching for date: {date_str}")
+            return None
             
-    def robust_click_search_export(self):
+    def capture_export(self, timeout=30):
+        """Run the search and read the export CSV from the Network domain without downloading it"""
+        export_button = self.robust_click_search_export(click_export=False)
+        with ExportCapture(self.driver) as capture:
+            capture.trigger_fetch(export_button.get_attribute("href"))
+            return capture.wait_for_body(timeout)
+    
+    def robust_click_search_export(self, click_export=True):
         # Wait for page to load
         wait = WebDriverWait(self.driver, 10)
         
@@ -207,7 +223,6 @@ class SCElectionScraper:
         
         # Scroll the button into view
         self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", search_button)
-        time.sleep(1)
         
         # Try clicking the button, if intercepted use JavaScript click
         try:
@@ -217,8 +232,8 @@ class SCElectionScraper:
             print("Regular click failed, trying JavaScript click...")
             self.driver.execute_script("arguments[0].click();", search_button)
         
-        # Wait a moment for search results to load
-        time.sleep(3)
+        # Wait for search results to load
+        wait_for_network_idle(self.driver, "southcarolina")
         
         # Wait for and click the Export button
         print("Looking for Export button...")
@@ -226,9 +241,11 @@ class SCElectionScraper:
             EC.presence_of_element_located((By.XPATH, "//a[contains(@href, '/Candidate/ExportSearchDateResults')]"))
         )
         
+        if not click_export:
+            return export_button
+        
         # Scroll the export button into view
         self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", export_button)
-        time.sleep(1)
         
         # Try clicking the export button, if intercepted use JavaScript click
         try:
@@ -250,17 +267,35 @@ class SCElectionScraper:
             all_results = []
             elections_found = 0
             
+            # Dates checked by an interrupted run are skipped, their rows are already in the master CSV
+            checkpoint = CheckpointStore("southcarolina", self.download_dir)
+            
+            incomplete = False
             for i, date_obj in enumerate(dates, 1):
                 date_str = self.format_date_for_input(date_obj)
+                if date_str in checkpoint:
+                    continue
+                
+                if deadline.expired():
+                    # Out of time: the dates searched so far are in the master CSV and the checkpoint
+                    deadline.mark_incomplete("southcarolina", done=i - 1, total=len(dates))
+                    incomplete = True
+                    break
                 
                 logger.info(f"Progress: {i}/{len(dates)} - Checking {date_str}")
                 curr = self.driver.current_url
-                self.search_election_date(date_str)
+                # A date that runs out of its budget returns None and is searched again next run
+                with deadline.unit(DATE_BUDGET):
+                    rows = self.search_election_date(date_str)
+                if rows is not None:
+                    checkpoint.record(date_str, {"rows": rows})
                 
                 print(curr)
                 print(self.driver.current_url)
                 self.driver.get(curr)
-                
+            
+            if not incomplete:
+                checkpoint.finish()
             logger.info(f"Date range search completed. Master CSV location: {self.master_csv}")
             
         except Exception as e:
@@ -271,10 +306,10 @@ class SCElectionScraper:
     
     
     def close(self):
-        """Close the webdriver"""
+        """Return the webdriver to the shared pool"""
         if hasattr(self, 'driver'):
-            self.driver.quit()
-            logger.info("WebDriver closed")
+            release_driver(self.driver)
+            logger.info("WebDriver released")
 
 def main():
     """Main function to run the scraper"""
@@ -1,23 +1,22 @@
-from selenium import webdriver # done 
-from selenium.webdriver.common.by import By
+from selenium.webdriver.common.by import By # done 
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-import time
 import json
 import csv
 import pandas as pd
 from datetime import datetime
 import os
 import re
+import deadline
+import rate_limit
+from checkpoint import CheckpointStore
+from driver_pool import acquire_driver, release_driver
+from instrumentation import stage
+from pipeline import Pipeline
+from waits import wait_for_dom_ready, wait_for_network_idle, wait_for_page_change, wait_for_stable_count
 
-options = webdriver.ChromeOptions()
-# Uncomment the next line if you want to run in headless mode
-options.add_argument('--headless')
-options.add_argument("--disable-notifications")
-options.add_argument("--disable-popup-blocking")
-options.add_argument("--start-maximized")
+# Set to False if you want to watch the browser
+HEADLESS = True
 
 def get_dropdown_options(driver, dropdown_id):
     """Get all valid options from a dropdown"""
@@ -84,7 +83,7 @@ def scrape_candidate_info(driver, wait):
     
     try:
         # Wait for the candidate information to load
-        time.sleep(3)
+        wait_for_network_idle(driver, "texas")
         
         # Look for candidate containers - trying multiple possible selectors
         candidate_selectors = [
@@ -294,8 +293,13 @@ def save_candidates_data(candidates, election_name, year):
         return
     
     # Process candidates to desired format
-    processed_candidates = process_candidates_data(candidates, election_name, year)
+    with stage("texas", "normalize"):
+        processed_candidates = process_candidates_data(candidates, election_name, year)
     
+    write_candidates_data(processed_candidates, election_name)
+
+def write_candidates_data(processed_candidates, election_name):
+    """Append processed candidates to all_data_texas.csv, avoiding duplicates"""
     if not processed_candidates:
         print("No processed candidate data to save")
         return
@@ -320,7 +324,8 @@ def save_candidates_data(candidates, election_name, year):
     
     if file_exists:
         try:
-            existing_df = pd.read_csv(csv_filename)
+            with stage("texas", "parse"):
+                existing_df = pd.read_csv(csv_filename)
             print(f"Found existing CSV with {len(existing_df)} records")
         except Exception as e:
             print(f"Error reading existing CSV: {e}")
@@ -365,7 +370,8 @@ def save_candidates_data(candidates, election_name, year):
     print(f"Final record count: {after_dedup}")
     
     # Save to CSV
-    all_data.to_csv(csv_filename, index=False, encoding='utf-8')
+    with stage("texas", "write"):
+        all_data.to_csv(csv_filename, index=False, encoding='utf-8')
     
     print(f"Successfully saved data to: {csv_filename}")
     print(f"File size: {os.path.getsize(csv_filename) / (1024*1024):.2f} MB")
@@ -396,15 +402,98 @@ def save_candidates_data(candidates, election_name, year):
     print(f"  - Unique Political Titles: {all_data['Political Title'].nunique()}")
     print(f"  - Unique Parties: {all_data['Party Affiliation'].nunique()}")
 
+def fetch_elections(driver, wait, year, elections, checkpoint):
+    """
+    Pipeline source: open each election's qualified candidates and scrape them
+
+    Yields:
+        dict: year, election and the raw candidates (elections the checkpoint
+              already holds and elections that fail are skipped)
+    """
+    for election_index, election in enumerate(elections):
+        if (year, election['value']) in checkpoint:
+            print(f"Skipping {election['text']} - already saved by a previous run")
+            continue
+        
+        if deadline.expired():
+            deadline.mark_incomplete("texas", done=election_index, total=len(elections))
+            return
+        
+        print(f"\n--- Processing Election {election_index + 1}/{len(elections)} ---")
+        print(f"Election: {election['text']}")
+        
+        try:
+            # Select the election
+            with stage("texas", "navigate"):
+                election_dropdown = driver.find_element(By.ID, "idElection")
+                select_election = Select(election_dropdown)
+                select_election.select_by_value(election['value'])
+            print(f"Selected election: {election['text']}")
+            
+            wait_for_network_idle(driver, "texas")
+            
+            # Click "Qualified Candidates Information" button
+            print("Clicking Qualified Candidates Information button...")
+            try:
+                # Try multiple selectors for the button
+                info_button = None
+                selectors = [
+                    (By.CSS_SELECTOR, "button.btn.btn-primary[onclick*='submitForm']"),
+                    (By.XPATH, "//button[contains(@class, 'btn btn-primary') and contains(@onclick, 'submitForm')]"),
+                    (By.XPATH, "//button[contains(text(), 'Qualified Candidates Information')]"),
+                    (By.CSS_SELECTOR, "button.btn.btn-primary"),
+                    (By.XPATH, "//input[@value='Qualified Candidates Information']")
+                ]
+                
+                for selector_type, selector in selectors:
+                    try:
+                        info_button = wait.until(EC.element_to_be_clickable((selector_type, selector)))
+                        print(f"Found button using selector: {selector}")
+                        break
+                    except:
+                        continue
+                
+                if info_button:
+                    old_root = driver.find_element(By.TAG_NAME, "html")
+                    with rate_limit.request(driver.current_url) as req:
+                        with stage("texas", "navigate"):
+                            info_button.click()
+                        print("Clicked Qualified Candidates Information button")
+                        # Wait to see results
+                        req.error = not wait_for_page_change(driver, old_root, "texas")
+                    
+                    # Scrape candidate information
+                    print("Scraping candidate information...")
+                    with stage("texas", "extract"):
+                        candidates = scrape_candidate_info(driver, wait)
+                    
+                    yield {"year": year, "election": election, "candidates": candidates}
+                else:
+                    print("Could not find the Qualified Candidates Information button")
+                
+            except Exception as e:
+                print(f"Error clicking info button: {e}")
+            
+        except Exception as e:
+            print(f"Error processing election {election['text']}: {e}")
+            continue
+
+def normalize_election(item):
+    """Pipeline stage: convert one election's scraped candidates to the CSV format"""
+    with stage("texas", "normalize"):
+        item['processed'] = process_candidates_data(item['candidates'], item['election']['text'], item['year'])
+    return item
+
 def automate_texas_elections():
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    driver = acquire_driver(headless=HEADLESS, profile="throughput", site="texas")
     
     try:
-        driver.get("https://candidate.texas-election.com/Elections/getQualifiedCandidatesInfo.do")
+        with stage("texas", "navigate"):
+            driver.get("https://candidate.texas-election.com/Elections/getQualifiedCandidatesInfo.do")
         print("Navigated to Texas Elections page")
         
         wait = WebDriverWait(driver, 20)
-        time.sleep(5)
+        wait_for_dom_ready(driver, "texas")
         
         # Step 1: Select the latest year
         print("Step 1: Selecting the latest year...")
@@ -424,76 +513,39 @@ def automate_texas_elections():
             latest_year = max(available_years)
             print(f"Selecting latest year: {latest_year}")
             select_year.select_by_value(latest_year)
-            time.sleep(3)  # Wait for election dropdown to populate
             
             # Step 2: Get all election options for the latest year
             print("Step 2: Getting all election options...")
-            time.sleep(2)  # Additional wait for dropdown to populate
+            # Wait for election dropdown to populate
+            wait_for_stable_count(driver, (By.CSS_SELECTOR, "#idElection option"), "texas",
+                                  min_count=2, name="election_options")
             available_elections = get_dropdown_options(driver, "idElection")
             
             print(f"Found {len(available_elections)} elections:")
             for election in available_elections:
                 print(f"  - {election['text']}")
             
-            # Step 3: Process each election
-            for election_index, election in enumerate(available_elections):
-                print(f"\n--- Processing Election {election_index + 1}/{len(available_elections)} ---")
-                print(f"Election: {election['text']}")
-                
-                try:
-                    # Select the election
-                    election_dropdown = driver.find_element(By.ID, "idElection")
-                    select_election = Select(election_dropdown)
-                    select_election.select_by_value(election['value'])
-                    print(f"Selected election: {election['text']}")
-                    
-                    time.sleep(2)  # Brief wait
-                    
-                    # Click "Qualified Candidates Information" button
-                    print("Clicking Qualified Candidates Information button...")
-                    try:
-                        # Try multiple selectors for the button
-                        info_button = None
-                        selectors = [
-                            (By.CSS_SELECTOR, "button.btn.btn-primary[onclick*='submitForm']"),
-                            (By.XPATH, "//button[contains(@class, 'btn btn-primary') and contains(@onclick, 'submitForm')]"),
-                            (By.XPATH, "//button[contains(text(), 'Qualified Candidates Information')]"),
-                            (By.CSS_SELECTOR, "button.btn.btn-primary"),
-                            (By.XPATH, "//input[@value='Qualified Candidates Information']")
-                        ]
-                        
-                        for selector_type, selector in selectors:
-                            try:
-                                info_button = wait.until(EC.element_to_be_clickable((selector_type, selector)))
-                                print(f"Found button using selector: {selector}")
-                                break
-                            except:
-                                continue
-                        
-                        if info_button:
-                            info_button.click()
-                            print("Clicked Qualified Candidates Information button")
-                            time.sleep(5)  # Wait to see results
-                            
-                            # Scrape candidate information
-                            print("Scraping candidate information...")
-                            candidates = scrape_candidate_info(driver, wait)
-                            
-                            if candidates:
-                                save_candidates_data(candidates, election['text'], latest_year)
-                            else:
-                                print("No candidate information found to scrape")
-                            
-                            time.sleep(2)  # Brief pause before next election
-                        else:
-                            print("Could not find the Qualified Candidates Information button")
-                        
-                    except Exception as e:
-                        print(f"Error clicking info button: {e}")
-                    
-                except Exception as e:
-                    print(f"Error processing election {election['text']}: {e}")
-                    continue
+            # Step 3: Process each election (skipping those an interrupted run already saved).
+            # The browser fetches the next election while the previous one is normalized and written.
+            checkpoint = CheckpointStore("texas")
+            
+            def write_election(item):
+                if item['processed']:
+                    write_candidates_data(item['processed'], item['election']['text'])
+                else:
+                    print(f"No candidate information found for {item['election']['text']}")
+                checkpoint.record((item['year'], item['election']['value']),
+                                  {"election": item['election']['text'], "candidates": len(item['candidates'])})
+                return item
+            
+            pipeline = Pipeline("texas")
+            pipeline.add("normalize", normalize_election)
+            pipeline.add("write", write_election)
+            pipeline.run(fetch_elections(driver, wait, latest_year, available_elections, checkpoint))
+            
+            # A run stopped by its deadline keeps the checkpoint so the next run resumes
+            if not deadline.expired():
+                checkpoint.finish()
         
         print(f"\n=== COMPLETED ===")
         print("Processed all elections for the latest year")
@@ -507,8 +559,8 @@ def automate_texas_elections():
         import traceback
         traceback.print_exc()
     finally:
-        driver.quit()
-        print("Browser closed")
+        release_driver(driver)
+        print("Browser released")
 
 
 if __name__ == "__main__":
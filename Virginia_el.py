@@ -1,38 +1,61 @@
-import time ## done 
-import os
-from selenium import webdriver
+import os ## done 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from driver_pool import acquire_driver, release_driver
+from waits import wait_for_page_change
+from downloads import DownloadWatcher
+import artifact_store
+import http_cache
+
+PAGE_URL = "https://www.elections.virginia.gov/casting-a-ballot/previous-candidate-lists/"
+
+# Bump when the Excel conversion changes its output
+PARSER_VERSION = 1
+
+# Link of the workbook the last run downloaded.  The workbook can be replaced
+# under the same link without the listing page changing, so the shortcut below
+# checks both.
+WORKBOOK_URL_FILE = "virginia_workbook_url.txt"
 
 def setup_driver(download_dir=None):
-    """Set up Chrome driver with download preferences"""
-    chrome_options = Options()
-    
+    """Borrow a Chrome driver from the shared pool with downloads going to download_dir"""
     # Set download directory to current directory if not specified
     if download_dir is None:
         download_dir = os.getcwd()
     
-    # Chrome preferences for downloads
-    prefs = {
-        "download.default_directory": download_dir,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True
-    }
-    
-    chrome_options.add_experimental_option("prefs", prefs)
-    
-    # Optional: Run in headless mode (comment out if you want to see the browser)
-    chrome_options.add_argument("--headless")
-    
-    driver = webdriver.Chrome(options=chrome_options)
-    return driver
+    # Optional: pass headless=False if you want to see the browser
+    return acquire_driver(download_dir=download_dir, headless=True)
+
+def sources_unchanged():
+    """True when neither the listing page nor the workbook downloaded last time has changed"""
+    try:
+        with open(WORKBOOK_URL_FILE, encoding="utf-8") as f:
+            workbook_url = f.read().strip()
+    except OSError:
+        return False
+    return (bool(workbook_url) and http_cache.unchanged(PAGE_URL, ["all_data_virginia.csv"])
+            and http_cache.unchanged(workbook_url, ["all_data_virginia.csv"]))
+
+def remember_workbook(url):
+    """Record the downloaded workbook's link and put its validators in the HTTP cache for the next check"""
+    if not url:
+        return
+    with open(WORKBOOK_URL_FILE, "w", encoding="utf-8") as f:
+        f.write(url)
+    try:
+        import fetch_engine
+        fetch_engine.fetch(url)
+    except Exception as e:
+        print(f"Could not cache {url}: {e}")
 
 def download_virginia_elections_csv():
     """Main function to download Virginia 2025 elections CSV"""
+    # Skip the browser when the page and the workbook it links to are both unchanged
+    if sources_unchanged():
+        return True
+    
     driver = None
     try:
         # Set up the driver
@@ -41,7 +64,7 @@ def download_virginia_elections_csv():
         driver = setup_driver(current_dir)
         
         # Navigate to the Virginia elections page
-        url = "https://www.elections.virginia.gov/casting-a-ballot/previous-candidate-lists/"
+        url = PAGE_URL
         print(f"Navigating to: {url}")
         driver.get(url)
         
@@ -75,10 +98,11 @@ def download_virginia_elections_csv():
                 print(f"Clicking on: {link_text}")
             except:
                 print("Clicking on: [Text encoding issue]")
+            old_root = driver.find_element(By.TAG_NAME, "html")
             first_2025_link.click()
             
             # Wait for the new page to load
-            time.sleep(3)
+            wait_for_page_change(driver, old_root, "virginia")
             
             # Look for CSV download links on the new page
             print("Looking for CSV download links...")
@@ -96,31 +120,27 @@ def download_virginia_elections_csv():
                 
                 # Click on the first CSV/download link
                 download_link = csv_links[0]
+                download_url = download_link.get_attribute('href')
                 try:
                     link_text = download_link.text.encode('ascii', 'ignore').decode('ascii')
                     print(f"Clicking download link: {link_text}")
                 except:
                     print("Clicking download link: [Text encoding issue]")
-                download_link.click()
                 
-                # Get list of files before download
-                files_before = set(os.listdir(current_dir))
-                
-                # Wait for download to complete
-                print("Waiting for download to complete...")
-                time.sleep(5)
-                
-                # Check if file was downloaded by comparing before and after
-                files_after = set(os.listdir(current_dir))
-                new_files = files_after - files_before
-                
-                # Filter for CSV/Excel files
-                downloaded_files = [f for f in new_files if f.endswith(('.csv', '.xlsx'))]
+                # Start watching before the click so the new file can't be missed
+                with DownloadWatcher(current_dir, extensions=(".csv", ".xlsx")) as watcher:
+                    download_link.click()
+                    
+                    # Wait for download to complete
+                    print("Waiting for download to complete...")
+                    downloaded_file = watcher.wait_for_download(timeout=60)
                 
-                if downloaded_files:
-                    # Get the downloaded file (should be only one)
-                    latest_file = downloaded_files[0]
+                if downloaded_file:
+                    # Get the downloaded file
+                    latest_file = os.path.basename(downloaded_file)
                     print(f"New file detected: {latest_file}")
+                    # Before the output is written, so the output is newer than the cached workbook
+                    remember_workbook(download_url)
                     
                     # Handle different file types
                     if latest_file.endswith('.xlsx'):
@@ -197,13 +217,15 @@ def download_virginia_elections_csv():
         return False
     finally:
         if driver:
-            driver.quit()
+            release_driver(driver)
 
 def convert_xlsx_to_csv(xlsx_file, csv_file):
     """Convert Excel file to CSV (requires pandas and openpyxl)"""
     try:
         import pandas as pd
-        df = pd.read_excel(xlsx_file)
+        # Keep the workbook (it is deleted after the conversion); the same workbook is only read once
+        sha = artifact_store.keep(xlsx_file, source=PAGE_URL)
+        df = artifact_store.memoize(sha, "virginia.xlsx", PARSER_VERSION, lambda: pd.read_excel(xlsx_file))
         df.to_csv(csv_file, index=False)
         print(f"Converted {xlsx_file} to {csv_file}")
         return True
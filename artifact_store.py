@@ -0,0 +1,216 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+
+# Content-addressed store for raw downloads and what the parsers made of them.
+#
+# Every downloaded artifact (the Shawnee PDF, the Florida candidate lists, the
+# Virginia workbook) is kept gzip-compressed under its SHA-256, so a scraper
+# can delete or overwrite its working copy without losing the raw data, and
+# identical downloads are stored once:
+#
+#     sha = artifact_store.keep("shawnee_candidates.pdf", source=pdf_url)
+#
+# Parser output is cached per artifact hash and parser version.  A download
+# whose content was parsed before skips the parser entirely:
+#
+#     candidates = artifact_store.memoize(sha, "shawnee.pdf", PARSER_VERSION,
+#                                         lambda: parse(pdf_path))
+#
+# Bump the scraper's parser version whenever the parsing code changes its
+# output; older results then simply stop matching.  Results are pickled, so
+# they can be lists of dicts or DataFrames.
+#
+# The store lives in ~/.cache/election-scraper/artifacts (SCRAPER_ARTIFACTS to
+# override) and is never pruned automatically; delete the directory to reclaim
+# the space.
+
+STORE_DIR = os.environ.get("SCRAPER_ARTIFACTS") or os.path.join(
+    os.path.expanduser("~"), ".cache", "election-scraper", "artifacts")
+
+COMPRESS_LEVEL = 6
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    """Return the SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _tmp_path(path):
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+class ArtifactStore:
+    def __init__(self, directory=None):
+        """
+        Compressed raw artifacts by SHA-256 plus memoized parser output
+
+        Args:
+            directory (str): Store directory (default: STORE_DIR)
+        """
+        self.directory = directory or STORE_DIR
+        self.lock = threading.Lock()
+        self.stats = {"stored": 0, "duplicates": 0, "bytes_in": 0, "bytes_stored": 0,
+                      "parse_hits": 0, "parse_misses": 0}
+
+    def blob_path(self, sha256):
+        return os.path.join(self.directory, "blobs", sha256[:2], sha256 + ".gz")
+
+    def meta_path(self, sha256):
+        return os.path.join(self.directory, "blobs", sha256[:2], sha256 + ".json")
+
+    def result_path(self, sha256, parser, version):
+        return os.path.join(self.directory, "parsed", parser, str(version), sha256[:2], sha256 + ".pickle.gz")
+
+    def has(self, sha256):
+        return os.path.exists(self.blob_path(sha256))
+
+    def _record(self, sha256, size, name, source):
+        """Add the name and source of this download to the artifact's metadata"""
+        path = self.meta_path(sha256)
+        try:
+            with open(path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {"sha256": sha256, "size": size, "first_seen": time.time(), "names": [], "sources": []}
+        if name and name not in meta["names"]:
+            meta["names"].append(name)
+        if source and source not in meta["sources"]:
+            meta["sources"].append(source)
+        meta["last_seen"] = time.time()
+        tmp_path = _tmp_path(path)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def put(self, path=None, content=None, name=None, source=None):
+        """
+        Keep an artifact (a file or bytes) and return its SHA-256
+
+        Args:
+            path (str): File to keep, or
+            content (bytes): Data to keep
+            name (str): File name it was downloaded as (default: basename of path)
+            source (str): URL or description of where it came from
+
+        Returns:
+            str: SHA-256 of the content
+        """
+        sha256 = file_sha256(path) if path is not None else hashlib.sha256(content or b"").hexdigest()
+        size = os.path.getsize(path) if path is not None else len(content or b"")
+        name = name or (os.path.basename(path) if path is not None else None)
+        blob_path = self.blob_path(sha256)
+        with self.lock:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            self.stats["bytes_in"] += size
+            if os.path.exists(blob_path):
+                self.stats["duplicates"] += 1
+            else:
+                tmp_path = _tmp_path(blob_path)
+                with gzip.open(tmp_path, "wb", compresslevel=COMPRESS_LEVEL) as f:
+                    if path is not None:
+                        with open(path, "rb") as source_file:
+                            shutil.copyfileobj(source_file, f, CHUNK_SIZE)
+                    else:
+                        f.write(content or b"")
+                os.replace(tmp_path, blob_path)
+                self.stats["stored"] += 1
+                self.stats["bytes_stored"] += os.path.getsize(blob_path)
+            self._record(sha256, size, name, source)
+        return sha256
+
+    def read(self, sha256):
+        """Return the content of a stored artifact"""
+        with gzip.open(self.blob_path(sha256), "rb") as f:
+            return f.read()
+
+    def restore(self, sha256, path):
+        """Write a stored artifact back to path"""
+        tmp_path = _tmp_path(path)
+        with gzip.open(self.blob_path(sha256), "rb") as source, open(tmp_path, "wb") as f:
+            shutil.copyfileobj(source, f, CHUNK_SIZE)
+        os.replace(tmp_path, path)
+        return path
+
+    def memoize(self, sha256, parser, version, parse):
+        """
+        Return parse()'s result for an artifact, computing it only once per content and version
+
+        Args:
+            sha256 (str): Artifact the parser reads (from put())
+            parser (str): Name of the parser (e.g. "shawnee.pdf")
+            version: Parser version; bump it when the parser's output changes
+            parse (callable): Computes the result; None (a failed parse) isn't cached
+
+        Returns:
+            The parsed result
+        """
+        path = self.result_path(sha256, parser, version)
+        try:
+            with gzip.open(path, "rb") as f:
+                result = pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+            print(f"Ignoring unreadable cached {parser} result for {sha256[:12]}: {e}")
+        else:
+            with self.lock:
+                self.stats["parse_hits"] += 1
+            print(f"{parser}: content {sha256[:12]} was parsed before, reusing the result")
+            return result
+
+        result = parse()
+        with self.lock:
+            self.stats["parse_misses"] += 1
+        if result is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = _tmp_path(path)
+            with gzip.open(tmp_path, "wb", compresslevel=1) as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        return result
+
+    def clear(self):
+        """Remove every artifact and cached result"""
+        with self.lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def summary(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+store = ArtifactStore()
+
+
+def keep(path=None, content=None, name=None, source=None):
+    """Keep an artifact in the shared store (see ArtifactStore.put)"""
+    return store.put(path=path, content=content, name=name, source=source)
+
+
+def memoize(sha256, parser, version, parse):
+    """Memoize a parser in the shared store (see ArtifactStore.memoize)"""
+    return store.memoize(sha256, parser, version, parse)
+
+
+@atexit.register
+def print_summary():
+    """Print how much was stored and how many parses were skipped"""
+    stats = store.summary()
+    if not any(stats.values()):
+        return
+    print("\n=== Artifact Store Summary ===")
+    print(f"Artifacts: {stats['stored']} new, {stats['duplicates']} already stored "
+          f"({stats['bytes_in'] / 1024:.0f} KB in, {stats['bytes_stored'] / 1024:.0f} KB compressed)")
+    print(f"Parses skipped: {stats['parse_hits']}  Parsed: {stats['parse_misses']}")
@@ -0,0 +1,356 @@
+import atexit
+import hashlib
+import http.client
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Record/replay of every HTTP exchange a scraper makes, so flows can be timed
+# and checked without the network.
+#
+#   SCRAPER_CASSETTE_MODE=record SCRAPER_CASSETTE=cassettes/texas python Texas_Elections.py
+#   SCRAPER_CASSETTE_MODE=replay SCRAPER_CASSETTE=cassettes/texas python Texas_Elections.py
+#
+# (or ProcessAll.py / cli.py scrape --record DIR / --replay DIR, which keep one
+# cassette per scraper in DIR/<name>).
+#
+# A local proxy is started on the first browser or fetch engine request.  Chrome
+# (driver_pool.py) and the fetch engine are pointed at it; HTTPS is terminated
+# with a self-signed certificate that the clients are told to accept.  In record
+# mode the proxy forwards each request to the real site and appends the
+# exchange to the cassette; in replay mode it answers from the cassette only and
+# never opens an outside connection (unknown requests get a 404).
+#
+# A cassette is a directory with index.jsonl (one exchange per line) and the
+# bodies stored by SHA-256 in bodies/.  Replay matches on method, URL and
+# request body; if the body differs (a timestamp in a form post, say) it falls
+# back to method and URL.  Repeated requests get the recorded responses in the
+# order they were recorded.
+#
+# A third mode, synthetic, needs no cassette: the proxy answers with the
+# generated stand-in portals of standin_portals.py (scale tests).
+
+MODE_ENV = "SCRAPER_CASSETTE_MODE"
+DIR_ENV = "SCRAPER_CASSETTE"
+MODES = ("record", "replay", "synthetic")
+
+CERT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "election-scraper", "cassette-proxy.pem")
+
+# Headers that only describe one connection and must not be forwarded or replayed
+HOP_BY_HOP = {"connection", "keep-alive", "proxy-connection", "proxy-authenticate", "proxy-authorization",
+              "te", "trailer", "trailers", "transfer-encoding", "upgrade"}
+
+UPSTREAM_TIMEOUT = 60
+
+
+def mode():
+    """Return "record", "replay", "synthetic" or None"""
+    value = os.environ.get(MODE_ENV, "").lower()
+    if value not in MODES or (value != "synthetic" and not os.environ.get(DIR_ENV)):
+        return None
+    return value
+
+
+def active():
+    return mode() is not None
+
+
+def _sha256(data):
+    return hashlib.sha256(data or b"").hexdigest()
+
+
+class Cassette:
+    def __init__(self, directory):
+        """
+        Recorded HTTP exchanges of one scraper
+
+        Args:
+            directory (str): Cassette directory (created when recording)
+        """
+        self.directory = os.path.abspath(directory)
+        self.index_path = os.path.join(self.directory, "index.jsonl")
+        self.body_dir = os.path.join(self.directory, "bodies")
+        self.lock = threading.Lock()
+        self.exchanges = []
+        self.cursors = {}
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    self.exchanges.append(json.loads(line))
+                except ValueError:
+                    # Partially written line from an interrupted recording
+                    continue
+
+    def _write_body(self, data):
+        if not data:
+            return None
+        digest = _sha256(data)
+        path = os.path.join(self.body_dir, digest)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def body(self, digest):
+        if not digest:
+            return b""
+        with open(os.path.join(self.body_dir, digest), "rb") as f:
+            return f.read()
+
+    def clear(self):
+        """Start the cassette from scratch (done once at the start of a recording)"""
+        with self.lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.exchanges = []
+            self.cursors = {}
+
+    def record(self, method, url, request_body, status, headers, body, elapsed):
+        """Append one exchange"""
+        with self.lock:
+            os.makedirs(self.body_dir, exist_ok=True)
+            exchange = {
+                "method": method,
+                "url": url,
+                "request_sha256": _sha256(request_body),
+                "request_body": self._write_body(request_body),
+                "status": status,
+                "headers": headers,
+                "body": self._write_body(body),
+                "elapsed": round(elapsed, 3),
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(exchange) + "\n")
+            self.exchanges.append(exchange)
+            self.stats["recorded"] += 1
+
+    def match(self, method, url, request_body):
+        """
+        Return the recorded exchange for a request, or None
+
+        Exact matches (same body) are tried first, then any body.  Each match
+        key has its own cursor, so repeated requests replay the recorded
+        sequence; the last response is repeated once it runs out.
+        """
+        request_sha = _sha256(request_body)
+        keys = [
+            ("exact", method, url, request_sha),
+            ("url", method, url),
+        ]
+        with self.lock:
+            for key in keys:
+                candidates = [exchange for exchange in self.exchanges
+                              if exchange["method"] == method and exchange["url"] == url
+                              and (key[0] != "exact" or exchange["request_sha256"] == request_sha)]
+                if candidates:
+                    position = self.cursors.get(key, 0)
+                    self.cursors[key] = position + 1
+                    self.stats["replayed"] += 1
+                    return candidates[min(position, len(candidates) - 1)]
+            self.stats["misses"] += 1
+            return None
+
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def current():
+    """Return the cassette of the running scraper (SCRAPER_CASSETTE), or None"""
+    if mode() not in ("record", "replay"):
+        return None
+    directory = os.path.abspath(os.environ[DIR_ENV])
+    with _cassettes_lock:
+        if directory not in _cassettes:
+            cassette = Cassette(directory)
+            if mode() == "record":
+                # A recording replaces what was there before
+                cassette.clear()
+            _cassettes[directory] = cassette
+        return _cassettes[directory]
+
+
+def ensure_certificate(path=CERT_PATH):
+    """Create the proxy's self-signed certificate (key and cert in one PEM) if needed"""
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    key_path, cert_path = path + ".key", path + ".crt"
+    try:
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "3650",
+                        "-subj", "/CN=election-scraper cassette proxy",
+                        "-keyout", key_path, "-out", cert_path],
+                       check=True, capture_output=True, timeout=60)
+    except (OSError, subprocess.SubprocessError) as e:
+        raise RuntimeError(f"openssl is needed to create the cassette proxy certificate: {e}") from e
+    with open(path, "w", encoding="utf-8") as f:
+        for part in (key_path, cert_path):
+            with open(part, encoding="utf-8") as source:
+                f.write(source.read())
+            os.remove(part)
+    return path
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    tunnel_host = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_CONNECT(self):
+        # Terminate TLS ourselves; the requests inside the tunnel are handled below
+        self.send_response(200, "Connection Established")
+        self.end_headers()
+        try:
+            self.connection = self.server.tls_context.wrap_socket(self.connection, server_side=True)
+        except (ssl.SSLError, OSError):
+            self.close_connection = True
+            return
+        self.rfile = self.connection.makefile("rb")
+        self.wfile = self.connection.makefile("wb", 0)
+        self.tunnel_host = self.path
+        self.close_connection = False
+
+    def _url(self):
+        if self.tunnel_host:
+            host, _, port = self.tunnel_host.partition(":")
+            netloc = host if port in ("", "443") else self.tunnel_host
+            return f"https://{netloc}{self.path}"
+        return self.path
+
+    def _handle(self):
+        url = self._url()
+        length = int(self.headers.get("Content-Length") or 0)
+        request_body = self.rfile.read(length) if length else b""
+        if mode() == "synthetic":
+            import standin_portals
+            self._respond(*standin_portals.respond(self.command, url, request_body))
+            return
+        cassette = current()
+        if cassette is None:
+            self._respond(503, [("Content-Type", "text/plain")], b"No cassette is active")
+            return
+        if mode() == "record":
+            try:
+                status, headers, body, elapsed = self._forward(url, request_body)
+            except (OSError, http.client.HTTPException) as e:
+                self._respond(502, [("Content-Type", "text/plain")], f"Upstream error: {e}".encode("utf-8"))
+                return
+            cassette.record(self.command, url, request_body, status, headers, body, elapsed)
+        else:
+            exchange = cassette.match(self.command, url, request_body)
+            if exchange is None:
+                self._respond(404, [("Content-Type", "text/plain"), ("X-Cassette-Miss", "1")],
+                              f"Not in cassette: {self.command} {url}".encode("utf-8"))
+                return
+            status, headers, body = exchange["status"], exchange["headers"], cassette.body(exchange["body"])
+        self._respond(status, headers, body)
+
+    def _forward(self, url, request_body):
+        """Send the request to the real site and return (status, headers, body, seconds)"""
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        connection = connection_class(parts.netloc, timeout=UPSTREAM_TIMEOUT)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        headers = {name: value for name, value in self.headers.items() if name.lower() not in HOP_BY_HOP}
+        start = time.time()
+        try:
+            connection.request(self.command, path, body=request_body or None, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+        finally:
+            connection.close()
+        return response.status, response.getheaders(), body, time.time() - start
+
+    def _respond(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers:
+            if name.lower() not in HOP_BY_HOP and name.lower() != "content-length":
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = _handle
+
+
+class CassetteProxy:
+    def __init__(self, host="127.0.0.1", port=0):
+        """Local stand-in server the browser and the HTTP clients are pointed at"""
+        self.server = ThreadingHTTPServer((host, port), ProxyHandler)
+        self.server.daemon_threads = True
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(ensure_certificate())
+        self.server.tls_context = context
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+_proxy = None
+_proxy_lock = threading.Lock()
+
+
+def proxy_url():
+    """Start the proxy of this process if needed and return its URL"""
+    global _proxy
+    with _proxy_lock:
+        if _proxy is None:
+            _proxy = CassetteProxy()
+            print(f"Cassette proxy ({mode()}) listening on {_proxy.url}")
+        return _proxy.url
+
+
+def chrome_arguments():
+    """Chrome command line switches that route every request through the proxy"""
+    if not active():
+        return []
+    return [
+        f"--proxy-server={proxy_url()}",
+        # Loopback is bypassed by default; everything else goes through the proxy
+        "--proxy-bypass-list=<-loopback>",
+        "--ignore-certificate-errors",
+    ]
+
+
+def summary():
+    with _cassettes_lock:
+        cassettes = list(_cassettes.values())
+    return [{"cassette": cassette.directory, **cassette.stats} for cassette in cassettes]
+
+
+@atexit.register
+def print_summary():
+    """Print what was recorded or replayed"""
+    rows = summary()
+    if not rows:
+        return
+    print(f"\n=== Cassette Summary ({mode() or 'off'}) ===")
+    for row in rows:
+        print(f"{row['cassette']}: recorded {row['recorded']}, replayed {row['replayed']}, misses {row['misses']}")
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+# Resumable progress for the long scraping loops.
+#
+# A scraper records every finished unit of work (a Georgia candidate page, a
+# South Carolina date, a Texas election, a Florida election/office pair) in a
+# JSON-lines file as soon as it is done.  When the run crashes, the next run
+# loads the file and skips straight to the units that are still missing.  Once
+# the whole loop has finished the scraper calls finish() and the checkpoint is
+# removed, so the following run starts from scratch again.
+#
+# Each line is flushed and fsynced on its own, so a crash can at most lose the
+# unit that was being written (a truncated last line is ignored on load).
+# Results must be JSON serialisable; raw bytes (captured exports) can be stored
+# next to the checkpoint with the payload argument.
+#
+# Set SCRAPER_FRESH_RUN=1 (or ProcessAll.py --fresh) to ignore old checkpoints.
+
+CHECKPOINT_DIR = "checkpoints"
+
+
+def checkpoint_path(name, directory=None):
+    """Return the path of the checkpoint file for name"""
+    directory = directory or os.getcwd()
+    return os.path.join(directory, CHECKPOINT_DIR, f"{name}.jsonl")
+
+
+def has_checkpoint(name, directory=None):
+    """Return True if an unfinished run of name left a checkpoint behind"""
+    return os.path.exists(checkpoint_path(name, directory))
+
+
+def clear_checkpoint(name, directory=None):
+    """Remove the checkpoint of name (and its payloads) once its results have been used"""
+    path = checkpoint_path(name, directory)
+    if os.path.exists(path):
+        os.remove(path)
+    shutil.rmtree(os.path.splitext(path)[0] + ".payloads", ignore_errors=True)
+
+
+class CheckpointStore:
+    def __init__(self, name, directory=None, fresh=None):
+        """
+        Record finished work units so an interrupted run can resume
+
+        Args:
+            name (str): Name of the checkpoint (usually the scraper name)
+            directory (str): Directory holding the checkpoints/ folder (default: cwd)
+            fresh (bool): Discard an existing checkpoint instead of resuming from it
+                          (default: SCRAPER_FRESH_RUN=1 in the environment)
+        """
+        self.name = name
+        self.path = checkpoint_path(name, directory)
+        self.payload_dir = os.path.splitext(self.path)[0] + ".payloads"
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.truncated = False
+        if fresh is None:
+            fresh = os.environ.get("SCRAPER_FRESH_RUN") == "1"
+        if fresh:
+            self.finish()
+        self._load()
+        if self.entries:
+            print(f"Resuming {name}: {len(self.entries)} units already done ({self.path})")
+
+    @staticmethod
+    def _key(key):
+        if isinstance(key, (list, tuple)):
+            return tuple(str(part) for part in key)
+        return (str(key),)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                self.truncated = not line.endswith("\n")
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Partially written line from a crash
+                    continue
+                self.entries[tuple(entry["key"])] = entry
+
+    def __contains__(self, key):
+        return self._key(key) in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def is_done(self, key):
+        """Return True if the unit has already been recorded"""
+        return key in self
+
+    def remaining(self, items, key=lambda item: item):
+        """Return the items whose key has not been recorded yet, in their original order"""
+        return [item for item in items if key(item) not in self]
+
+    def record(self, key, result=None, payload=None):
+        """
+        Mark a unit as done
+
+        Args:
+            key: String or tuple identifying the unit
+            result: JSON serialisable result to keep with it
+            payload (bytes): Optional raw data stored next to the checkpoint
+        """
+        key = self._key(key)
+        entry = {"key": list(key), "result": result, "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if payload is not None:
+                os.makedirs(self.payload_dir, exist_ok=True)
+                name = hashlib.sha1(json.dumps(list(key)).encode("utf-8")).hexdigest() + ".bin"
+                tmp_path = os.path.join(self.payload_dir, name + ".tmp")
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, os.path.join(self.payload_dir, name))
+                entry["payload"] = name
+            with open(self.path, "a", encoding="utf-8") as f:
+                if self.truncated:
+                    # Don't append to the half-written line left by a crash
+                    f.write("\n")
+                    self.truncated = False
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries[key] = entry
+
+    def result(self, key, default=None):
+        """Return the result recorded for a unit"""
+        entry = self.entries.get(self._key(key))
+        return entry["result"] if entry else default
+
+    def payload(self, key):
+        """Return the payload bytes recorded for a unit (None if it has none)"""
+        entry = self.entries.get(self._key(key))
+        if not entry or not entry.get("payload"):
+            return None
+        with open(os.path.join(self.payload_dir, entry["payload"]), "rb") as f:
+            return f.read()
+
+    def keys(self, prefix=None):
+        """Return the recorded keys in the order they were recorded, optionally only those starting with prefix"""
+        prefix = self._key(prefix) if prefix is not None else ()
+        return [key for key in self.entries if key[:len(prefix)] == prefix]
+
+    def results(self, prefix=None):
+        """Return the recorded results in the order they were recorded"""
+        return [self.entries[key]["result"] for key in self.keys(prefix)]
+
+    def finish(self):
+        """The loop completed: remove the checkpoint so the next run starts fresh"""
+        with self.lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            shutil.rmtree(self.payload_dir, ignore_errors=True)
+            self.entries = {}
+            self.truncated = False
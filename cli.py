@@ -0,0 +1,213 @@
+import argparse
+import os
+import runpy
+import sys
+import time
+
+# Single entry point for the scrapers.
+#
+#   python cli.py scrape texas            run one scraper in the current directory
+#   python cli.py scrape all              run every scraper in parallel (ProcessAll.py)
+#   python cli.py scrape texas --record cassettes     record the HTTP traffic (--replay to run offline)
+#   python cli.py scrape georgia --work-queue http://host:8780     split the work with other nodes
+#   python cli.py integrate               run DATA_INTEGRATION.py
+#   python cli.py export                  write the columnar datasets out as all_data.csv / data.csv
+#   python cli.py driver [--refresh]      show (or re-resolve) the cached chromedriver
+#   python cli.py bench startup           time imports and driver resolution
+#   python cli.py bench parsers           parser throughput against benchmarks/parser_baseline.json
+#
+# Only the standard library is imported at start-up.  selenium, pandas, PyPDF2 and
+# friends are imported by the subcommand that needs them, so quick commands such
+# as integrate or a one-state rerun don't pay for the rest.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_script(script):
+    """Run one of the repo scripts as __main__ in the current directory"""
+    sys.path.insert(0, BASE_DIR)
+    try:
+        runpy.run_path(os.path.join(BASE_DIR, script), run_name="__main__")
+    finally:
+        sys.path.remove(BASE_DIR)
+
+
+def cmd_scrape(args):
+    import ProcessAll
+
+    if args.fresh:
+        # Read by checkpoint.py (also in the ProcessAll worker processes)
+        os.environ["SCRAPER_FRESH_RUN"] = "1"
+    if args.profile_memory:
+        os.environ["SCRAPER_PROFILE_MEMORY"] = "1"
+    if args.work_queue:
+        # Read by work_queue.from_env in the scrapers that can split their work across nodes
+        os.environ["SCRAPER_WORK_QUEUE"] = args.work_queue
+        if args.job:
+            os.environ["SCRAPER_WORK_JOB"] = args.job
+    if args.budget is not None:
+        # Read by ProcessAll.task_budget (also in the worker processes)
+        os.environ["SCRAPER_BUDGET_SECONDS"] = str(args.budget)
+    if args.record or args.replay:
+        ProcessAll.use_cassettes("record" if args.record else "replay", args.record or args.replay)
+
+    states = args.states
+    if "all" in states or len(states) > 1:
+        only = None if "all" in states else states
+        results = ProcessAll.run_all(only, args.max_browsers, integrate=args.integrate)
+        return 0 if all(ok for ok, _ in results.values()) else 1
+
+    if args.record or args.replay:
+        os.environ["SCRAPER_CASSETTE"] = os.path.join(os.environ["SCRAPER_CASSETTE_ROOT"], states[0])
+
+    import deadline
+
+    start = time.time()
+    budget = ProcessAll.task_budget(states[0])
+    if budget:
+        os.environ[deadline.DEADLINE_ENV] = str(start + budget)
+    deadline.clear_marker()
+    run_script(ProcessAll.TASKS[states[0]]["script"])
+    partial = " (stopped at its deadline, partial results)" if deadline.read_marker() else ""
+    print(f"\n{states[0]} finished in {time.time() - start:.1f}s{partial}")
+    if args.integrate:
+        run_script(ProcessAll.TASKS["integrate"]["script"])
+    return 0
+
+
+def cmd_integrate(args):
+    import ProcessAll
+
+    if args.profile_memory:
+        os.environ["SCRAPER_PROFILE_MEMORY"] = "1"
+
+    run_script(ProcessAll.TASKS["integrate"]["script"])
+    return 0
+
+
+def cmd_export(args):
+    import datasets
+
+    return datasets.main(["export"] + args.datasets)
+
+
+def cmd_driver(args):
+    import driver_pool
+
+    start = time.time()
+    path = driver_pool.resolve_chromedriver(refresh=args.refresh)
+    print(f"Chrome version: {driver_pool.installed_chrome_version() or 'unknown'}")
+    print(f"chromedriver:   {path or 'resolved by Selenium Manager'}")
+    print(f"Cache file:     {driver_pool.DRIVER_CACHE}")
+    print(f"Resolved in {time.time() - start:.2f}s")
+    return 0
+
+
+def time_import(module):
+    """Import a module in a fresh interpreter and return the seconds it took"""
+    import subprocess
+
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=BASE_DIR)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def bench_startup(args):
+    """Print how long the heavy imports and the driver resolution take"""
+    print("=== Start-up Benchmark ===")
+    for module in ["cli", "pandas", "selenium.webdriver", "PyPDF2", "requests", "driver_pool"]:
+        seconds = time_import(module)
+        shown = "not installed" if seconds is None else f"{seconds * 1000:8.1f} ms"
+        print(f"  import {module:<20} {shown}")
+
+    try:
+        import driver_pool
+    except ImportError as e:
+        print(f"  resolve chromedriver        skipped ({e})")
+        return 0
+
+    start = time.time()
+    driver_pool.resolve_chromedriver()
+    print(f"  resolve chromedriver        {(time.time() - start) * 1000:8.1f} ms (cached)")
+    return 0
+
+
+def bench_parsers(args):
+    """Parser microbenchmarks (parser_bench.py); options after the name go to it"""
+    sys.path.insert(0, BASE_DIR)
+    import parser_bench
+    return parser_bench.main(args.options)
+
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "parsers": bench_parsers,
+}
+
+
+def cmd_bench(args):
+    return BENCHMARKS[args.benchmark](args)
+
+
+def build_parser():
+    # Scraper names come from ProcessAll.py (stdlib only, cheap to import)
+    import ProcessAll
+
+    parser = argparse.ArgumentParser(description="Election candidate contact scrapers")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    scrape = subcommands.add_parser("scrape", help="Run one or more state scrapers")
+    scrape.add_argument("states", nargs="+", choices=ProcessAll.SCRAPERS + ["all"],
+                        help="Scrapers to run ('all' runs every scraper in parallel)")
+    scrape.add_argument("--max-browsers", type=int, default=3,
+                        help="Maximum number of Chrome instances when running several scrapers")
+    scrape.add_argument("--integrate", action="store_true",
+                        help="Run DATA_INTEGRATION.py afterwards")
+    scrape.add_argument("--fresh", action="store_true",
+                        help="Ignore checkpoints left by an interrupted run")
+    scrape.add_argument("--profile-memory", action="store_true",
+                        help="Write memory_profile.json with peak RSS and allocation sites per stage")
+    scrape.add_argument("--budget", type=float, metavar="SECONDS",
+                        help="Stop each scraper with partial results after this long (default: ProcessAll.TASK_BUDGETS, 0 = no limit)")
+    scrape.add_argument("--work-queue", metavar="QUEUE",
+                        help="Share the work with other nodes through this queue (SQLite path or http:// URL of work_queue.py serve)")
+    scrape.add_argument("--job", help="Job name every node of the run uses with --work-queue (default: today's date)")
+    cassettes = scrape.add_mutually_exclusive_group()
+    cassettes.add_argument("--record", metavar="DIR",
+                           help="Record the HTTP traffic of each scraper into DIR/<state>")
+    cassettes.add_argument("--replay", metavar="DIR",
+                           help="Replay the cassettes in DIR instead of using the network")
+    scrape.set_defaults(func=cmd_scrape)
+
+    integrate = subcommands.add_parser("integrate", help="Merge the per-state CSVs (DATA_INTEGRATION.py)")
+    integrate.add_argument("--profile-memory", action="store_true",
+                           help="Write memory_profile.json with peak RSS and allocation sites per stage")
+    integrate.set_defaults(func=cmd_integrate)
+
+    export = subcommands.add_parser("export", help="Write the columnar datasets out as CSV")
+    export.add_argument("datasets", nargs="*", default=["all_data.csv", "data.csv"],
+                        help="CSV names of the datasets (default: all_data.csv data.csv)")
+    export.set_defaults(func=cmd_export)
+
+    driver = subcommands.add_parser("driver", help="Show the cached chromedriver")
+    driver.add_argument("--refresh", action="store_true", help="Resolve chromedriver again")
+    driver.set_defaults(func=cmd_driver)
+
+    bench = subcommands.add_parser("bench", help="Run a benchmark")
+    bench.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    bench.add_argument("options", nargs=argparse.REMAINDER,
+                       help="Options for the benchmark (e.g. parsers --threshold 10 --update-baseline)")
+    bench.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Columnar storage for the integrated datasets (all_data, data) and the
+# per-state inputs.
+#
+# A dataset is named after the CSV it replaces.  With pyarrow installed it is
+# kept as a directory of zstd-compressed Parquet files (or Arrow IPC files with
+# SCRAPER_STORAGE=arrow), all with the same explicit schema: every column is a
+# string and missing values are nulls, so nothing is re-inferred on reading
+# and a reader can load only the columns it needs.  Appending writes one more
+# part file instead of rewriting the dataset:
+#
+#     all_data = Dataset("all_data.csv", final_columns).open()   # -> all_data.parquet/
+#     all_data.append(df_new_records)
+#     df = all_data.read(["Email Address"])
+#
+# open() imports the existing CSV the first time.  The CSV itself is no longer
+# written; export it when someone needs it:
+#
+#     python datasets.py export all_data.csv data.csv   (or python cli.py export)
+#
+# The scrapers still write all_data_<state>.csv.  read_input() reads those as
+# strings and keeps a columnar copy next to them (all_data_<state>.parquet/)
+# that is used until the CSV changes.
+#
+# Without pyarrow, or with SCRAPER_STORAGE=csv, everything stays plain CSV.
+
+STORAGE_ENV = "SCRAPER_STORAGE"
+STORAGE = os.environ.get(STORAGE_ENV) or ("parquet" if pa is not None else "csv")
+COMPRESSION = "zstd"
+META_FILE = "dataset.json"
+
+
+def schema(columns):
+    """Explicit schema of a dataset: every column is a nullable string"""
+    return pa.schema([pa.field(column, pa.string()) for column in columns])
+
+
+class Dataset:
+    def __init__(self, csv_path, columns=None, storage=None):
+        """
+        Args:
+            csv_path (str): The CSV the dataset replaces (also where export_csv writes)
+            columns (list): Columns of the dataset (default: those of the existing dataset or CSV)
+            storage (str): "parquet", "arrow" or "csv" (default: SCRAPER_STORAGE)
+        """
+        self.csv_path = csv_path
+        self.storage = storage or STORAGE
+        if self.storage not in ("parquet", "arrow", "csv"):
+            raise ValueError(f"Unknown storage {self.storage!r} (parquet, arrow or csv)")
+        if self.columnar and pa is None:
+            raise RuntimeError(f"{self.storage} storage needs pyarrow (pip install pyarrow)")
+        self.path = csv_path if not self.columnar else os.path.splitext(csv_path)[0] + "." + self.storage
+        self.meta_path = os.path.join(self.path, META_FILE)
+        self.columns = list(columns) if columns else self.meta().get("columns")
+
+    @property
+    def columnar(self):
+        return self.storage != "csv"
+
+    def exists(self):
+        return os.path.exists(self.meta_path if self.columnar else self.path)
+
+    def meta(self):
+        if not self.columnar:
+            return {}
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, **extra):
+        meta = {"columns": self.columns, "storage": self.storage, "compression": COMPRESSION, **extra}
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, self.meta_path)
+
+    def parts(self):
+        """The dataset's part files in the order they were written"""
+        if not self.columnar or not os.path.isdir(self.path):
+            return []
+        suffix = "." + self.storage
+        return sorted(os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith(suffix))
+
+    def size(self):
+        """Bytes on disk (changes whenever data is written)"""
+        if not self.columnar:
+            return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return sum(os.path.getsize(part) for part in self.parts())
+
+    def open(self, convert=None):
+        """
+        Create the dataset, importing the existing CSV into it the first time
+
+        Args:
+            convert (callable): convert(df) -> DataFrame applied to the imported CSV (e.g. to re-key it)
+        """
+        if self.columnar and not self.exists():
+            if os.path.exists(self.csv_path):
+                df = pd.read_csv(self.csv_path, dtype=str)
+                if convert is not None:
+                    df = convert(df)
+                self.columns = self.columns or list(df.columns)
+                self.replace(df)
+                print(f"Imported {self.csv_path} into {self.path} ({len(df)} rows)")
+            elif self.columns:
+                self._write_meta()
+        return self
+
+    def _empty(self, columns=None):
+        return pd.DataFrame(columns=columns or self.columns or [])
+
+    def read(self, columns=None):
+        """
+        Read the dataset (or some of its columns) as strings, missing values as NA
+
+        Returns:
+            DataFrame: Empty (with the dataset's columns) if there is no data yet
+        """
+        if not self.columnar:
+            if not os.path.exists(self.path):
+                return self._empty(columns)
+            return pd.read_csv(self.path, usecols=columns, dtype=str)
+        tables = [self._read_part(part, columns) for part in self.parts()]
+        if not tables:
+            return self._empty(columns)
+        return pa.concat_tables(tables).to_pandas(types_mapper={pa.string(): pd.StringDtype()}.get)
+
+    def _read_part(self, part, columns):
+        if self.storage == "parquet":
+            return pq.read_table(part, columns=columns)
+        with pa.OSFile(part, "rb") as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.select(columns) if columns else table
+
+    def _write_part(self, df):
+        columns = self.columns or list(df.columns)
+        # Categoricals and object columns alike are stored as plain strings
+        table = pa.Table.from_pandas(df[columns].astype("string"), schema=schema(columns), preserve_index=False)
+        os.makedirs(self.path, exist_ok=True)
+        name = f"part-{time.time_ns()}-{os.getpid()}-{threading.get_ident()}.{self.storage}"
+        part = os.path.join(self.path, name)
+        tmp_path = part + ".tmp"
+        if self.storage == "parquet":
+            pq.write_table(table, tmp_path, compression=COMPRESSION)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=COMPRESSION)
+            with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, part)
+        return part
+
+    def append(self, df):
+        """Add rows to the dataset (a new part file, or appended to the CSV)"""
+        if not self.columnar:
+            if len(df) == 0 and os.path.exists(self.path):
+                return
+            df.to_csv(self.path, mode="a", header=not os.path.exists(self.path), index=False)
+            return
+        self.columns = self.columns or list(df.columns)
+        if len(df):
+            self._write_part(df)
+        if not os.path.exists(self.meta_path):
+            self._write_meta()
+
+    def replace(self, df, **meta):
+        """Replace the dataset's contents with df (extra keyword arguments are kept in its metadata)"""
+        if not self.columnar:
+            df.to_csv(self.path, index=False)
+            return
+        self.columns = self.columns or list(df.columns)
+        old_parts = self.parts()
+        new_part = self._write_part(df)
+        self._write_meta(**meta)
+        for part in old_parts:
+            if part != new_part:
+                os.remove(part)
+
+    def compact(self):
+        """Rewrite the dataset as a single part file"""
+        if self.columnar and len(self.parts()) > 1:
+            meta = {key: value for key, value in self.meta().items() if key not in ("columns", "storage", "compression")}
+            self.replace(self.read(), **meta)
+
+    def export_csv(self, path=None):
+        """Write the dataset as a CSV (default: the CSV it replaces)"""
+        path = path or self.csv_path
+        if not self.columnar and os.path.abspath(path) == os.path.abspath(self.path):
+            return path
+        df = self.read()
+        df.to_csv(path, index=False)
+        return path
+
+
+def read_input(csv_path, columns=None):
+    """
+    Read a scraper's output CSV as strings, through its columnar copy while that is current
+
+    Args:
+        csv_path (str): e.g. all_data_texas.csv
+        columns (list): Only these columns (like usecols)
+    """
+    copy = Dataset(csv_path)
+    if not copy.columnar:
+        return pd.read_csv(csv_path, usecols=columns, dtype=str)
+    stat = os.stat(csv_path)
+    source = {"size": stat.st_size, "mtime": stat.st_mtime}
+    if copy.exists() and copy.meta().get("source") == source:
+        return copy.read(columns)
+    df = pd.read_csv(csv_path, dtype=str)
+    copy.columns = list(df.columns)
+    copy.replace(df, source=source)
+    return df[columns] if columns else df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or compact the columnar datasets")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    export = subcommands.add_parser("export", help="Write datasets back out as CSV")
+    export.add_argument("datasets", nargs="*", default=["all_data.csv", "data.csv"],
+                        help="CSV names of the datasets (default: all_data.csv data.csv)")
+    compact = subcommands.add_parser("compact", help="Merge each dataset's part files into one")
+    compact.add_argument("datasets", nargs="*", default=["all_data.csv", "data.csv"])
+    args = parser.parse_args(argv)
+
+    for csv_path in args.datasets:
+        dataset = Dataset(csv_path)
+        if dataset.columnar and not dataset.exists():
+            print(f"{dataset.path}: no such dataset")
+            continue
+        if args.command == "export":
+            print(f"{dataset.path} -> {dataset.export_csv()}")
+        else:
+            dataset.compact()
+            print(f"{dataset.path}: {len(dataset.parts())} part(s), {dataset.size()} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
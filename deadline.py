@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Time budgets for scrapers and their work units, with cooperative cancellation.
+#
+# ProcessAll.py (or cli.py scrape --budget) gives every scraper a deadline
+# through SCRAPER_DEADLINE (a Unix timestamp).  The long loops check it before
+# each unit of work and stop cleanly once it has passed:
+#
+#     for date in dates:
+#         if deadline.expired():
+#             deadline.mark_incomplete("southcarolina", "deadline reached", done=i, total=len(dates))
+#             break
+#
+# What was scraped so far is saved as usual and the checkpoint is kept, so the
+# next run resumes where this one stopped.  mark_incomplete() writes
+# incomplete.json in the working directory; ProcessAll.py reports the scraper
+# as partial and records it in source_status.json, which DATA_INTEGRATION.py
+# prints next to the merged counts.
+#
+# A single work unit can get a tighter budget of its own:
+#
+#     with deadline.unit(DETAIL_PAGE_BUDGET) as budget:
+#         ...
+#     if budget.expired():
+#         print("took too long, skipped")
+#
+# Every wait in waits.py is capped by the innermost budget, so an expired unit
+# (or scraper) falls through its remaining waits instead of sitting in them.
+
+DEADLINE_ENV = "SCRAPER_DEADLINE"
+MARKER = "incomplete.json"
+STATUS_FILE = "source_status.json"
+
+# Waits still get this long after a budget expired, so the scraper can wind down
+MIN_WAIT = 0.5
+
+
+class Budget:
+    def __init__(self, seconds=None, until=None):
+        """
+        A point in time after which work should stop
+
+        Args:
+            seconds (float): Budget from now, or
+            until (float): Unix timestamp of the deadline (None: no limit)
+        """
+        self.until = until if seconds is None else time.time() + seconds
+
+    def remaining(self):
+        """Seconds left (None when there is no limit)"""
+        if self.until is None:
+            return None
+        return max(0.0, self.until - time.time())
+
+    def expired(self):
+        return self.until is not None and time.time() >= self.until
+
+
+_units = threading.local()
+
+
+def scraper_budget():
+    """The deadline of the running scraper (from SCRAPER_DEADLINE)"""
+    try:
+        return Budget(until=float(os.environ[DEADLINE_ENV]))
+    except (KeyError, ValueError):
+        return Budget()
+
+
+def current():
+    """The innermost budget of this thread (a work unit's, else the scraper's)"""
+    stack = getattr(_units, "stack", None)
+    if stack:
+        return stack[-1]
+    return scraper_budget()
+
+
+def expired():
+    """True once the scraper's deadline has passed (check it before every work unit)"""
+    return scraper_budget().expired()
+
+
+def remaining():
+    return current().remaining()
+
+
+def cap(timeout):
+    """Shorten a wait's timeout so it ends by the current budget's deadline"""
+    left = current().remaining()
+    if left is None:
+        return timeout
+    return min(timeout, max(MIN_WAIT, left))
+
+
+@contextmanager
+def unit(seconds):
+    """
+    Run a work unit with its own budget (never later than the enclosing one)
+
+    Yields:
+        Budget: Check budget.expired() afterwards to tell a cut-short unit apart
+    """
+    outer = current()
+    budget = Budget(seconds)
+    if outer.until is not None and outer.until < budget.until:
+        budget.until = outer.until
+    if not hasattr(_units, "stack"):
+        _units.stack = []
+    _units.stack.append(budget)
+    try:
+        yield budget
+    finally:
+        _units.stack.remove(budget)
+
+
+def mark_incomplete(site, reason="deadline reached", done=None, total=None, directory=None):
+    """Record that this run of a scraper stopped before finishing (incomplete.json)"""
+    path = os.path.join(directory or os.getcwd(), MARKER)
+    status = {"site": site, "reason": reason, "done": done, "total": total,
+              "at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(status, f, indent=2)
+    progress = f" after {done}/{total}" if done is not None and total is not None else ""
+    print(f"{site}: {reason}{progress}; stopping with partial results (the next run resumes from here)")
+    return status
+
+
+def read_marker(directory=None):
+    """Return the incomplete.json of a working directory, or None if the run finished"""
+    path = os.path.join(directory or os.getcwd(), MARKER)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def clear_marker(directory=None):
+    path = os.path.join(directory or os.getcwd(), MARKER)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def load_incomplete(directory=None):
+    """Sources the last orchestrated run left incomplete, from source_status.json ({name: status})"""
+    path = os.path.join(directory or os.getcwd(), STATUS_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            sources = json.load(f).get("sources", {})
+    except (OSError, ValueError):
+        return {}
+    return {name: status for name, status in sources.items() if not status.get("complete", True)}
@@ -0,0 +1,206 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+import deadline
+
+# Watches a download directory for finished downloads.
+#
+# Chrome writes a download to "<name>.crdownload" and renames it to its final
+# name when it is complete, so the final rename is the signal we wait for.  On
+# Linux this uses inotify (no extra packages needed), elsewhere it falls back to
+# polling the directory.  Several downloads can be in flight at the same time:
+# each completed file is handed out once, in the order it finished.
+
+TEMP_SUFFIXES = (".crdownload", ".tmp", ".part")
+DEFAULT_EXTENSIONS = (".csv", ".xlsx", ".xls", ".txt", ".pdf")
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_inotify():
+    """Return libc if it provides inotify, otherwise None"""
+    if not hasattr(os, "O_NONBLOCK"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError, TypeError):
+        return None
+    return libc
+
+
+class DownloadWatcher:
+    def __init__(self, directory=None, extensions=DEFAULT_EXTENSIONS, exclude=(), use_inotify=True, poll_interval=0.2):
+        """
+        Watch a directory for completed downloads
+
+        Args:
+            directory (str): Directory the browser downloads into (default: cwd)
+            extensions (tuple): File extensions that count as downloads
+            exclude (tuple): File names to ignore (e.g. the master CSV we write ourselves)
+            use_inotify (bool): Set to False to force the polling fallback
+            poll_interval (float): Seconds between directory scans when polling
+        """
+        self.directory = os.path.abspath(directory or os.getcwd())
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.exclude = set(exclude)
+        self.use_inotify = use_inotify
+        self.poll_interval = poll_interval
+        self.completed = []
+        self.condition = threading.Condition()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.fd = None
+        self.mode = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _snapshot(self):
+        files = {}
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                files[name] = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+        return files
+
+    def _is_download(self, name):
+        lower = name.lower()
+        if name in self.exclude or lower.endswith(TEMP_SUFFIXES) or name.startswith("."):
+            return False
+        return lower.endswith(self.extensions)
+
+    def _complete(self, name):
+        path = os.path.join(self.directory, name)
+        with self.condition:
+            if path in self.completed:
+                return
+            self.completed.append(path)
+            self.condition.notify_all()
+
+    def start(self):
+        """Start watching; anything already in the directory is ignored"""
+        os.makedirs(self.directory, exist_ok=True)
+        libc = _load_inotify() if self.use_inotify else None
+        if libc is not None:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                mask = IN_CLOSE_WRITE | IN_MOVED_TO
+                if libc.inotify_add_watch(fd, self.directory.encode(), mask) >= 0:
+                    self.fd = fd
+                    self.mode = "inotify"
+                else:
+                    os.close(fd)
+        if self.fd is None:
+            self.mode = "polling"
+            self.initial = self._snapshot()
+
+        target = self._inotify_loop if self.mode == "inotify" else self._poll_loop
+        self.thread = threading.Thread(target=target, daemon=True)
+        self.thread.start()
+        return self
+
+    def _inotify_loop(self):
+        while not self.stopped.is_set():
+            ready, _, _ = select.select([self.fd], [], [], 0.5)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                if not name or not self._is_download(name):
+                    continue
+                path = os.path.join(self.directory, name)
+                if mask & IN_MOVED_TO:
+                    # Chrome renamed the finished .crdownload to its final name
+                    self._complete(name)
+                elif mask & IN_CLOSE_WRITE:
+                    # Written directly (not via a temp file). Chrome also creates an
+                    # empty placeholder under the final name while downloading, skip it.
+                    if os.path.exists(path + ".crdownload"):
+                        continue
+                    try:
+                        if os.path.getsize(path) > 0:
+                            self._complete(name)
+                    except OSError:
+                        continue
+
+    def _poll_loop(self):
+        while not self.stopped.wait(self.poll_interval):
+            current = self._snapshot()
+            for name, mtime in current.items():
+                if not self._is_download(name) or self.initial.get(name) == mtime:
+                    continue
+                path = os.path.join(self.directory, name)
+                if os.path.exists(path + ".crdownload"):
+                    continue
+                try:
+                    if os.path.getsize(path) == 0:
+                        continue
+                except OSError:
+                    continue
+                self.initial[name] = mtime
+                self._complete(name)
+
+    def wait_for_download(self, timeout=30):
+        """
+        Wait for the next finished download and return its path
+
+        Returns:
+            str: Path of the completed file, or None on timeout
+        """
+        files = self.wait_for_downloads(1, timeout)
+        return files[0] if files else None
+
+    def wait_for_downloads(self, count, timeout=60):
+        """
+        Wait until count downloads have finished
+
+        Returns:
+            list: Paths of the completed files (fewer than count on timeout)
+        """
+        # Capped by the scraper's (or work unit's) deadline like every other wait
+        until = time.time() + deadline.cap(timeout)
+        with self.condition:
+            while len(self.completed) < count:
+                remaining = until - time.time()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            files = self.completed[:count]
+            self.completed = self.completed[count:]
+        return files
+
+    def close(self):
+        """Stop watching"""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,412 @@
+import atexit
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+import cassette
+import waits
+from network_capture import CAPTURE_EXPORTS, drain_performance_log
+
+# Shared Chrome instances for all the scrapers.
+#
+# Starting Chrome (and resolving chromedriver) costs several seconds, so instead
+# of every script building its own browser they borrow one from a per-process
+# pool, and a scraper that leases a browser several times (Georgia) only pays the
+# cold start once.  Every lease gets a clean profile (cookies, cache and storage
+# wiped) and its own download directory.  Storage (localStorage, IndexedDB,
+# service workers) can only be cleared per origin, so the pool collects the
+# origins each browser's tabs navigated to and clears every one of them.
+#
+# A process has at most one live browser, so ProcessAll's --max-browsers is a
+# real cap: each pool starts one browser, and leasing from one pool quits the
+# idle browsers of the others (another headless mode or profile) first.
+#
+# close_all_pools() quits the browsers.  It runs at exit in a standalone script;
+# ProcessAll.py calls it at the end of every task, because the workers of a
+# process pool never run atexit handlers.
+#
+# Browsers come in two profiles.  "default" behaves like a normal Chrome.
+# "throughput" returns from driver.get() as soon as the DOM is ready
+# (pageLoadStrategy=eager) and blocks images, fonts, media and analytics through
+# the DevTools protocol, which is what the page-heavy scrapers (Georgia loads a
+# detail page per candidate) want.  Sites that need some of those resources can
+# allow them in SITE_ALLOWLIST.
+
+PROFILES = ("default", "throughput")
+
+# URL patterns blocked by the throughput profile, per resource category.
+# Network.setBlockedURLs matches the whole URL, so every "*.ext" pattern is also
+# blocked as "*.ext?*" (logo.png?v=3); see blocked_url_patterns().
+BLOCKED_RESOURCES = {
+    "images": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.bmp", "*.ico", "*.svg"],
+    "fonts": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "media": ["*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav", "*.m4a"],
+    "analytics": [
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        "*connect.facebook.net*", "*hotjar.com*", "*clarity.ms*",
+        "*nr-data.net*", "*js-agent.newrelic.com*", "*siteimproveanalytics.com*",
+    ],
+}
+
+# Categories or URL patterns each site still needs under the throughput profile
+SITE_ALLOWLIST = {
+    # The pagination buttons are md-icon elements loaded as svg icons
+    "georgia": ["*.svg"],
+}
+
+# The resolved chromedriver path is cached on disk together with the Chrome
+# version it was resolved for, so ChromeDriverManager().install() (which does a
+# network version check) only runs again after Chrome is updated.
+DRIVER_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "election-scraper", "chromedriver.json")
+
+CHROME_BINARIES = [
+    "google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+]
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def installed_chrome_version():
+    """Return the installed Chrome version (e.g. '126.0.6478.126'), or None if unknown"""
+    for binary in CHROME_BINARIES:
+        try:
+            output = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        match = re.search(r"(\d+\.\d+\.\d+\.\d+)", output)
+        if match:
+            return match.group(1)
+    return None
+
+
+def resolve_chromedriver(refresh=False):
+    """
+    Return the chromedriver path, using the on-disk cache when it is still valid
+
+    Args:
+        refresh (bool): Ignore the cache and resolve the driver again
+
+    Returns:
+        str: Path to chromedriver, or None to let Selenium Manager find it
+    """
+    override = os.environ.get("SCRAPER_CHROMEDRIVER")
+    if override:
+        return override
+
+    chrome_version = installed_chrome_version()
+    major = chrome_version.split(".")[0] if chrome_version else None
+
+    if not refresh and os.path.exists(DRIVER_CACHE):
+        try:
+            with open(DRIVER_CACHE, encoding="utf-8") as f:
+                cached = json.load(f)
+            same_chrome = major is None or cached.get("chrome_major") == major
+            if same_chrome and os.path.exists(cached.get("path", "")):
+                return cached["path"]
+        except (OSError, ValueError):
+            pass
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+    except ImportError:
+        # Fall back to Selenium Manager to locate chromedriver
+        return None
+    path = ChromeDriverManager().install()
+
+    os.makedirs(os.path.dirname(DRIVER_CACHE), exist_ok=True)
+    with open(DRIVER_CACHE, "w", encoding="utf-8") as f:
+        json.dump({"path": path, "chrome_version": chrome_version, "chrome_major": major}, f, indent=2)
+    return path
+
+
+def driver_service():
+    """Return a chromedriver Service, resolving the driver binary once per process"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            path = resolve_chromedriver()
+            _service = Service(path) if path else Service()
+        return _service
+
+
+def blocked_url_patterns(site=None):
+    """Return the URL patterns the throughput profile blocks on the given site"""
+    allowed = SITE_ALLOWLIST.get(site, [])
+    patterns = []
+    for category, category_patterns in BLOCKED_RESOURCES.items():
+        if category in allowed:
+            continue
+        for pattern in category_patterns:
+            if pattern in allowed:
+                continue
+            patterns.append(pattern)
+            if pattern.startswith("*."):
+                # Same file with a query string (cache busters on CMS assets)
+                patterns.append(pattern + "?*")
+    return patterns
+
+
+def build_chrome_options(headless=True, download_dir=None, user_data_dir=None, capture_network=False,
+                         profile="default"):
+    """Build the Chrome options shared by every scraper"""
+    chrome_options = Options()
+    if profile == "throughput":
+        # Don't wait for images, stylesheets and subframes before driver.get() returns
+        chrome_options.page_load_strategy = "eager"
+    if headless:
+        chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-notifications")
+    chrome_options.add_argument("--disable-popup-blocking")
+    chrome_options.add_argument("--window-size=1920,1080")
+    if user_data_dir:
+        chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
+    # Record/replay runs send all traffic through the cassette proxy (see cassette.py)
+    for argument in cassette.chrome_arguments():
+        chrome_options.add_argument(argument)
+
+    prefs = {
+        "download.default_directory": download_dir or os.getcwd(),
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": True,
+        # Allow several downloads from one page without a permission prompt
+        "profile.default_content_setting_values.automatic_downloads": 1
+    }
+    chrome_options.add_experimental_option("prefs", prefs)
+    if capture_network:
+        # Needed to read DevTools Network events (see network_capture.py)
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return chrome_options
+
+
+class DriverPool:
+    def __init__(self, headless=True, max_size=1, capture_network=CAPTURE_EXPORTS, profile="default"):
+        """
+        Pool of long-lived Chrome drivers
+
+        Args:
+            headless (bool): Run the pooled browsers in headless mode
+            max_size (int): Maximum number of browsers this pool will start
+            capture_network (bool): Record DevTools Network events for export capture
+            profile (str): Browser profile, one of PROFILES
+        """
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown browser profile: {profile}")
+        self.headless = headless
+        self.profile = profile
+        self.max_size = max_size
+        self.capture_network = capture_network
+        self.idle = []
+        self.in_use = set()
+        self.profiles = {}
+        self.origins = {}
+        self.lock = threading.Condition()
+
+    def _start_driver(self):
+        """Start a new Chrome with its own throwaway profile directory"""
+        profile_dir = tempfile.mkdtemp(prefix="scraper-profile-")
+        options = build_chrome_options(self.headless, user_data_dir=profile_dir,
+                                       capture_network=self.capture_network, profile=self.profile)
+        driver = webdriver.Chrome(service=driver_service(), options=options)
+        self.profiles[id(driver)] = profile_dir
+        waits.install_request_tracker(driver)
+        return driver
+
+    def _discard(self, driver):
+        """Quit a driver and remove its profile directory"""
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        self.origins.pop(id(driver), None)
+        profile_dir = self.profiles.pop(id(driver), None)
+        if profile_dir:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+
+    def _collect_origins(self, driver):
+        """Remember the origins the current tab navigated to (from its navigation history)"""
+        origins = self.origins.setdefault(id(driver), set())
+        for entry in driver.execute_cdp_cmd("Page.getNavigationHistory", {}).get("entries", []):
+            parts = urlsplit(entry.get("url", ""))
+            if parts.scheme in ("http", "https") and parts.netloc:
+                origins.add(f"{parts.scheme}://{parts.netloc}")
+
+    @staticmethod
+    def _is_alive(driver):
+        try:
+            driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def _reset(self, driver, download_dir, user_agent=None, site=None):
+        """Give a driver a clean session and point its downloads at download_dir"""
+        # Close any extra tabs opened by the previous lease
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            self._collect_origins(driver)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        self._collect_origins(driver)
+        driver.get("about:blank")
+
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        for origin in self.origins.pop(id(driver), set()):
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": user_agent or ""})
+        if self.profile == "throughput":
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_url_patterns(site)})
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": download_dir
+        })
+        driver.download_dir = download_dir
+
+    def acquire(self, download_dir=None, user_agent=None, site=None):
+        """
+        Borrow a driver from the pool, starting a new one if none is idle
+
+        Args:
+            download_dir (str): Directory downloads go to during this lease (default: cwd)
+            user_agent (str): Optional user agent override for this lease
+            site (str): Site key used for the throughput profile's allowlist
+        """
+        download_dir = os.path.abspath(download_dir or os.getcwd())
+        os.makedirs(download_dir, exist_ok=True)
+
+        with self.lock:
+            while True:
+                while self.idle:
+                    driver = self.idle.pop()
+                    if self._is_alive(driver):
+                        break
+                    self._discard(driver)
+                else:
+                    driver = None
+                if driver is not None or len(self.in_use) < self.max_size:
+                    break
+                self.lock.wait()
+            if driver is None:
+                driver = self._start_driver()
+            self.in_use.add(driver)
+
+        try:
+            self._reset(driver, download_dir, user_agent, site)
+        except Exception:
+            # The browser went away while idle - replace it
+            with self.lock:
+                self.in_use.discard(driver)
+            self._discard(driver)
+            with self.lock:
+                driver = self._start_driver()
+                self.in_use.add(driver)
+            self._reset(driver, download_dir, user_agent, site)
+        return driver
+
+    def release(self, driver):
+        """Return a driver to the pool"""
+        with self.lock:
+            if driver not in self.in_use:
+                return
+            self.in_use.discard(driver)
+            if self._is_alive(driver):
+                try:
+                    # The tab's history only keeps the last 50 entries, so collect them per lease too
+                    self._collect_origins(driver)
+                    driver.get("about:blank")
+                    if self.capture_network:
+                        drain_performance_log(driver)
+                    self.idle.append(driver)
+                except Exception:
+                    self._discard(driver)
+            else:
+                self._discard(driver)
+            self.lock.notify()
+
+    @contextmanager
+    def lease(self, download_dir=None, user_agent=None, site=None):
+        """Context manager version of acquire()/release()"""
+        driver = self.acquire(download_dir, user_agent, site)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close_idle(self):
+        """Quit the browsers nobody is using"""
+        with self.lock:
+            for driver in self.idle:
+                self._discard(driver)
+            self.idle = []
+
+    def close(self):
+        """Quit every browser owned by this pool"""
+        with self.lock:
+            for driver in self.idle + list(self.in_use):
+                self._discard(driver)
+            self.idle = []
+            self.in_use = set()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(headless=True, profile="default"):
+    """Return the process-wide pool for the given headless mode and browser profile"""
+    with _pools_lock:
+        key = (headless, profile)
+        if key not in _pools:
+            _pools[key] = DriverPool(headless=headless, profile=profile)
+        return _pools[key]
+
+
+def acquire_driver(download_dir=None, headless=True, user_agent=None, profile="default", site=None):
+    """
+    Borrow a Chrome driver from the shared pool
+
+    Args:
+        download_dir (str): Directory downloads go to (default: cwd)
+        headless (bool): Use a headless browser
+        user_agent (str): Optional user agent override
+        profile (str): "default" or "throughput" (eager loads, resource blocking)
+        site (str): Site key for the throughput allowlist (see SITE_ALLOWLIST)
+    """
+    pool = get_pool(headless, profile)
+    # One live browser per process: don't keep another pool's idle browser next to this one
+    with _pools_lock:
+        others = [other for other in _pools.values() if other is not pool]
+    for other in others:
+        other.close_idle()
+    driver = pool.acquire(download_dir, user_agent, site)
+    driver.pool_key = (headless, profile)
+    return driver
+
+
+def release_driver(driver):
+    """Give a driver borrowed with acquire_driver() back to the pool"""
+    get_pool(*getattr(driver, "pool_key", (True, "default"))).release(driver)
+
+
+@atexit.register
+def close_all_pools():
+    for pool in list(_pools.values()):
+        pool.close()
@@ -0,0 +1,371 @@
+import asyncio
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode, urlsplit
+
+import cassette
+import http_cache
+import rate_limit
+
+# Shared asyncio HTTP client for the steps that don't need a browser.
+#
+# One engine keeps a pool of keep-alive connections (HTTP/2 when the server and
+# the h2 package support it), limits how many requests run against each host at
+# the same time, streams large bodies straight to disk and retries connection
+# errors, timeouts, 429 and 5xx responses with exponential backoff (honouring
+# Retry-After).  Every attempt also goes through the adaptive per-host limiter in
+# rate_limit.py, so the request rate follows what each portal tolerates.  GET
+# responses are kept in the persistent HTTP cache (http_cache.py): fresh ones
+# are served from disk, stale ones are revalidated with a conditional request,
+# and result.from_cache is True when the body didn't have to be downloaded.
+# Under record/replay (cassette.py) requests go through the cassette proxy and
+# the HTTP cache is bypassed, so the cassette sees every exchange.
+# Scrapers can fetch hundreds of documents concurrently:
+#
+#     with FetchEngine() as engine:
+#         results = engine.run(engine.fetch_all(urls))
+#
+# or use the blocking helpers fetch() / download() for a single request.
+#
+# httpx is used when it is installed (pip install "httpx[http2]"); otherwise the
+# engine falls back to a pooled requests.Session run in worker threads, which has
+# the same interface but no HTTP/2.
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = httpx is not None
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+CHUNK_SIZE = 64 * 1024
+
+
+class FetchError(Exception):
+    """Raised when a request still fails after all retries"""
+
+    def __init__(self, url, message, status=None):
+        super().__init__(f"{url}: {message}")
+        self.url = url
+        self.status = status
+
+
+class FetchResult:
+    def __init__(self, url, status, headers, content=b"", path=None, elapsed=0.0, from_cache=False):
+        """Outcome of one request (content is empty when the body was streamed to path)"""
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.content = content
+        self.path = path
+        self.elapsed = elapsed
+        self.from_cache = from_cache
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def __repr__(self):
+        return f"<FetchResult {self.status} {self.url}>"
+
+
+def retry_after_seconds(headers, default):
+    """Return the delay requested by a Retry-After header (seconds or HTTP date)"""
+    value = {k.lower(): v for k, v in headers.items()}.get("retry-after")
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class FetchEngine:
+    def __init__(self, max_connections=20, per_host=4, retries=3, timeout=30, http2=True,
+                 headers=None, backoff=1.0, rate_limiter=rate_limit.limiter, cache=http_cache.cache):
+        """
+        Pooled asyncio HTTP client
+
+        Args:
+            max_connections (int): Connections kept open across all hosts
+            per_host (int): Requests allowed in flight against one host
+            retries (int): Extra attempts for connection errors, timeouts, 429 and 5xx
+            timeout (float): Seconds before a request times out
+            http2 (bool): Use HTTP/2 where available
+            headers (dict): Headers sent with every request (default: DEFAULT_HEADERS)
+            backoff (float): First retry delay in seconds, doubled on every attempt
+            rate_limiter (RateLimiter): Adaptive per-host limiter (None: only per_host applies)
+            cache (HttpCache): Persistent cache for GET responses (None: always download)
+        """
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.retries = retries
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self.backoff = backoff
+        self.rate_limiter = rate_limiter
+        self.cache = None if cassette.active() else cache
+        self.client = None
+        self.session = None
+        self.host_limits = {}
+        self.loop = None
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def open(self):
+        """Create the connection pool (called automatically by the first request)"""
+        if self.client is not None or self.session is not None:
+            return self
+        # The cassette proxy terminates TLS with its own certificate
+        proxy = cassette.proxy_url() if cassette.active() else None
+        if httpx is not None:
+            self.client = httpx.AsyncClient(
+                http2=self.http2,
+                headers=self.headers,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                proxy=proxy,
+                verify=proxy is None,
+            )
+        else:
+            import requests
+            from requests.adapters import HTTPAdapter
+            self.session = requests.Session()
+            self.session.headers.update(self.headers)
+            if proxy:
+                import urllib3
+                urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+                self.session.proxies.update({"http": proxy, "https": proxy})
+                self.session.verify = False
+            adapter = HTTPAdapter(pool_connections=self.max_connections, pool_maxsize=self.max_connections)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+        return self
+
+    async def aclose(self):
+        """Close every pooled connection"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    def __enter__(self):
+        # Blocking use: the engine owns an event loop until close()
+        self.loop = asyncio.new_event_loop()
+        self.run(self.open())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def run(self, coroutine):
+        """Run a coroutine on the engine's event loop (inside a with block)"""
+        return self.loop.run_until_complete(coroutine)
+
+    def close(self):
+        if self.loop is not None:
+            self.run(self.aclose())
+            self.loop.close()
+            self.loop = None
+
+    # -- requests ----------------------------------------------------------
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self.host_limits[host]
+
+    async def _send(self, method, url, path=None, **kwargs):
+        """Send one request, streaming the body to path if given"""
+        start = time.time()
+        if self.client is not None:
+            async with self.client.stream(method, url, **kwargs) as response:
+                if path is not None and 200 <= response.status_code < 300:
+                    tmp_path = path + ".part"
+                    with open(tmp_path, "wb") as f:
+                        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                            f.write(chunk)
+                    os.replace(tmp_path, path)
+                    return FetchResult(str(response.url), response.status_code, dict(response.headers),
+                                       b"", path, time.time() - start)
+                content = await response.aread()
+                return FetchResult(str(response.url), response.status_code, dict(response.headers),
+                                   content, None, time.time() - start)
+
+        def blocking():
+            # verify is passed explicitly, otherwise REQUESTS_CA_BUNDLE overrides the session's setting
+            response = self.session.request(method, url, stream=path is not None, timeout=self.timeout,
+                                            verify=self.session.verify, **kwargs)
+            try:
+                if path is not None and response.ok:
+                    tmp_path = path + ".part"
+                    with open(tmp_path, "wb") as f:
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            f.write(chunk)
+                    os.replace(tmp_path, path)
+                    return FetchResult(response.url, response.status_code, dict(response.headers),
+                                       b"", path, time.time() - start)
+                return FetchResult(response.url, response.status_code, dict(response.headers),
+                                   response.content, None, time.time() - start)
+            finally:
+                response.close()
+
+        return await asyncio.to_thread(blocking)
+
+    def _is_transient(self, error):
+        if httpx is not None:
+            return isinstance(error, (httpx.TransportError, httpx.TimeoutException))
+        import requests
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def _cache_key(self, url, method, kwargs):
+        """URL the response is cached under, or None if the request isn't cacheable"""
+        if self.cache is None or method.upper() != "GET":
+            return None
+        if any(name in kwargs for name in ("data", "json", "files", "content")):
+            return None
+        params = kwargs.get("params")
+        if not params:
+            return url
+        query = urlencode(sorted(params.items()) if isinstance(params, dict) else params)
+        return url + ("&" if "?" in url else "?") + query
+
+    def _from_cache(self, entry, path, elapsed=0.0):
+        if path is not None:
+            entry.copy_to(path)
+            return FetchResult(entry.url, entry.status, entry.headers, b"", path, elapsed, from_cache=True)
+        return FetchResult(entry.url, entry.status, entry.headers, entry.content, None, elapsed, from_cache=True)
+
+    async def fetch(self, url, method="GET", path=None, **kwargs):
+        """
+        Request url, retrying transient failures (GET responses go through the HTTP cache)
+
+        Args:
+            url (str): URL to request
+            method (str): HTTP method
+            path (str): Stream a successful body to this file instead of keeping it in memory
+            **kwargs: Passed to the HTTP client (params, data, headers, ...)
+
+        Returns:
+            FetchResult: The final response (also for non-retryable 4xx statuses);
+                         from_cache is True when the stored body was still valid
+
+        Raises:
+            FetchError: The request failed with a connection error, timeout, 429 or
+                        5xx on every attempt
+        """
+        cache_key = self._cache_key(url, method, kwargs)
+        entry = self.cache.get(cache_key) if cache_key else None
+        if entry is not None:
+            if entry.is_fresh():
+                self.cache.count("fresh")
+                return self._from_cache(entry, path)
+            # Headers given by the caller win over the validators
+            kwargs["headers"] = {**entry.conditional_headers(), **(kwargs.get("headers") or {})}
+
+        await self.open()
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                async with self._host_limit(url):
+                    if self.rate_limiter is None:
+                        result = await self._send(method, url, path, **kwargs)
+                    else:
+                        async with self.rate_limiter.request_async(url) as slot:
+                            result = await self._send(method, url, path, **kwargs)
+                            slot.report(result.status,
+                                        retry_after=retry_after_seconds(result.headers, None))
+            except Exception as e:
+                if not self._is_transient(e):
+                    raise
+                if last_attempt:
+                    raise FetchError(url, f"{type(e).__name__}: {e}") from e
+                wait = delay
+            else:
+                if result.status not in RETRY_STATUSES:
+                    return self._update_cache(cache_key, entry, path, result)
+                if last_attempt:
+                    raise FetchError(url, f"HTTP {result.status}", result.status)
+                wait = retry_after_seconds(result.headers, delay)
+            await asyncio.sleep(wait + random.uniform(0, wait / 4))
+            delay *= 2
+
+    def _update_cache(self, cache_key, entry, path, result):
+        """Store a new response, or answer a 304 with the stored body"""
+        if cache_key is None:
+            return result
+        if result.status == 304 and entry is not None:
+            self.cache.revalidated(entry, result.headers)
+            return self._from_cache(entry, path, result.elapsed)
+        self.cache.count("misses")
+        if result.ok:
+            self.cache.store(cache_key, result.status, result.headers, result.content, result.path)
+        return result
+
+    async def download(self, url, path, **kwargs):
+        """Stream url to path and return the result (result.path is None if it failed)"""
+        return await self.fetch(url, path=path, **kwargs)
+
+    async def fetch_all(self, urls, method="GET", return_exceptions=True, **kwargs):
+        """Fetch many URLs concurrently (per-host limits still apply), results in input order"""
+        return await asyncio.gather(
+            *(self.fetch(url, method, **kwargs) for url in urls),
+            return_exceptions=return_exceptions,
+        )
+
+
+# -- blocking helpers -------------------------------------------------------
+
+def _run(coroutine_factory, **engine_options):
+    async def main():
+        async with FetchEngine(**engine_options) as engine:
+            return await coroutine_factory(engine)
+    return asyncio.run(main())
+
+
+def fetch(url, method="GET", engine_options=None, **kwargs):
+    """Blocking single request through a short-lived engine"""
+    return _run(lambda engine: engine.fetch(url, method, **kwargs), **(engine_options or {}))
+
+
+def download(url, path, engine_options=None, **kwargs):
+    """Blocking download of url to path through a short-lived engine"""
+    return _run(lambda engine: engine.download(url, path, **kwargs), **(engine_options or {}))
+
+
+def fetch_many(urls, engine_options=None, **kwargs):
+    """Blocking concurrent fetch of many URLs; failed ones are returned as exceptions"""
+    return _run(lambda engine: engine.fetch_all(urls, **kwargs), **(engine_options or {}))
@@ -0,0 +1,300 @@
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Persistent HTTP cache shared by every scraper (and every ProcessAll.py task).
+#
+# Responses fetched through fetch_engine.py are stored on disk together with
+# their validators.  The next request for the same URL is answered straight
+# from disk while Cache-Control max-age / Expires says it is still fresh;
+# otherwise it is sent as a conditional request (If-None-Match /
+# If-Modified-Since) and a 304 answer reuses the stored body.  An unchanged
+# source therefore costs one small 304 instead of a full download, and
+# result.from_cache tells the scraper it can skip parsing as well.
+#
+# Pages that are driven through the browser can't use the cache directly; call
+# unchanged(url, outputs) first and skip the browser work when the page hasn't
+# changed since the outputs were produced:
+#
+#     if http_cache.unchanged(url, ["all_data_Putman.csv"]):
+#         return
+#
+# The cache lives in ~/.cache/election-scraper/http (SCRAPER_HTTP_CACHE to
+# override).  SCRAPER_FRESH_RUN=1 (ProcessAll.py --fresh) bypasses the
+# unchanged() shortcut so everything is scraped again.
+
+CACHE_DIR = os.environ.get("SCRAPER_HTTP_CACHE") or os.path.join(
+    os.path.expanduser("~"), ".cache", "election-scraper", "http")
+
+CACHEABLE_STATUSES = {200, 203}
+VALIDATOR_HEADERS = ("etag", "last-modified", "cache-control", "expires", "date", "content-type")
+
+
+def _lower(headers):
+    return {k.lower(): v for k, v in (headers or {}).items()}
+
+
+def _cache_control(headers):
+    """Parse a Cache-Control header into a dict (directives without a value map to True)"""
+    directives = {}
+    for part in _lower(headers).get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') if value else True
+    return directives
+
+
+def _http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def freshness_lifetime(headers):
+    """Return how many seconds a response may be reused without asking the server"""
+    directives = _cache_control(headers)
+    if "no-cache" in directives or "no-store" in directives:
+        return 0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return max(0, int(directives[name]))
+            except (TypeError, ValueError):
+                return 0
+    headers = _lower(headers)
+    expires = _http_date(headers.get("expires"))
+    if expires is not None:
+        date = _http_date(headers.get("date")) or time.time()
+        return max(0, expires - date)
+    # No explicit lifetime: always revalidate
+    return 0
+
+
+class CacheEntry:
+    def __init__(self, cache, key, meta):
+        """One stored response (meta holds url, status, headers and stored_at)"""
+        self.cache = cache
+        self.key = key
+        self.url = meta["url"]
+        self.status = meta["status"]
+        self.headers = meta["headers"]
+        self.stored_at = meta["stored_at"]
+        self.sha256 = meta.get("sha256")
+        self.changed_at = meta.get("changed_at", self.stored_at)
+        self.body_path = cache.body_path(key)
+
+    def is_fresh(self, now=None):
+        """True while the response may be used without contacting the server"""
+        return (now or time.time()) - self.stored_at < freshness_lifetime(self.headers)
+
+    def conditional_headers(self):
+        """Headers that turn the next request into a revalidation"""
+        headers = _lower(self.headers)
+        conditional = {}
+        if headers.get("etag"):
+            conditional["If-None-Match"] = headers["etag"]
+        if headers.get("last-modified"):
+            conditional["If-Modified-Since"] = headers["last-modified"]
+        return conditional
+
+    @property
+    def content(self):
+        with open(self.body_path, "rb") as f:
+            return f.read()
+
+    def copy_to(self, path):
+        """Write the stored body to path (atomically, like a download)"""
+        tmp_path = path + ".part"
+        shutil.copyfile(self.body_path, tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+
+class HttpCache:
+    def __init__(self, directory=None):
+        """
+        On-disk store of HTTP responses keyed by URL
+
+        Args:
+            directory (str): Cache directory (default: CACHE_DIR)
+        """
+        self.directory = directory or CACHE_DIR
+        self.lock = threading.Lock()
+        self.stats = {"fresh": 0, "revalidated": 0, "stored": 0, "misses": 0}
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def meta_path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def body_path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".body")
+
+    def get(self, url):
+        """Return the stored response for url, or None"""
+        key = self.key(url)
+        try:
+            with open(self.meta_path(key), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or not os.path.exists(self.body_path(key)):
+            return None
+        return CacheEntry(self, key, meta)
+
+    def _write_meta(self, key, meta):
+        path = self.meta_path(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def store(self, url, status, headers, content=None, path=None):
+        """
+        Store a response if HTTP allows it
+
+        Args:
+            url (str): Requested URL
+            status (int): Response status
+            headers (dict): Response headers
+            content (bytes): Body kept in memory, or
+            path (str): File the body was streamed to
+
+        Returns:
+            CacheEntry: The stored entry (None if the response isn't cacheable)
+        """
+        directives = _cache_control(headers)
+        if status not in CACHEABLE_STATUSES or "no-store" in directives:
+            return None
+        lowered = _lower(headers)
+        if not (lowered.get("etag") or lowered.get("last-modified") or freshness_lifetime(headers)):
+            # Nothing to revalidate with and no lifetime: storing it can't save a request
+            return None
+        key = self.key(url)
+        previous = self.get(url)
+        digest = hashlib.sha256()
+        with self.lock:
+            os.makedirs(os.path.dirname(self.body_path(key)), exist_ok=True)
+            tmp_path = self.body_path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                if path is not None:
+                    with open(path, "rb") as source:
+                        for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                            digest.update(chunk)
+                            f.write(chunk)
+                else:
+                    digest.update(content or b"")
+                    f.write(content or b"")
+            os.replace(tmp_path, self.body_path(key))
+            now = time.time()
+            sha256 = digest.hexdigest()
+            meta = {
+                "url": url,
+                "status": status,
+                "headers": {name: lowered[name] for name in VALIDATOR_HEADERS if name in lowered},
+                "stored_at": now,
+                "sha256": sha256,
+                # A new validator with the same body (e.g. a regenerated ETag) isn't a change
+                "changed_at": previous.changed_at if previous and previous.sha256 == sha256 else now,
+            }
+            self._write_meta(key, meta)
+            self.stats["stored"] += 1
+        return CacheEntry(self, key, meta)
+
+    def revalidated(self, entry, headers):
+        """The server answered 304: merge its headers and restart the freshness clock"""
+        lowered = _lower(headers)
+        entry.headers = {**entry.headers, **{name: lowered[name] for name in VALIDATOR_HEADERS if name in lowered}}
+        entry.stored_at = time.time()
+        meta = {"url": entry.url, "status": entry.status, "headers": entry.headers, "stored_at": entry.stored_at,
+                "sha256": entry.sha256, "changed_at": entry.changed_at}
+        with self.lock:
+            self._write_meta(entry.key, meta)
+            self.stats["revalidated"] += 1
+        return entry
+
+    def count(self, outcome):
+        with self.lock:
+            self.stats[outcome] += 1
+
+    def clear(self):
+        """Remove every stored response"""
+        with self.lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def summary(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+cache = HttpCache()
+
+
+def outputs_current(url, outputs):
+    """
+    Return True when every output was written after the cached body of url last changed
+
+    A run that failed after the source changed leaves older outputs behind, so
+    the source is processed again next time even though it now answers 304.
+    Always False with SCRAPER_FRESH_RUN=1.
+    """
+    if os.environ.get("SCRAPER_FRESH_RUN") == "1":
+        return False
+    if not all(os.path.exists(output) for output in outputs):
+        return False
+    entry = cache.get(url)
+    if entry is None:
+        return False
+    return not outputs or entry.changed_at <= min(os.path.getmtime(output) for output in outputs)
+
+
+def unchanged(url, outputs=(), headers=None):
+    """
+    Return True when url hasn't changed since the outputs were written
+
+    Meant for browser-driven scrapers: a conditional request through the fetch
+    engine decides whether the page needs scraping again (see outputs_current).
+    Any error (or SCRAPER_FRESH_RUN=1) returns False, so the scraper simply
+    runs as usual.
+
+    Args:
+        url (str): Page the scraper reads
+        outputs (list): Files the scraper produced from it last time
+        headers (dict): Extra request headers
+    """
+    if os.environ.get("SCRAPER_FRESH_RUN") == "1" or not all(os.path.exists(output) for output in outputs):
+        return False
+    import fetch_engine
+    started = time.time()
+    try:
+        result = fetch_engine.fetch(url, headers=headers or {})
+    except Exception as e:
+        print(f"Could not check {url} for changes: {e}")
+        return False
+    entry = cache.get(url)
+    # A 200 the cache refused to store leaves an older entry behind: that says nothing
+    if entry is None or not (result.from_cache or entry.stored_at >= started):
+        return False
+    if not outputs_current(url, outputs):
+        return False
+    print(f"{url} is unchanged; keeping the previous output")
+    return True
+
+
+@atexit.register
+def print_summary():
+    """Print how many requests the cache saved"""
+    stats = cache.summary()
+    if not any(stats.values()):
+        return
+    print("\n=== HTTP Cache Summary ===")
+    print(f"Fresh hits: {stats['fresh']}  Revalidated (304): {stats['revalidated']}  "
+          f"Downloaded: {stats['misses']}  Stored: {stats['stored']}")
@@ -0,0 +1,79 @@
+import json
+import os
+
+from artifact_store import file_sha256
+
+# Which per-state inputs DATA_INTEGRATION.py has already merged.
+#
+# For every state the manifest keeps the size, mtime and SHA-256 of the
+# all_data_<state>.csv it last integrated, together with the version of the
+# state's adapter (the code that reshapes it).  A state whose file and adapter
+# are unchanged is skipped without reading the file; a file with a new mtime
+# but the same size is hashed, so a scraper that rewrote identical output is
+# skipped too.
+#
+# The manifest is only trusted while all_data.csv is the one it was written
+# for: DATA_INTEGRATION.py passes valid=False when the row index had to be
+# rebuilt (all_data.csv replaced or edited), and SCRAPER_FRESH_RUN=1 merges
+# every state again as well.
+
+MANIFEST_PATH = "integration_manifest.json"
+
+
+class InputManifest:
+    def __init__(self, versions, path=MANIFEST_PATH, valid=True):
+        """
+        Args:
+            versions (dict): State name -> adapter version (bump it when the adapter changes)
+            path (str): Manifest file
+            valid (bool): False to merge every state regardless of the manifest
+        """
+        self.versions = versions
+        self.path = path
+        self.valid = valid and os.environ.get("SCRAPER_FRESH_RUN") != "1"
+        self.hashes = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f).get("inputs", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _sha256(self, path):
+        if path not in self.hashes:
+            self.hashes[path] = file_sha256(path)
+        return self.hashes[path]
+
+    def unchanged(self, name, path):
+        """True when path and the state's adapter are the same as when the state was last merged"""
+        entry = self.entries.get(name)
+        if not self.valid or entry is None or not os.path.exists(path):
+            return False
+        if entry.get("version") != self.versions.get(name) or entry.get("file") != path:
+            return False
+        stat = os.stat(path)
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime == entry["mtime"]:
+            return True
+        if self._sha256(path) != entry["sha256"]:
+            return False
+        # Same content written again: remember the new mtime so the next check is cheap
+        entry["mtime"] = stat.st_mtime
+        return True
+
+    def record(self, name, path):
+        """Remember the input a state was merged from (call once it was merged successfully)"""
+        stat = os.stat(path)
+        self.entries[name] = {
+            "file": path,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": self._sha256(path),
+            "version": self.versions.get(name),
+        }
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"inputs": self.entries}, f, indent=2)
+        os.replace(tmp_path, self.path)
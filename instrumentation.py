@@ -0,0 +1,209 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import memory_profile
+
+# Per-stage timing for the scrapers and DATA_INTEGRATION.py.
+#
+# Code wraps the steps it wants measured in stage(site, name):
+#
+#     with stage("texas", "navigate"):
+#         driver.get(url)
+#
+# The standard stage names are below; every condition-based wait from waits.py
+# is recorded as the "wait" stage automatically.  Stages may be nested: the time
+# of an inner stage (or wait) is taken out of the enclosing one, so each second
+# is attributed to exactly one step.  At the end of a run the totals are
+# printed, written to stage_times.json and to a Prometheus textfile-collector
+# file (scraper_stages_<job>.prom, in SCRAPER_METRICS_DIR if set) so slow
+# portals and regressions show up on the dashboards.
+#
+# With SCRAPER_PROFILE_MEMORY=1 every stage is also memory profiled (see
+# memory_profile.py) and memory_profile.json is written next to the report.
+
+STAGES = ("navigate", "wait", "extract", "parse", "normalize", "merge", "write")
+
+METRICS_DIR = os.environ.get("SCRAPER_METRICS_DIR")
+
+
+class StageStats:
+    def __init__(self):
+        """Collects the duration of every stage, grouped by site and stage name"""
+        self.lock = threading.Lock()
+        self.records = {}
+        self.started_at = time.time()
+
+    def record(self, site, name, elapsed, ok=True):
+        with self.lock:
+            entry = self.records.setdefault((site, name), {"durations": [], "errors": 0})
+            entry["durations"].append(elapsed)
+            if not ok:
+                entry["errors"] += 1
+
+    def summary(self):
+        """Return a list of per (site, stage) statistics"""
+        rows = []
+        with self.lock:
+            for (site, name), entry in sorted(self.records.items()):
+                durations = sorted(entry["durations"])
+                count = len(durations)
+                rows.append({
+                    "site": site,
+                    "stage": name,
+                    "count": count,
+                    "total_seconds": round(sum(durations), 3),
+                    "mean_seconds": round(sum(durations) / count, 3),
+                    "p95_seconds": round(durations[min(count - 1, int(count * 0.95))], 3),
+                    "max_seconds": round(durations[-1], 3),
+                    "errors": entry["errors"],
+                })
+        return rows
+
+    def reset(self):
+        with self.lock:
+            self.records = {}
+            self.started_at = time.time()
+
+
+stats = StageStats()
+
+# Stages currently open in each thread, as [start time, seconds spent in inner stages]
+_open_stages = threading.local()
+
+
+def _stack():
+    if not hasattr(_open_stages, "stack"):
+        _open_stages.stack = []
+    return _open_stages.stack
+
+
+def add(site, name, elapsed, ok=True):
+    """Record work that was timed elsewhere (e.g. a wait) and take it out of the enclosing stage"""
+    stack = _stack()
+    if stack:
+        stack[-1][1] += elapsed
+    stats.record(site, name, elapsed, ok)
+
+
+@contextmanager
+def stage(site, name):
+    """
+    Time a block of code as one stage of a site
+
+    Args:
+        site (str): Site (scraper or state) the work belongs to
+        name (str): Stage name, usually one of STAGES
+    """
+    memory_frame = memory_profile.profiler.begin(site, name) if memory_profile.enabled() else None
+    stack = _stack()
+    frame = [time.time(), 0.0]
+    stack.append(frame)
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        stack.pop()
+        elapsed = time.time() - frame[0]
+        if stack:
+            stack[-1][1] += elapsed
+        stats.record(site, name, elapsed - frame[1], ok)
+        if memory_frame is not None:
+            # Taking the allocation snapshot is slow, keep it out of the stage time
+            start = time.time()
+            memory_profile.profiler.end(memory_frame)
+            if stack:
+                stack[-1][1] += time.time() - start
+
+
+def default_job():
+    """Name of the running script, used as the job label"""
+    return os.path.splitext(os.path.basename(sys.argv[0] or "scraper"))[0] or "scraper"
+
+
+def print_summary():
+    """Print where the run time went"""
+    rows = stats.summary()
+    if not rows:
+        return
+    print("\n=== Stage Time Summary ===")
+    print(f"{'Site':<15} {'Stage':<12} {'Count':>6} {'Total':>9} {'Mean':>7} {'p95':>7} {'Max':>7} {'Err':>5}")
+    for row in rows:
+        print(f"{row['site']:<15} {row['stage']:<12} {row['count']:>6} {row['total_seconds']:>8.1f}s "
+              f"{row['mean_seconds']:>6.2f}s {row['p95_seconds']:>6.2f}s {row['max_seconds']:>6.2f}s "
+              f"{row['errors']:>5}")
+
+
+def write_report(path="stage_times.json", job=None):
+    """Write the stage statistics to a JSON file"""
+    rows = stats.summary()
+    if not rows:
+        return None
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "job": job or default_job(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(stats.started_at)),
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "stages": rows,
+        }, f, indent=2)
+    return path
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def write_prometheus(path=None, job=None):
+    """
+    Write the stage statistics in the Prometheus text format
+
+    The file is written to a temporary name and renamed, as the node_exporter
+    textfile collector expects.
+    """
+    rows = stats.summary()
+    if not rows:
+        return None
+    job = job or default_job()
+    if path is None:
+        path = os.path.join(METRICS_DIR or os.getcwd(), f"scraper_stages_{job}.prom")
+
+    metrics = [
+        ("scraper_stage_seconds_total", "counter", "Seconds spent in each scraper stage", "total_seconds"),
+        ("scraper_stage_runs_total", "counter", "Number of times each scraper stage ran", "count"),
+        ("scraper_stage_max_seconds", "gauge", "Longest single run of each scraper stage", "max_seconds"),
+        ("scraper_stage_p95_seconds", "gauge", "95th percentile duration of each scraper stage", "p95_seconds"),
+        ("scraper_stage_errors_total", "counter", "Scraper stages that raised an exception", "errors"),
+    ]
+    lines = []
+    for metric, kind, help_text, field in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for row in rows:
+            labels = f'job="{_escape(job)}",site="{_escape(row["site"])}",stage="{_escape(row["stage"])}"'
+            lines.append(f"{metric}{{{labels}}} {row[field]}")
+    lines.append("# HELP scraper_last_run_timestamp_seconds When the scraper run finished")
+    lines.append("# TYPE scraper_last_run_timestamp_seconds gauge")
+    lines.append(f'scraper_last_run_timestamp_seconds{{job="{_escape(job)}"}} {time.time():.0f}')
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+@atexit.register
+def _report_at_exit():
+    if stats.records:
+        print_summary()
+        write_report(os.path.join(os.getcwd(), "stage_times.json"))
+        write_prometheus()
+    if memory_profile.profiler.records:
+        memory_profile.profiler.print_summary()
+        memory_profile.profiler.write_report(os.path.join(os.getcwd(), "memory_profile.json"), default_job())
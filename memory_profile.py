@@ -0,0 +1,237 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+# Memory profiling for the instrumented stages (see instrumentation.py).
+#
+# With SCRAPER_PROFILE_MEMORY=1 (ProcessAll.py / cli.py --profile-memory) every
+# stage also records:
+#   - the peak RSS of this process and of its child processes (chromedriver and
+#     the Chrome processes it starts), sampled in the background from /proc
+#   - the peak Python heap (tracemalloc) while the stage ran
+#   - the top allocation sites still holding memory at the end of the stage's
+#     most memory hungry run
+# The report is written to memory_profile.json so worker containers can be
+# sized from real numbers.  tracemalloc slows Python code down noticeably, so
+# this is for profiling runs only.
+
+ENV_VAR = "SCRAPER_PROFILE_MEMORY"
+SAMPLE_INTERVAL = 0.25
+TOP_SITES = 10
+TRACEBACK_FRAMES = 1
+
+
+def enabled():
+    """Return True when memory profiling was requested for this run"""
+    return os.environ.get(ENV_VAR) == "1"
+
+
+def _status_bytes(pid, field):
+    """Read a kB field (VmRSS, VmHWM) from /proc/<pid>/status and return bytes"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def child_pids(pid):
+    """Return every descendant of pid (children, grandchildren, ...) on Linux"""
+    parents = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8") as f:
+                # The command name may contain spaces, the fields after it don't
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        parents.setdefault(int(fields[1]), []).append(int(entry))
+
+    found = []
+    queue = [pid]
+    while queue:
+        for child in parents.get(queue.pop(), []):
+            found.append(child)
+            queue.append(child)
+    return found
+
+
+def process_tree_rss(pid=None):
+    """Return (own RSS, RSS of all descendant processes) in bytes"""
+    pid = pid or os.getpid()
+    own = _status_bytes(pid, "VmRSS")
+    if not own:
+        # No /proc: only the peak of this process is available (and nothing on Windows)
+        try:
+            import resource
+        except ImportError:
+            return 0, 0
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale, 0
+    return own, sum(_status_bytes(child, "VmRSS") for child in child_pids(pid))
+
+
+def top_allocation_sites(limit=TOP_SITES):
+    """Return the source lines currently holding the most traced memory"""
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+    cwd = os.getcwd() + os.sep
+    sites = []
+    for stat in snapshot.statistics("lineno")[:limit]:
+        frame = stat.traceback[0]
+        sites.append({
+            "file": frame.filename[len(cwd):] if frame.filename.startswith(cwd) else frame.filename,
+            "line": frame.lineno,
+            "size_mb": round(stat.size / 1024 / 1024, 3),
+            "blocks": stat.count,
+        })
+    return sites
+
+
+class MemoryProfiler:
+    def __init__(self, sample_interval=SAMPLE_INTERVAL):
+        """Tracks RSS and Python heap peaks per (site, stage)"""
+        self.sample_interval = sample_interval
+        self.lock = threading.Lock()
+        self.records = {}
+        self.open_frames = []
+        self.run_peak = {"rss": 0, "self_rss": 0, "children_rss": 0}
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        """Start tracemalloc and the RSS sampler (done on the first stage)"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEBACK_FRAMES)
+            self.thread = threading.Thread(target=self._sample_loop, daemon=True)
+            self.thread.start()
+
+    def _sample_loop(self):
+        while not self.stopped.wait(self.sample_interval):
+            self.sample()
+
+    def sample(self):
+        """Measure RSS now and update the peaks of the run and of every open stage"""
+        own, children = process_tree_rss()
+        total = own + children
+        with self.lock:
+            self.run_peak["self_rss"] = max(self.run_peak["self_rss"], own)
+            self.run_peak["children_rss"] = max(self.run_peak["children_rss"], children)
+            self.run_peak["rss"] = max(self.run_peak["rss"], total)
+            for frame in self.open_frames:
+                frame["self_rss"] = max(frame["self_rss"], own)
+                frame["children_rss"] = max(frame["children_rss"], children)
+                frame["rss"] = max(frame["rss"], total)
+
+    def begin(self, site, name):
+        """Called when a stage starts; returns the frame to pass to end()"""
+        self.start()
+        current, peak = tracemalloc.get_traced_memory()
+        frame = {"site": site, "name": name, "traced_start": current, "traced_peak": current,
+                 "rss": 0, "self_rss": 0, "children_rss": 0}
+        with self.lock:
+            # The heap peak is global: hand it to the open stages before resetting it
+            for other in self.open_frames:
+                other["traced_peak"] = max(other["traced_peak"], peak)
+            tracemalloc.reset_peak()
+            self.open_frames.append(frame)
+        self.sample()
+        return frame
+
+    def end(self, frame):
+        """Called when a stage finishes; records its peaks"""
+        self.sample()
+        _, peak = tracemalloc.get_traced_memory()
+        with self.lock:
+            self.open_frames.remove(frame)
+            frame["traced_peak"] = max(frame["traced_peak"], peak)
+            for other in self.open_frames:
+                other["traced_peak"] = max(other["traced_peak"], frame["traced_peak"])
+            entry = self.records.setdefault((frame["site"], frame["name"]), {
+                "count": 0, "rss": 0, "self_rss": 0, "children_rss": 0, "traced_peak": -1, "top_sites": []
+            })
+            entry["count"] += 1
+            for key in ("rss", "self_rss", "children_rss"):
+                entry[key] = max(entry[key], frame[key])
+            traced = frame["traced_peak"] - frame["traced_start"]
+            new_maximum = traced > entry["traced_peak"]
+            if new_maximum:
+                entry["traced_peak"] = traced
+        if new_maximum:
+            sites = top_allocation_sites()
+            with self.lock:
+                entry["top_sites"] = sites
+
+    def summary(self):
+        """Return a list of per (site, stage) memory statistics in MB"""
+        mb = lambda value: round(value / 1024 / 1024, 1)
+        rows = []
+        with self.lock:
+            for (site, name), entry in sorted(self.records.items()):
+                rows.append({
+                    "site": site,
+                    "stage": name,
+                    "count": entry["count"],
+                    "peak_rss_mb": mb(entry["rss"]),
+                    "peak_self_rss_mb": mb(entry["self_rss"]),
+                    "peak_children_rss_mb": mb(entry["children_rss"]),
+                    "peak_python_heap_mb": mb(max(entry["traced_peak"], 0)),
+                    "top_allocation_sites": entry["top_sites"],
+                })
+        return rows
+
+    def reset(self):
+        with self.lock:
+            self.records = {}
+            self.run_peak = {"rss": 0, "self_rss": 0, "children_rss": 0}
+
+    def print_summary(self):
+        rows = self.summary()
+        if not rows:
+            return
+        print("\n=== Memory Profile ===")
+        print(f"{'Site':<15} {'Stage':<12} {'Count':>6} {'Peak RSS':>10} {'Python':>9} {'Chrome':>9}  Top allocation site")
+        for row in rows:
+            top = row["top_allocation_sites"][0] if row["top_allocation_sites"] else None
+            where = f"{top['file']}:{top['line']} ({top['size_mb']} MB)" if top else ""
+            print(f"{row['site']:<15} {row['stage']:<12} {row['count']:>6} {row['peak_rss_mb']:>8.1f}MB "
+                  f"{row['peak_python_heap_mb']:>7.1f}MB {row['peak_children_rss_mb']:>7.1f}MB  {where}")
+        print(f"Run peak RSS: {self.run_peak['rss'] / 1024 / 1024:.1f} MB "
+              f"(this process {self.run_peak['self_rss'] / 1024 / 1024:.1f} MB, "
+              f"children {self.run_peak['children_rss'] / 1024 / 1024:.1f} MB)")
+
+    def write_report(self, path="memory_profile.json", job=None):
+        """Write the memory statistics to a JSON file"""
+        rows = self.summary()
+        if not rows:
+            return None
+        with self.lock:
+            run_peak = {key + "_mb": round(value / 1024 / 1024, 1) for key, value in self.run_peak.items()}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "job": job,
+                "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "run_peak": run_peak,
+                "stages": rows,
+            }, f, indent=2)
+        return path
+
+
+profiler = MemoryProfiler()
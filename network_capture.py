@@ -0,0 +1,209 @@
+import base64
+import json
+import os
+import re
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+# Optional in-memory capture of export payloads through the DevTools Network domain.
+#
+# Normally an export is clicked, saved to the download directory, found, renamed,
+# read and deleted.  With capture enabled the scrapers read the response body
+# straight from Chrome (Network.getResponseBody) and hand the bytes to the parser,
+# so nothing touches the disk and several exports can be in flight in one browser.
+#
+# Network events are read from chromedriver's performance log, which has to be
+# switched on when the browser starts (see driver_pool).  Set
+# SCRAPER_CAPTURE_EXPORTS=1 (or ProcessAll.py --capture-exports) to enable it.
+
+CAPTURE_EXPORTS = os.environ.get("SCRAPER_CAPTURE_EXPORTS") == "1"
+
+EXPORT_MIME_TYPES = (
+    "text/csv",
+    "text/plain",
+    "application/csv",
+    "application/vnd.ms-excel",
+    "application/octet-stream",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+)
+
+# Starts the export as a fetch() from inside the page, so it carries the page's
+# cookies and its response stays in the Network domain instead of becoming a
+# download.  Returns the url and body so the request can be recognised.
+TRIGGER_FETCH_JS = """
+var url = arguments[0], method = arguments[1], form = arguments[2], submitter = arguments[3];
+var options = {method: method, credentials: 'include'};
+var body = null;
+if (form) {
+    var data = new FormData(form);
+    if (submitter && submitter.name) { data.append(submitter.name, submitter.value); }
+    var encoded = new URLSearchParams(data).toString();
+    if (method === 'GET') {
+        url = url.split('?')[0] + '?' + encoded;
+    } else {
+        body = encoded;
+        options.body = encoded;
+        options.headers = {'Content-Type': 'application/x-www-form-urlencoded'};
+    }
+}
+url = new URL(url, document.baseURI).href;
+fetch(url, options).then(function(response) { return response.arrayBuffer(); });
+return [url, body];
+"""
+
+
+def drain_performance_log(driver):
+    """Read and discard buffered performance log entries"""
+    try:
+        driver.get_log("performance")
+    except Exception:
+        pass
+
+
+class ExportCapture:
+    def __init__(self, driver, url_pattern=None, mime_types=EXPORT_MIME_TYPES):
+        """
+        Capture export responses from the DevTools Network domain
+
+        Args:
+            driver: Selenium WebDriver started with performance logging
+            url_pattern (str): Regex a response URL must match (None: any URL)
+            mime_types (tuple): Response MIME types that count as exports
+        """
+        self.driver = driver
+        self.url_pattern = re.compile(url_pattern) if url_pattern else None
+        self.mime_types = mime_types
+        self.expected = {}
+        self.triggered = False
+        self.matched = {}
+        self.finished = set()
+        self.bodies = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        """Start listening; responses received before this are ignored"""
+        self.driver.execute_cdp_cmd("Network.enable", {
+            "maxTotalBufferSize": 100 * 1024 * 1024,
+            "maxResourceBufferSize": 50 * 1024 * 1024
+        })
+        drain_performance_log(self.driver)
+        return self
+
+    def stop(self):
+        drain_performance_log(self.driver)
+
+    def trigger_fetch(self, url, method="GET", form=None, submitter=None):
+        """
+        Start an export request from inside the page and capture its response
+
+        Args:
+            url (str): URL to request (form.action when submitting a form)
+            method (str): HTTP method
+            form: Optional <form> element whose fields are sent with the request
+            submitter: Optional submit button whose name/value is added to the form data
+        """
+        final_url, body = self.driver.execute_script(TRIGGER_FETCH_JS, url, method.upper(), form, submitter)
+        self.triggered = True
+        self.expected[(final_url, body)] = self.expected.get((final_url, body), 0) + 1
+
+    def trigger_form(self, submit_button):
+        """Submit the form that submit_button belongs to via trigger_fetch()"""
+        form = self.driver.execute_script("return arguments[0].form;", submit_button)
+        action = form.get_attribute("action") or self.driver.current_url
+        method = form.get_attribute("method") or "GET"
+        self.trigger_fetch(action, method, form, submit_button)
+
+    def _is_export(self, response):
+        url = response.get("url", "")
+        if self.url_pattern is not None and not self.url_pattern.search(url):
+            return False
+        mime = response.get("mimeType", "").lower()
+        disposition = {k.lower(): v for k, v in response.get("headers", {}).items()}.get("content-disposition", "")
+        return "attachment" in disposition.lower() or mime in self.mime_types
+
+    def _read_events(self):
+        for entry in self.driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            method = message.get("method")
+            params = message.get("params", {})
+            request_id = params.get("requestId")
+
+            if method == "Network.requestWillBeSent":
+                request = params["request"]
+                key = (request["url"], request.get("postData"))
+                if self.expected.get(key):
+                    self.expected[key] -= 1
+                    self.matched[request_id] = request["url"]
+            elif method == "Network.responseReceived":
+                # Requests we started ourselves are matched above; otherwise
+                # anything that looks like an export counts
+                if not self.triggered and request_id not in self.matched \
+                        and self._is_export(params["response"]):
+                    self.matched[request_id] = params["response"]["url"]
+            elif method == "Network.loadingFinished" and request_id in self.matched:
+                self.finished.add(request_id)
+
+        for request_id in list(self.finished):
+            self.finished.discard(request_id)
+            url = self.matched.pop(request_id)
+            try:
+                result = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            except WebDriverException as e:
+                print(f"Could not read captured response for {url}: {e}")
+                continue
+            if result.get("base64Encoded"):
+                body = base64.b64decode(result["body"])
+            else:
+                body = result["body"].encode("utf-8")
+            self.bodies.append((url, body))
+
+    def wait_for_bodies(self, count, timeout=60):
+        """
+        Wait until count export responses have been captured
+
+        Returns:
+            list: (url, bytes) tuples in the order the responses finished
+        """
+        deadline = time.time() + timeout
+        while len(self.bodies) < count and time.time() < deadline:
+            self._read_events()
+            if len(self.bodies) < count:
+                time.sleep(0.1)
+        bodies, self.bodies = self.bodies[:count], self.bodies[count:]
+        return bodies
+
+    def wait_for_body(self, timeout=30):
+        """Wait for the next captured export and return its bytes (None on timeout)"""
+        bodies = self.wait_for_bodies(1, timeout)
+        return bodies[0][1] if bodies else None
+
+
+def capture_click(driver, element, timeout=30, keep_downloads=False):
+    """
+    Click an export button and return the exported bytes instead of saving a file
+
+    Downloads are switched off while the click is captured so nothing is written to
+    disk.  Returns None when no export response was seen (e.g. the export turned into
+    a regular download) so the caller can fall back to the download directory.
+
+    With keep_downloads=True downloads stay on, so a caller watching the download
+    directory can pick up the file of this same click instead of clicking again.
+    """
+    if not keep_downloads:
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior", {"behavior": "deny"})
+    try:
+        with ExportCapture(driver) as capture:
+            element.click()
+            return capture.wait_for_body(timeout)
+    finally:
+        if not keep_downloads:
+            driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+                "behavior": "allow",
+                "downloadPath": getattr(driver, "download_dir", os.getcwd())
+            })
@@ -0,0 +1,359 @@
+import argparse
+import gc
+import importlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Microbenchmarks for the pure-Python parsers.
+#
+# Every parser runs against a small hand-written fixture that looks like the
+# real portal output and against generated fixtures of growing size (records
+# from standin_portals.candidate).  For each run the suite reports records per
+# second (best of several rounds) and the memory the parser allocates
+# (tracemalloc peak, in total and per record).
+#
+#     python cli.py bench parsers                       measure and compare with the baseline
+#     python cli.py bench parsers --update-baseline     store the current numbers as the baseline
+#     python cli.py bench parsers --threshold 10        fail on a drop of more than 10%
+#
+# The baseline lives in benchmarks/parser_baseline.json.  Throughput depends
+# on the machine, so record the baseline on the machine that runs the check.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BASE_DIR, "benchmarks", "parser_baseline.json")
+DEFAULT_THRESHOLD = 20.0      # percent drop in records/second that counts as a regression
+DEFAULT_SIZES = (100, 1000, 10000)
+MIN_ROUND_SECONDS = 0.2
+ROUNDS = 5
+
+
+# -- fixtures -------------------------------------------------------------------
+
+PUTMAN_TEXT = """2025 Town of Welaka Candidate Contact List
+Candidate Name: Jamie L. Watts
+Party: NPA
+Address: 412 Elm St, Welaka, FL 32193
+Email: jwatts@example.com
+Phone: (386) 555-0142
+Status: QUALIFIED
+Valid Petitions: 25 of 25
+Candidate Name: Robert Greene
+Party: NPA
+Address: 87 Front St, Welaka, FL 32193
+Email: rgreene@example.com
+Phone: (386) 555-0199
+Status: PENDING
+Valid Petitions: 12 of 25
+"""
+
+SHAWNEE_HEADER = "Candidate Ballot City Date Filed Filing Method Address Info Contact Info Filed Documents"
+
+SHAWNEE_TEXT = f"""Shawnee County Election Office
+Candidate Filing Report
+{SHAWNEE_HEADER}
+City Council Member, District 2
+Maria "Lou" Alvarez Topeka 06/02/2025 Fee 1821 SW Western Ave
+Topeka KS 66604
+(785)555-0147
+malvarez@example.com
+Candidate Declaration; Statement of Substantial Interests
+Kevin M. Brooks Topeka 05/28/2025 Petition 415 SE 21st St
+(785)555-0178
+Affidavit of Candidacy
+{SHAWNEE_HEADER}
+School Board Member, Position 4
+Dana Whitfield Silver Lake 05/30/2025 Fee 22 Maple Dr
+(785)555-0110
+dwhitfield@example.com
+Statement of Substantial Interests
+"""
+
+TEXAS_LINES = [
+    "E-mail: reyna.anderson@example.com",
+    "Phone: (512) 555-0134",
+    "Address: 1100 Congress Ave, Austin, TX 78701",
+    "  STATE REPRESENTATIVE,   DISTRICT 46  ",
+    "PO Box 1234 Houston TX 77001 713.555.0188",
+]
+
+TEXAS_CANDIDATES = [
+    {"position": "STATE REPRESENTATIVE, DISTRICT 46", "name": "REYNA ANDERSON", "party": "DEMOCRATIC",
+     "status": "QUALIFIED", "occupation": "ATTORNEY", "email": "E-mail: reyna.anderson@example.com",
+     "address": "1100 CONGRESS AVE, AUSTIN, TX 78701 (512) 555-0134"},
+    {"position": "DISTRICT JUDGE, 419TH JUDICIAL DISTRICT", "name": "MARK T. CALLOWAY", "party": "REPUBLICAN",
+     "status": "QUALIFIED", "occupation": "JUDGE", "address": "PO BOX 2201, HOUSTON, TX 77001"},
+]
+
+
+def _people(count):
+    import standin_portals
+    return [standin_portals.candidate("texas", "bench", index) for index in range(count)]
+
+
+def putman_text(count):
+    lines = []
+    for person in _people(count):
+        lines += [
+            f"Candidate Name: {person['first'].title()} {person['last'].title()}",
+            f"Party: {person['party'][:3]}",
+            f"Address: {person['street'].title()}, Welaka, FL 32193",
+            f"Email: {person['email']}",
+            f"Phone: {person['phone']}",
+            "Status: QUALIFIED",
+            "Valid Petitions: 25 of 25",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def shawnee_text(count, per_office=25):
+    lines = ["Shawnee County Election Office", "Candidate Filing Report"]
+    for index, person in enumerate(_people(count)):
+        if index % per_office == 0:
+            lines += [SHAWNEE_HEADER, f"City Council Member, District {index // per_office + 1}"]
+        method = "Fee" if index % 3 else "Petition"
+        lines += [
+            f"{person['first'].title()} {person['last'].title()} Topeka {person['filed']} {method} "
+            f"{person['street'].title()}",
+            person["phone"].replace(" ", ""),
+            person["email"],
+            "Candidate Declaration; Statement of Substantial Interests",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def texas_lines(count):
+    lines = []
+    for person in _people(count):
+        lines += [
+            f"E-mail: {person['email']}",
+            f"Address: {person['street']}, {person['city']}, TX {person['zip']} {person['phone']}",
+        ]
+    return lines
+
+
+def texas_candidates(count):
+    return [{
+        "position": person["office"],
+        "name": f"{person['first']} {person['last']}",
+        "party": person["party"],
+        "status": "QUALIFIED",
+        "occupation": person["occupation"],
+        "email": f"E-mail: {person['email']}",
+        "address": f"{person['street']}, {person['city']}, TX {person['zip']} {person['phone']}",
+    } for person in _people(count)]
+
+
+# -- benchmarks -----------------------------------------------------------------
+
+def _call_each(func):
+    """Adapt a one-string function to a benchmark over a list of strings"""
+    def run(items):
+        for item in items:
+            func(item)
+    return run
+
+
+# name -> (module, function, fixed fixture, fixture generator, adapter)
+# The fixture is what the parser receives; records is how many candidates it holds.
+BENCHMARKS = {
+    "putman.parse_candidates_from_text": (
+        "putmanCounty", "parse_candidates_from_text", (PUTMAN_TEXT, 2), lambda n: (putman_text(n), n), None),
+    "shawnee.parse_candidate_data": (
+        "ShawneeCounty", "parse_candidate_data", (SHAWNEE_TEXT, 3), lambda n: (shawnee_text(n), n), None),
+    "shawnee.clean_candidate_data": (
+        "ShawneeCounty", "clean_candidate_data", None, None, "shawnee_parsed"),
+    "texas.extract_contact_info": (
+        "Texas_Elections", "extract_contact_info", (TEXAS_LINES, len(TEXAS_LINES)),
+        lambda n: (texas_lines(n), 2 * n), _call_each),
+    "texas.clean_text": (
+        "Texas_Elections", "clean_text", (TEXAS_LINES, len(TEXAS_LINES)),
+        lambda n: (texas_lines(n), 2 * n), _call_each),
+    "texas.process_candidates_data": (
+        "Texas_Elections", "process_candidates_data", (TEXAS_CANDIDATES, len(TEXAS_CANDIDATES)),
+        lambda n: (texas_candidates(n), n), lambda func: lambda candidates: func(candidates, "bench", "2025")),
+}
+
+
+def _fixture(name, size):
+    """Return (argument, records) for a benchmark; size None is the fixed fixture"""
+    module_name, _, fixed, generate, adapter = BENCHMARKS[name]
+    if adapter == "shawnee_parsed":
+        # clean_candidate_data works on what parse_candidate_data returns
+        parse = getattr(importlib.import_module(module_name), "parse_candidate_data")
+        text, _ = _fixture("shawnee.parse_candidate_data", size)
+        parsed = parse(text)
+        return parsed, len(parsed)
+    return fixed if size is None else generate(size)
+
+
+def _target(name):
+    module_name, function_name, _, _, adapter = BENCHMARKS[name]
+    func = getattr(importlib.import_module(module_name), function_name)
+    return adapter(func) if callable(adapter) else func
+
+
+def measure(func, argument, records, min_round_seconds=MIN_ROUND_SECONDS, rounds=ROUNDS):
+    """
+    Time func(argument) and measure what it allocates
+
+    Args:
+        func: Parser (or adapted parser) taking one argument
+        argument: Fixture passed to it
+        records (int): Candidates in the fixture
+        min_round_seconds (float): Each round repeats the call until it took this long
+        rounds (int): Rounds to run; the fastest one counts
+
+    Returns:
+        dict: records_per_second, seconds_per_call, peak_kb, kb_per_record
+    """
+    func(argument)  # warm up (regex caches, imports)
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            func(argument)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_seconds:
+            break
+        calls *= 2
+    best = elapsed / calls
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds - 1):
+            start = time.perf_counter()
+            for _ in range(calls):
+                func(argument)
+            best = min(best, (time.perf_counter() - start) / calls)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    # Allocations are measured in a separate call, tracemalloc slows everything down
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    func(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    if not tracing:
+        tracemalloc.stop()
+    peak_kb = max(0, peak - before) / 1024
+
+    return {
+        "records_per_second": round(records / best, 1) if best else 0.0,
+        "seconds_per_call": round(best, 6),
+        "peak_kb": round(peak_kb, 1),
+        "kb_per_record": round(peak_kb / records, 3) if records else 0.0,
+    }
+
+
+def run(names=None, sizes=DEFAULT_SIZES):
+    """Run the selected benchmarks on the fixed fixture and every size; return the results"""
+    results = []
+    for name in names or BENCHMARKS:
+        func = _target(name)
+        for size in (None, *sizes):
+            argument, records = _fixture(name, size)
+            result = measure(func, argument, records)
+            results.append({"benchmark": name, "fixture": "fixed" if size is None else str(size),
+                            "records": records, **result})
+    return results
+
+
+def _key(result):
+    return f"{result['benchmark']}@{result['fixture']}"
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_baseline(results, path=BASELINE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "results": {_key(result): result for result in results},
+        }, f, indent=2, sort_keys=True)
+    return path
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare the results with the baseline
+
+    Returns:
+        list: (result, baseline records/second, change in percent) for every
+              benchmark that dropped more than threshold percent
+    """
+    regressions = []
+    stored = baseline.get("results", {}) if baseline else {}
+    for result in results:
+        previous = stored.get(_key(result))
+        if not previous or not previous.get("records_per_second"):
+            continue
+        change = (result["records_per_second"] / previous["records_per_second"] - 1) * 100
+        result["change_percent"] = round(change, 1)
+        if change < -threshold:
+            regressions.append((result, previous["records_per_second"], change))
+    return regressions
+
+
+def print_results(results):
+    print(f"{'Benchmark':<36} {'Fixture':>7} {'Records':>8} {'Records/s':>12} {'Peak KB':>9} {'KB/rec':>7} {'Change':>8}")
+    for result in results:
+        change = result.get("change_percent")
+        shown = f"{change:+7.1f}%" if change is not None else ""
+        print(f"{result['benchmark']:<36} {result['fixture']:>7} {result['records']:>8} "
+              f"{result['records_per_second']:>12,.0f} {result['peak_kb']:>9.1f} {result['kb_per_record']:>7.2f} {shown:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cli.py bench parsers", description="Parser microbenchmarks")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--sizes", nargs="*", type=int, default=list(DEFAULT_SIZES),
+                        help="Generated fixture sizes (records) besides the fixed fixture")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Fail when records/second drops more than this many percent below the baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, BASE_DIR)
+    print("=== Parser Benchmarks ===")
+    results = run(args.only, args.sizes)
+    baseline = load_baseline(args.baseline)
+    regressions = compare(results, baseline, args.threshold)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+    if args.update_baseline:
+        print(f"Baseline saved to {write_baseline(results, args.baseline)}")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than the baseline by more than {args.threshold:g}%:")
+        for result, previous, change in regressions:
+            print(f"  {_key(result)}: {result['records_per_second']:,.0f} records/s "
+                  f"(baseline {previous:,.0f}, {change:+.1f}%)")
+        return 1
+    print(f"\nNo benchmark dropped more than {args.threshold:g}% below the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
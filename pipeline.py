@@ -0,0 +1,211 @@
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import STAGES, stage as timed_stage
+
+# Staged scraper pipelines.
+#
+# A scraper declares its stages and the runtime connects them with bounded
+# queues, so fetching the next page overlaps with parsing, normalizing and
+# writing the previous one:
+#
+#     pipeline = Pipeline("texas")
+#     pipeline.add("normalize", normalize_election)
+#     pipeline.add("write", write_election)
+#     pipeline.run(fetch_elections(driver))
+#
+# The source (usually a generator driving the browser) runs in the calling
+# thread; every stage runs in its own worker threads and receives the output
+# of the previous one.  A stage returning None drops the item; with many=True
+# a returned list is passed on item by item.  What the last stage returns is
+# collected and returned by run().
+#
+# CPU-heavy stages can run in a process pool (processes=True).  The function
+# and its items must be picklable then (module-level functions); if the
+# function isn't, the stage falls back to threads.  Work done in a child
+# process isn't seen by instrumentation.py, so the time of a process stage is
+# recorded in the parent under the stage's name (if it is one of the standard
+# stage names).
+#
+# The queues are bounded (queue_size items between two stages), so a slow
+# writer holds the fetcher back instead of letting pages pile up in memory.
+# An exception in a stage skips that item and is counted; an exception in the
+# source stops the pipeline once the items already fetched are processed.
+
+DEFAULT_QUEUE_SIZE = 4
+
+_DONE = object()
+
+
+class Stage:
+    def __init__(self, name, func, workers=1, processes=False, many=False, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        One step of a pipeline
+
+        Args:
+            name (str): Stage name (a standard stage name like "parse" for timing)
+            func (callable): Called with one item, returns the item for the next stage
+            workers (int): Items processed in parallel (one keeps the order)
+            processes (bool): Run func in a process pool instead of threads
+            many (bool): func returns a list of items for the next stage
+            queue_size (int): Items that may wait for this stage
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.processes = processes
+        self.many = many
+        self.inbox = queue.Queue(maxsize=max(1, queue_size))
+        self.pool = None
+        self.running = 0
+        self.lock = threading.Lock()
+        self.stats = {"items": 0, "outputs": 0, "errors": 0, "busy_seconds": 0.0, "blocked_seconds": 0.0}
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.stats[name] += value
+
+
+class Pipeline:
+    def __init__(self, site, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        Stages connected by bounded queues
+
+        Args:
+            site (str): Scraper name (for timing and the summary)
+            queue_size (int): Default queue size between two stages
+        """
+        self.site = site
+        self.queue_size = queue_size
+        self.stages = []
+        self.results = []
+        self.results_lock = threading.Lock()
+        self.source_stats = {"items": 0, "blocked_seconds": 0.0}
+
+    def add(self, name, func, workers=1, processes=False, many=False, queue_size=None):
+        """Append a stage (see Stage); returns the pipeline so calls can be chained"""
+        self.stages.append(Stage(name, func, workers=workers, processes=processes, many=many,
+                                 queue_size=queue_size or self.queue_size))
+        return self
+
+    def _start_pool(self, stage):
+        try:
+            pickle.dumps(stage.func)
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            print(f"{self.site}: {stage.name} can't run in a process pool ({e}); using threads")
+            stage.processes = False
+            return
+        stage.pool = ProcessPoolExecutor(max_workers=stage.workers)
+
+    def _call(self, stage, item):
+        if stage.pool is None:
+            return stage.func(item)
+        if stage.name in STAGES:
+            with timed_stage(self.site, stage.name):
+                return stage.pool.submit(stage.func, item).result()
+        return stage.pool.submit(stage.func, item).result()
+
+    def _emit(self, stage, index, output):
+        """Hand one output to the next stage (or collect it after the last one)"""
+        if output is None:
+            return
+        stage.count("outputs")
+        if index + 1 == len(self.stages):
+            with self.results_lock:
+                self.results.append(output)
+            return
+        start = time.time()
+        self.stages[index + 1].inbox.put(output)
+        stage.count("blocked_seconds", time.time() - start)
+
+    def _work(self, index):
+        stage = self.stages[index]
+        while True:
+            item = stage.inbox.get()
+            if item is _DONE:
+                # Leave the marker for the other workers of this stage
+                stage.inbox.put(_DONE)
+                break
+            stage.count("items")
+            start = time.time()
+            try:
+                output = self._call(stage, item)
+            except Exception as e:
+                stage.count("errors")
+                print(f"{self.site}: {stage.name} failed: {e}")
+                continue
+            finally:
+                stage.count("busy_seconds", time.time() - start)
+            for each in (output or []) if stage.many else [output]:
+                self._emit(stage, index, each)
+        with stage.lock:
+            stage.running -= 1
+            last = stage.running == 0
+        if last and index + 1 < len(self.stages):
+            self.stages[index + 1].inbox.put(_DONE)
+
+    def run(self, source):
+        """
+        Feed every item of source through the stages
+
+        Args:
+            source (iterable): Items for the first stage (consumed in this thread)
+
+        Returns:
+            list: What the last stage returned (None results left out)
+        """
+        if not self.stages:
+            return [item for item in source if item is not None]
+        started = time.time()
+        threads = []
+        for index, stage in enumerate(self.stages):
+            if stage.processes:
+                self._start_pool(stage)
+            stage.running = stage.workers
+            for number in range(stage.workers):
+                thread = threading.Thread(target=self._work, args=(index,), daemon=True,
+                                          name=f"{self.site}-{stage.name}-{number}")
+                thread.start()
+                threads.append(thread)
+        first = self.stages[0]
+        try:
+            for item in source:
+                if item is None:
+                    continue
+                self.source_stats["items"] += 1
+                start = time.time()
+                first.inbox.put(item)
+                self.source_stats["blocked_seconds"] += time.time() - start
+        finally:
+            first.inbox.put(_DONE)
+            for thread in threads:
+                thread.join()
+            for stage in self.stages:
+                if stage.pool is not None:
+                    stage.pool.shutdown()
+                    stage.pool = None
+            self.print_summary(time.time() - started)
+        return self.results
+
+    def summary(self):
+        rows = [{"stage": "source", "items": self.source_stats["items"], "outputs": self.source_stats["items"],
+                 "errors": 0, "busy_seconds": None, "blocked_seconds": round(self.source_stats["blocked_seconds"], 3)}]
+        for stage in self.stages:
+            with stage.lock:
+                row = {"stage": stage.name, **stage.stats}
+            row["busy_seconds"] = round(row["busy_seconds"], 3)
+            row["blocked_seconds"] = round(row["blocked_seconds"], 3)
+            rows.append(row)
+        return rows
+
+    def print_summary(self, elapsed):
+        """Print items and time per stage; blocked is time spent waiting for the next stage"""
+        print(f"\n=== Pipeline Summary ({self.site}, {elapsed:.1f}s) ===")
+        print(f"{'Stage':<12} {'Items':>6} {'Out':>6} {'Errors':>6} {'Busy':>9} {'Blocked':>9}")
+        for row in self.summary():
+            busy = "" if row["busy_seconds"] is None else f"{row['busy_seconds']:8.2f}s"
+            print(f"{row['stage']:<12} {row['items']:>6} {row['outputs']:>6} {row['errors']:>6} "
+                  f"{busy:>9} {row['blocked_seconds']:8.2f}s")
@@ -1,38 +1,40 @@
-from selenium import webdriver # done 
-from selenium.webdriver.common.by import By
+from selenium.webdriver.common.by import By # done 
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 import pandas as pd
-import time
 import re
+import http_cache
+from driver_pool import acquire_driver, release_driver
+from waits import wait_for_network_idle
 
 def scrape_welaka_candidates():
     """
     Scrapes candidate information from Welaka Town Council election page
     Dynamically handles multiple candidates
     """
+    url = "https://soe.putnam-fl.gov/2025-Elections/2025-Town-of-Welaka-Candidate-Contact-List"
     
-    # Setup Chrome options
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Remove this line if you want to see the browser
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
+    # One conditional request instead of a browser session when the page hasn't changed
+    if http_cache.unchanged(url, ["all_data_Putman.csv"]):
+        return pd.read_csv("all_data_Putman.csv").fillna("").to_dict("records")
     
-    # Initialize the driver
-    driver = webdriver.Chrome(options=chrome_options)
+    # Borrow a driver from the shared pool (pass headless=False to see the browser)
+    driver = acquire_driver(
+        headless=True,
+        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+        profile="throughput",
+        site="putman"
+    )
     
     try:
         # Navigate to the page
-        url = "https://soe.putnam-fl.gov/2025-Elections/2025-Town-of-Welaka-Candidate-Contact-List"
         print(f"Navigating to: {url}")
         driver.get(url)
         
         # Wait for the page to load
         wait = WebDriverWait(driver, 10)
         wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        time.sleep(2)  
+        wait_for_network_idle(driver, "putman")
         
         candidates = []
             
@@ -101,7 +103,7 @@ def scrape_welaka_candidates():
         return []
         
     finally:
-        driver.quit()
+        release_driver(driver)
 
 def extract_candidate_from_container(container):
     """
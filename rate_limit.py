@@ -0,0 +1,256 @@
+import asyncio
+import atexit
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlsplit
+
+import cassette
+
+# Adaptive per-host politeness.
+#
+# Every request to a portal goes through the limiter of its host:
+#
+#     with rate_limit.request(url) as req:
+#         driver.get(url)
+#         if page_looks_broken:
+#             req.error = True
+#
+# Each host has a token bucket (requests per second) and a concurrency limit.
+# Both grow additively while responses are fast and healthy and are halved on
+# a 429, a 5xx, an exception or a response slower than SLOW_FACTOR times the
+# target latency (AIMD, as in TCP congestion control).  A Retry-After header
+# pauses the host for the requested time.  So every portal runs as fast as it
+# tolerates instead of at a guessed fixed speed.
+
+# Starting point and bounds per host; anything not listed uses DEFAULT_SETTINGS
+DEFAULT_SETTINGS = {
+    "rate": 1.0,             # requests per second to start with
+    "min_rate": 0.1,
+    "max_rate": 10.0,
+    "burst": 2,              # tokens the bucket can hold
+    "concurrency": 1,        # requests in flight to start with
+    "max_concurrency": 8,
+    "target_latency": 3.0,   # seconds; slower responses stop the increase
+}
+
+HOST_SETTINGS = {
+    "efile.ethics.ga.gov": {"rate": 1.0, "max_rate": 5.0, "target_latency": 4.0},
+    "vrems.scvotes.sc.gov": {"rate": 0.5, "max_rate": 2.0},
+    "dos.elections.myflorida.com": {"rate": 1.0, "max_rate": 4.0},
+    "candidate.texas-election.com": {"rate": 1.0, "max_rate": 4.0, "target_latency": 5.0},
+}
+
+RATE_STEP = 0.1          # requests/second added after a healthy response
+SLOW_FACTOR = 2.0        # a response this many times the target latency counts as a failure
+DECREASE_INTERVAL = 1.0  # failures within this many seconds only halve the limits once
+BACKOFF_STATUSES = {429, 500, 502, 503, 504}
+
+# The synthetic stand-in portals (standin_portals.py) are local: scale tests
+# measure the scrapers, not the politeness delays
+UNPACED_SETTINGS = {"rate": 1000.0, "max_rate": 1000.0, "burst": 1000, "concurrency": 64, "max_concurrency": 64}
+
+
+class RequestSlot:
+    """One request holding a slot of a host limiter; set status/error/retry_after before it ends"""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.status = None
+        self.error = False
+        self.retry_after = None
+        self.started = time.time()
+
+    def report(self, status=None, error=False, retry_after=None):
+        self.status = status
+        self.error = error
+        self.retry_after = retry_after
+
+
+class HostLimiter:
+    def __init__(self, host, rate=1.0, min_rate=0.1, max_rate=10.0, burst=2, concurrency=1,
+                 max_concurrency=8, target_latency=3.0):
+        """
+        Token bucket plus AIMD concurrency control for one host
+
+        Args:
+            host (str): Host name (for reporting)
+            rate (float): Initial requests per second
+            min_rate / max_rate (float): Bounds for the rate
+            burst (int): Maximum number of tokens in the bucket
+            concurrency (int): Initial number of requests allowed in flight
+            max_concurrency (int): Upper bound for the concurrency
+            target_latency (float): Responses slower than this stop the increase
+        """
+        self.host = host
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.concurrency = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.tokens = 1.0
+        self.refilled_at = time.time()
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.decreased_at = 0.0
+        self.condition = threading.Condition()
+        self.stats = {"requests": 0, "backoffs": 0, "latency_total": 0.0}
+
+    def _try_acquire(self):
+        """Take a token and a concurrency slot; return 0 on success, else seconds to wait"""
+        now = time.time()
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= max(1, int(self.concurrency)):
+            return 0.05
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        self.tokens -= 1
+        self.in_flight += 1
+        return 0
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        with self.condition:
+            while True:
+                wait = self._try_acquire()
+                if not wait:
+                    return RequestSlot(self)
+                self.condition.wait(wait)
+
+    async def acquire_async(self):
+        """Wait without blocking the event loop until a request may be sent"""
+        while True:
+            with self.condition:
+                wait = self._try_acquire()
+            if not wait:
+                return RequestSlot(self)
+            await asyncio.sleep(min(wait, 0.25))
+
+    def release(self, slot):
+        """Give the slot back and adapt the limits to how the request went"""
+        latency = time.time() - slot.started
+        failed = slot.error or slot.status in BACKOFF_STATUSES or latency > self.target_latency * SLOW_FACTOR
+        with self.condition:
+            self.in_flight -= 1
+            self.stats["requests"] += 1
+            self.stats["latency_total"] += latency
+            now = time.time()
+            if failed:
+                # Multiplicative decrease, once per burst of failures
+                if now - self.decreased_at >= DECREASE_INTERVAL:
+                    self.rate = max(self.min_rate, self.rate / 2)
+                    self.concurrency = max(1.0, self.concurrency / 2)
+                    self.decreased_at = now
+                    self.stats["backoffs"] += 1
+                if slot.retry_after:
+                    self.paused_until = max(self.paused_until, now + slot.retry_after)
+            elif latency <= self.target_latency:
+                # Additive increase
+                self.rate = min(self.max_rate, self.rate + RATE_STEP)
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self.condition.notify_all()
+
+    def summary(self):
+        with self.condition:
+            requests = self.stats["requests"]
+            return {
+                "host": self.host,
+                "requests": requests,
+                "backoffs": self.stats["backoffs"],
+                "mean_latency": round(self.stats["latency_total"] / requests, 3) if requests else 0.0,
+                "rate": round(self.rate, 2),
+                "concurrency": int(self.concurrency),
+            }
+
+
+class RateLimiter:
+    def __init__(self, host_settings=None):
+        """Registry of per-host limiters, created on first use"""
+        self.host_settings = HOST_SETTINGS if host_settings is None else host_settings
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url_or_host):
+        return urlsplit(url_or_host).netloc or url_or_host
+
+    def configure(self, url_or_host, **settings):
+        """Override the settings of a host (e.g. from a scraper's delay argument)"""
+        host = self.host_of(url_or_host)
+        with self.lock:
+            self.host_settings = dict(self.host_settings)
+            self.host_settings[host] = {**self.host_settings.get(host, {}), **settings}
+            self.hosts.pop(host, None)
+
+    def get(self, url_or_host):
+        """Return the limiter for the host of a URL"""
+        host = self.host_of(url_or_host)
+        with self.lock:
+            if host not in self.hosts:
+                settings = {**DEFAULT_SETTINGS, **self.host_settings.get(host, {})}
+                if cassette.mode() == "synthetic":
+                    settings.update(UNPACED_SETTINGS)
+                self.hosts[host] = HostLimiter(host, **settings)
+            return self.hosts[host]
+
+    @contextmanager
+    def request(self, url):
+        """Hold a request slot for url's host while the block runs (exceptions count as errors)"""
+        host_limiter = self.get(url)
+        slot = host_limiter.acquire()
+        try:
+            yield slot
+        except Exception:
+            slot.error = True
+            raise
+        finally:
+            host_limiter.release(slot)
+
+    @asynccontextmanager
+    async def request_async(self, url):
+        """Async version of request()"""
+        host_limiter = self.get(url)
+        slot = await host_limiter.acquire_async()
+        try:
+            yield slot
+        except Exception:
+            slot.error = True
+            raise
+        finally:
+            host_limiter.release(slot)
+
+    def summary(self):
+        with self.lock:
+            limiters = list(self.hosts.values())
+        return [host_limiter.summary() for host_limiter in limiters]
+
+
+limiter = RateLimiter()
+
+
+def request(url):
+    """Hold a request slot of the shared limiter (see RateLimiter.request)"""
+    return limiter.request(url)
+
+
+def configure(url_or_host, **settings):
+    """Override the settings of a host in the shared limiter"""
+    limiter.configure(url_or_host, **settings)
+
+
+@atexit.register
+def print_summary():
+    """Print the pace each host ended up at"""
+    rows = [row for row in limiter.summary() if row["requests"]]
+    if not rows:
+        return
+    print("\n=== Rate Limit Summary ===")
+    print(f"{'Host':<32} {'Requests':>8} {'Backoffs':>8} {'Latency':>8} {'Rate':>6} {'Conc':>5}")
+    for row in rows:
+        print(f"{row['host']:<32} {row['requests']:>8} {row['backoffs']:>8} {row['mean_latency']:>7.2f}s "
+              f"{row['rate']:>5.1f}/s {row['concurrency']:>5}")
@@ -0,0 +1,108 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Persistent index of the rows already in a CSV (all_data.csv).
+#
+# Each row is reduced to a 64-bit fingerprint (pandas' hash_pandas_object over
+# the given columns, which is stable between runs) and the fingerprints are
+# kept as a sorted array in <csv>.rowhash.npy.  Telling which incoming rows are
+# new is then a binary search per row instead of a merge against the whole
+# master, and the master doesn't have to be read at all:
+#
+#     index = RowIndex("all_data.csv", final_columns, load_csv)
+#     new_rows = df[index.add(df)]        # also adds them to the index
+#     ...append new_rows to all_data.csv...
+#     index.save()
+#
+# <csv>.rowhash.json records the CSV's size when the index was saved.  If the
+# CSV was changed by anything else (edited, replaced, or a run crashed between
+# appending and saving) the sizes differ and the index is rebuilt from the CSV.
+# The same works for a columnar dataset (datasets.py) when its size is passed.
+
+
+class RowIndex:
+    def __init__(self, csv_path, columns, load_csv, size=None, version=1):
+        """
+        Args:
+            csv_path (str): The CSV (or dataset directory) whose rows are indexed
+            columns (list): Columns that make up a row's identity
+            load_csv (callable): load_csv(path) -> normalized DataFrame, used to rebuild the index
+            size (callable): size() -> bytes the data takes on disk (default: the CSV's file size)
+            version (int): Version of the row form load_csv produces (an index of another version is rebuilt)
+        """
+        self.csv_path = csv_path
+        self.columns = list(columns)
+        self.load_csv = load_csv
+        self.size = size
+        self.version = version
+        self.path = csv_path + ".rowhash.npy"
+        self.meta_path = csv_path + ".rowhash.json"
+        self.hashes = None
+        self.rebuilt = False
+
+    def _csv_size(self):
+        if self.size is not None:
+            return self.size()
+        return os.path.getsize(self.csv_path) if os.path.exists(self.csv_path) else 0
+
+    def _is_current(self):
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return (os.path.exists(self.path) and meta.get("columns") == self.columns
+                and meta.get("version", 1) == self.version and meta.get("csv_size") == self._csv_size())
+
+    def load(self):
+        """Load the index, rebuilding it from the CSV if it is missing or out of date"""
+        if self._is_current():
+            self.hashes = np.load(self.path)
+        else:
+            df = self.load_csv(self.csv_path) if os.path.exists(self.csv_path) else pd.DataFrame(columns=self.columns)
+            self.hashes = np.unique(self.fingerprints(df))
+            self.rebuilt = True
+        return self
+
+    def fingerprints(self, df):
+        """64-bit fingerprint of every row of df (over the index columns)"""
+        if df.empty:
+            return np.empty(0, dtype=np.uint64)
+        return pd.util.hash_pandas_object(df[self.columns], index=False).to_numpy(dtype=np.uint64)
+
+    def add(self, df):
+        """
+        Add the rows of df to the index
+
+        Returns:
+            ndarray: Boolean mask of the rows that were new (repeats within df count once)
+        """
+        hashes = self.fingerprints(df)
+        if not len(hashes):
+            return np.zeros(0, dtype=bool)
+        known = np.zeros(len(hashes), dtype=bool)
+        if len(self.hashes):
+            positions = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+            known = self.hashes[positions] == hashes
+        # Only the first of several identical incoming rows is new
+        _, first = np.unique(hashes, return_index=True)
+        first_seen = np.zeros(len(hashes), dtype=bool)
+        first_seen[first] = True
+        new = first_seen & ~known
+        self.hashes = np.union1d(self.hashes, hashes[new])
+        return new
+
+    def __len__(self):
+        return 0 if self.hashes is None else len(self.hashes)
+
+    def save(self):
+        """Write the index together with the CSV's current size (call after the CSV was written)"""
+        tmp_path = self.path + ".tmp.npy"
+        np.save(tmp_path, self.hashes)
+        os.replace(tmp_path, self.path)
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump({"columns": self.columns, "version": self.version, "rows": len(self),
+                       "csv_size": self._csv_size()}, f, indent=2)
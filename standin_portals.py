@@ -0,0 +1,452 @@
+import argparse
+import html
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from urllib.parse import parse_qsl, quote, urlsplit
+
+# Synthetic stand-ins for the portals, for scale tests.
+#
+# Each stand-in mimics the pages its scraper expects (the Georgia candidate
+# table with its Next button and exploreDetails pages, the Texas nbElecYear /
+# idElection form, the South Carolina ElectionDate / btnSearchByDate / export
+# flow) but generates any number of elections and candidates on the fly.
+# They are served by the cassette proxy in synthetic mode, so the scrapers run
+# unchanged against the real URLs:
+#
+#     SCRAPER_CASSETTE_MODE=synthetic SCRAPER_SYNTHETIC="candidates=5000,elections=3" python Texas_Elections.py
+#
+# and scaling curves (wall time and rows per size) come from
+#
+#     python standin_portals.py curve georgia texas southcarolina --sizes 100 1000 10000
+#
+# Settings (SCRAPER_SYNTHETIC, comma separated key=value):
+#   candidates   candidates per election (Georgia: in total)
+#   elections    elections per year (Texas) / election dates (South Carolina)
+#   page_size    rows per Georgia table page and per South Carolina result page
+#                (the Georgia scraper stops after 50 pages, raise it for big runs)
+#   seed         changes the generated names
+# The same settings always produce the same data.
+
+SETTINGS_ENV = "SCRAPER_SYNTHETIC"
+DEFAULT_SETTINGS = {"candidates": 200, "elections": 3, "page_size": 20, "seed": 1}
+
+# Scrapers that have a stand-in, with the host their portal lives on
+SCRAPER_HOSTS = {
+    "georgia": "efile.ethics.ga.gov",
+    "texas": "candidate.texas-election.com",
+    "southcarolina": "vrems.scvotes.sc.gov",
+}
+
+FIRST_NAMES = ["JAMES", "MARY", "ROBERT", "PATRICIA", "JOHN", "JENNIFER", "MICHAEL", "LINDA", "DAVID",
+               "ELIZABETH", "WILLIAM", "BARBARA", "RICHARD", "SUSAN", "JOSEPH", "JESSICA", "THOMAS", "KAREN",
+               "CHARLES", "SARAH", "MARIA", "DANIEL", "NANCY", "MATTHEW", "LISA", "ANTHONY", "BETTY"]
+LAST_NAMES = ["SMITH", "JOHNSON", "WILLIAMS", "BROWN", "JONES", "GARCIA", "MILLER", "DAVIS", "RODRIGUEZ",
+              "MARTINEZ", "HERNANDEZ", "LOPEZ", "GONZALEZ", "WILSON", "ANDERSON", "THOMAS", "TAYLOR", "MOORE",
+              "JACKSON", "MARTIN", "LEE", "PEREZ", "THOMPSON", "WHITE", "HARRIS", "SANCHEZ", "CLARK"]
+STREETS = ["MAIN ST", "OAK AVE", "PINE ST", "MAPLE DR", "CEDAR LN", "ELM ST", "WASHINGTON BLVD", "LAKE RD"]
+PARTIES = ["REPUBLICAN", "DEMOCRATIC", "LIBERTARIAN", "GREEN", "INDEPENDENT"]
+OCCUPATIONS = ["ATTORNEY", "TEACHER", "RANCHER", "BUSINESS OWNER", "NURSE", "ENGINEER", "RETIRED"]
+# Every Texas office contains a word the Texas parser recognises as a position
+OFFICES = ["STATE REPRESENTATIVE, DISTRICT {n}", "STATE SENATOR, DISTRICT {n}", "DISTRICT JUDGE, {n} DISTRICT",
+           "COUNTY COMMISSIONER, PRECINCT {n} DISTRICT", "U.S. REPRESENTATIVE, DISTRICT {n}"]
+CITIES = {
+    "georgia": [("ATLANTA", "GA", "303"), ("SAVANNAH", "GA", "314"), ("MACON", "GA", "312")],
+    "texas": [("AUSTIN", "TX", "787"), ("HOUSTON", "TX", "770"), ("DALLAS", "TX", "752")],
+    "southcarolina": [("COLUMBIA", "SC", "292"), ("CHARLESTON", "SC", "294"), ("GREENVILLE", "SC", "296")],
+}
+SC_COUNTIES = ["Richland", "Charleston", "Greenville", "Horry", "Spartanburg", "Lexington"]
+
+
+def settings():
+    """Return the stand-in settings from SCRAPER_SYNTHETIC merged over the defaults"""
+    values = dict(DEFAULT_SETTINGS)
+    for part in os.environ.get(SETTINGS_ENV, "").split(","):
+        key, _, value = part.partition("=")
+        key = key.strip()
+        if key in values and value.strip():
+            values[key] = int(value)
+    return values
+
+
+def candidate(site, election, index):
+    """Generate candidate number index of an election (always the same for the same settings)"""
+    rng = random.Random(f"{settings()['seed']}|{site}|{election}|{index}")
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    city, state, zip_prefix = rng.choice(CITIES[site])
+    return {
+        "first": first,
+        "last": last,
+        "office": rng.choice(OFFICES).format(n=rng.randint(1, 150)),
+        "party": rng.choice(PARTIES),
+        "occupation": rng.choice(OCCUPATIONS),
+        "email": f"{first.lower()}.{last.lower()}{index}@example.com",
+        "phone": f"({rng.randint(200, 989)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+        "street": f"{rng.randint(1, 9999)} {rng.choice(STREETS)}",
+        "city": city,
+        "state": state,
+        "zip": f"{zip_prefix}{rng.randint(0, 99):02d}",
+        "filed": (date(date.today().year, 1, 1) + timedelta(days=rng.randint(0, 300))).strftime("%m/%d/%Y"),
+    }
+
+
+# -- responses ----------------------------------------------------------------
+
+def _html(body, status=200):
+    page = f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Stand-in portal</title></head><body>{body}</body></html>"
+    return status, [("Content-Type", "text/html; charset=utf-8"), ("Cache-Control", "no-store")], page.encode("utf-8")
+
+
+def _json(value):
+    return 200, [("Content-Type", "application/json")], json.dumps(value).encode("utf-8")
+
+
+def _redirect(location):
+    return 302, [("Location", location)], b""
+
+
+def _not_found(path):
+    return 404, [("Content-Type", "text/plain")], f"No stand-in page for {path}".encode("utf-8")
+
+
+# -- Georgia: paginated candidate table and exploreDetails pages ---------------
+
+GEORGIA_APP = """
+<div id="app">Loading...</div>
+<script>
+var page = 0;
+function load() {
+    fetch('/api/candidates?page=' + page).then(function (r) { return r.json(); }).then(render);
+}
+function render(data) {
+    var rows = data.rows.map(function (c) {
+        return '<tr><td><a href="/exploreDetails?id=' + c.id + '">' + c.name + '</a></td><td>' + c.office + '</td></tr>';
+    }).join('');
+    document.getElementById('app').innerHTML =
+        '<table><tbody md-body>' + rows + '</tbody></table>' +
+        '<button ng-click="pagination.next()" onclick="page++; load();"' + (data.has_next ? '' : ' disabled') + '>Next</button>';
+}
+load();
+</script>
+"""
+
+
+def georgia(method, path, query, form):
+    config = settings()
+    if path in ("/", "/index.html"):
+        return _html(GEORGIA_APP)
+    if path == "/api/candidates":
+        page = int(query.get("page", 0))
+        start = page * config["page_size"]
+        end = min(config["candidates"], start + config["page_size"])
+        rows = []
+        for index in range(start, end):
+            person = candidate("georgia", 0, index)
+            rows.append({"id": index, "name": f"{person['last']}, {person['first']}", "office": person["office"]})
+        return _json({"rows": rows, "has_next": end < config["candidates"]})
+    if path == "/exploreDetails":
+        index = int(query.get("id", -1))
+        if not 0 <= index < config["candidates"]:
+            return _not_found(path)
+        person = candidate("georgia", 0, index)
+        fields = [
+            ("Status", "Active"),
+            ("Candidate Email", person["email"]),
+            ("Candidate Address", f"{person['street']}<br>{person['city']}, {person['state']} {person['zip']}"),
+            ("Treasurer", f"{person['first']} {person['last']} JR"),
+            ("Chairperson", f"{person['last']} FOR OFFICE"),
+            ("Committee Name", f"COMMITTEE TO ELECT {person['first']} {person['last']}"),
+            ("Committee Email", f"committee{index}@example.com"),
+            ("Election(s)", f"{date.today().year} GENERAL ELECTION"),
+            ("Date Registered", person["filed"]),
+        ]
+        body = "".join(f'<div class="field"><div class="label">{label}</div><div class="value">{value}</div></div>'
+                       for label, value in fields)
+        return _html(f"<h1>{html.escape(person['last'])}, {html.escape(person['first'])}</h1>{body}")
+    return _not_found(path)
+
+
+# -- Texas: year / election dropdowns and the qualified candidates page --------
+
+TEXAS_SCRIPT = """
+<script>
+function loadElections(year) {
+    fetch('/Elections/elections.do?year=' + year).then(function (r) { return r.json(); }).then(function (list) {
+        document.getElementById('idElection').innerHTML = '<option value="">Select Election</option>' +
+            list.map(function (e) { return '<option value="' + e.value + '">' + e.text + '</option>'; }).join('');
+    });
+}
+function submitForm() { document.getElementById('searchForm').submit(); }
+</script>
+"""
+
+
+def texas_years():
+    year = date.today().year
+    return [str(year - 2), str(year - 1), str(year)]
+
+
+def texas_elections(year):
+    kinds = ["REPUBLICAN PRIMARY ELECTION", "DEMOCRATIC PRIMARY ELECTION", "GENERAL ELECTION", "SPECIAL ELECTION"]
+    return [{"value": f"{year}{index:03d}", "text": f"{year} {kinds[index % len(kinds)]} {index // len(kinds) + 1}"}
+            for index in range(settings()["elections"])]
+
+
+def _texas_page(year="", election="", results=""):
+    years = "".join(f'<option value="{y}"{" selected" if y == year else ""}>{y}</option>' for y in texas_years())
+    elections = "".join(f'<option value="{e["value"]}"{" selected" if e["value"] == election else ""}>{e["text"]}</option>'
+                        for e in (texas_elections(year) if year else []))
+    return _html(f"""
+<form id="searchForm" method="post" action="/Elections/getQualifiedCandidatesInfo.do">
+  <div class="form-group"><label for="nbElecYear">Election Year</label>
+    <select id="nbElecYear" name="nbElecYear" onchange="loadElections(this.value)">
+      <option value="">Select Year</option>{years}</select></div>
+  <div class="form-group"><label for="idElection">Election</label>
+    <select id="idElection" name="idElection"><option value="">Select Election</option>{elections}</select></div>
+  <button type="button" class="btn btn-primary" onclick="submitForm()">Qualified Candidates Information</button>
+</form>
+<div class="results">{results}</div>
+{TEXAS_SCRIPT}""")
+
+
+def texas(method, path, query, form):
+    if path == "/Elections/elections.do":
+        return _json(texas_elections(query.get("year", "")))
+    if path != "/Elections/getQualifiedCandidatesInfo.do":
+        return _not_found(path)
+    if method != "POST":
+        return _texas_page()
+    year, election = form.get("nbElecYear", ""), form.get("idElection", "")
+    blocks = []
+    for index in range(settings()["candidates"]):
+        person = candidate("texas", election, index)
+        lines = [
+            person["office"],
+            f"{person['first']} {person['last']}",
+            f"PARTY: {person['party']}",
+            "STATUS: QUALIFIED",
+            f"OCCUPATION: {person['occupation']}",
+            person["email"],
+            f"{person['street']}, {person['city']}, {person['state']} {person['zip']} {person['phone']}",
+            f"FILING DATE: {person['filed']}",
+        ]
+        blocks.append('<div class="row mb-3"><div class="col">' +
+                      "".join(f"<div>{html.escape(line)}</div>" for line in lines) + "</div></div>")
+    return _texas_page(year, election, "".join(blocks))
+
+
+# -- South Carolina: election date search, results and CSV export --------------
+
+SC_COLUMNS = ["Election", "Office", "Candidate First Name", "Candidate Last Name", "Party", "Status",
+              "Associated Counties", "Contact Address", "Contact Email", "Contact Phone Number", "Filing Date"]
+
+
+def sc_election_dates():
+    """Election dates spread over the range the scraper searches (today until the end of the year)"""
+    today = date.today()
+    end = date(today.year, 12, 31)
+    days = (end - today).days + 1
+    count = min(settings()["elections"], days)
+    step = days / count if count else days
+    return {(today + timedelta(days=int(i * step))).strftime("%m/%d/%Y") for i in range(count)}
+
+
+def _sc_rows(election_date):
+    for index in range(settings()["candidates"]):
+        person = candidate("southcarolina", election_date, index)
+        yield [
+            f"{election_date} Municipal Election", person["office"].title(), person["first"].title(),
+            person["last"].title(), person["party"].title(), "Active", SC_COUNTIES[index % len(SC_COUNTIES)],
+            f"{person['street'].title()}, {person['city'].title()}, {person['state']} {person['zip']}",
+            person["email"], person["phone"], person["filed"],
+        ]
+
+
+def southcarolina(method, path, query, form):
+    import csv
+    import io
+
+    if path == "/Candidate/SearchElectionDate":
+        message = ""
+        if method == "POST":
+            election_date = form.get("ElectionDate", "").strip()
+            if election_date in sc_election_dates():
+                return _redirect(f"/Candidate/ElectionDetails?electionDate={quote(election_date, safe='')}")
+            message = f"<p class=\"alert\">No elections found for {html.escape(election_date)}.</p>"
+        return _html(f"""
+<form method="post" action="/Candidate/SearchElectionDate">
+  <label for="ElectionDate">Election Date</label>
+  <input id="ElectionDate" name="ElectionDate" type="text">
+  <button type="submit" class="btn btn-primary">View Details</button>
+</form>{message}""")
+
+    election_date = query.get("electionDate", "")
+    if election_date not in sc_election_dates():
+        return _not_found(path)
+    encoded = quote(election_date, safe="")
+    if path == "/Candidate/ElectionDetails":
+        return _html(f"""
+<h2>Election {html.escape(election_date)}</h2>
+<button id="btnSearchByDate" type="button" class="btn btn-primary" onclick="search()">Search</button>
+<div id="results"></div>
+<script>
+function search() {{
+    fetch('/Candidate/SearchDateResults?electionDate={encoded}').then(function (r) {{ return r.text(); }})
+        .then(function (html) {{ document.getElementById('results').innerHTML = html; }});
+}}
+</script>""")
+    if path == "/Candidate/SearchDateResults":
+        rows = []
+        for row in _sc_rows(election_date):
+            if len(rows) == settings()["page_size"]:
+                break
+            rows.append("<tr>" + "".join(f"<td>{html.escape(value)}</td>" for value in row) + "</tr>")
+        header = "".join(f"<th>{column}</th>" for column in SC_COLUMNS)
+        fragment = (f'<a class="btn" href="/Candidate/ExportSearchDateResults?electionDate={encoded}">Export</a>'
+                    f"<table><thead><tr>{header}</tr></thead><tbody>{''.join(rows)}</tbody></table>")
+        return 200, [("Content-Type", "text/html; charset=utf-8")], fragment.encode("utf-8")
+    if path == "/Candidate/ExportSearchDateResults":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(SC_COLUMNS)
+        writer.writerows(_sc_rows(election_date))
+        return 200, [("Content-Type", "text/csv"),
+                     ("Content-Disposition", 'attachment; filename="CandidateSearchResults.csv"')], \
+            buffer.getvalue().encode("utf-8")
+    return _not_found(path)
+
+
+PORTALS = {
+    SCRAPER_HOSTS["georgia"]: georgia,
+    SCRAPER_HOSTS["texas"]: texas,
+    SCRAPER_HOSTS["southcarolina"]: southcarolina,
+}
+
+
+def respond(method, url, body=b""):
+    """
+    Answer one request for a stand-in portal
+
+    Returns:
+        tuple: (status, headers as (name, value) pairs, body bytes)
+    """
+    parts = urlsplit(url)
+    portal = PORTALS.get(parts.hostname)
+    if portal is None:
+        return 404, [("Content-Type", "text/plain")], f"No stand-in portal for {parts.hostname}".encode("utf-8")
+    query = dict(parse_qsl(parts.query))
+    form = dict(parse_qsl(body.decode("utf-8", errors="replace"))) if body else {}
+    return portal(method, parts.path, query, form)
+
+
+# -- scaling curves -----------------------------------------------------------
+
+def count_rows(path):
+    """Number of data rows in a CSV output (0 if it is missing)"""
+    if not os.path.exists(path):
+        return 0
+    import csv
+    with open(path, newline="", encoding="utf-8") as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+
+def run_scraper(name, candidates, elections, page_size=DEFAULT_SETTINGS["page_size"], timeout=None):
+    """Run one scraper against its stand-in in a scratch directory; return (seconds, rows, ok)"""
+    import ProcessAll
+
+    task = ProcessAll.TASKS[name]
+    workdir = tempfile.mkdtemp(prefix=f"standin-{name}-")
+    env = dict(os.environ)
+    env.update({
+        "SCRAPER_CASSETTE_MODE": "synthetic",
+        SETTINGS_ENV: f"candidates={candidates},elections={elections},page_size={page_size}",
+        "SCRAPER_FRESH_RUN": "1",
+        "PYTHONPATH": os.pathsep.join(filter(None, [ProcessAll.BASE_DIR, env.get("PYTHONPATH")])),
+    })
+    start = time.time()
+    try:
+        with open(os.path.join(workdir, "scraper.log"), "w", encoding="utf-8") as log:
+            result = subprocess.run([sys.executable, os.path.join(ProcessAll.BASE_DIR, task["script"])],
+                                    cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT, timeout=timeout)
+        ok = result.returncode == 0
+    except subprocess.TimeoutExpired:
+        ok = False
+    elapsed = time.time() - start
+    rows = sum(count_rows(os.path.join(workdir, output)) for output in task["outputs"])
+    if ok:
+        shutil.rmtree(workdir, ignore_errors=True)
+    else:
+        print(f"  {name} failed, see {os.path.join(workdir, 'scraper.log')}")
+    return elapsed, rows, ok
+
+
+def scaling_curve(names, sizes, elections=DEFAULT_SETTINGS["elections"], page_size=DEFAULT_SETTINGS["page_size"],
+                  timeout=None):
+    """Time each scraper at each candidate count and return the measurements"""
+    points = []
+    for name in names:
+        for size in sizes:
+            print(f"{name}: {size} candidates x {elections} elections...")
+            elapsed, rows, ok = run_scraper(name, size, elections, page_size, timeout)
+            points.append({
+                "scraper": name,
+                "candidates": size,
+                "elections": elections,
+                "seconds": round(elapsed, 3),
+                "rows": rows,
+                "rows_per_second": round(rows / elapsed, 2) if elapsed else 0.0,
+                "ok": ok,
+            })
+    return points
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic stand-in portals for scale tests")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    curve = subcommands.add_parser("curve", help="Time scrapers against stand-ins of growing size")
+    curve.add_argument("scrapers", nargs="+", choices=sorted(SCRAPER_HOSTS))
+    curve.add_argument("--sizes", nargs="+", type=int, default=[100, 1000, 10000],
+                       help="Candidate counts to measure")
+    curve.add_argument("--elections", type=int, default=DEFAULT_SETTINGS["elections"])
+    curve.add_argument("--page-size", type=int, default=DEFAULT_SETTINGS["page_size"])
+    curve.add_argument("--timeout", type=float, help="Give up on a run after this many seconds")
+    curve.add_argument("--output", default="scaling.json", help="Where to write the measurements")
+
+    serve = subcommands.add_parser("serve", help="Run the stand-ins behind a proxy for manual browsing")
+    serve.add_argument("--port", type=int, default=8899)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        import cassette
+        os.environ["SCRAPER_CASSETTE_MODE"] = "synthetic"
+        proxy = cassette.CassetteProxy(port=args.port)
+        print(f"Stand-in portals behind proxy {proxy.url} (start Chrome with --proxy-server={proxy.url} "
+              f"--ignore-certificate-errors); Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            proxy.stop()
+        return 0
+
+    points = scaling_curve(args.scrapers, args.sizes, args.elections, args.page_size, args.timeout)
+    print(f"\n{'Scraper':<15} {'Candidates':>10} {'Rows':>8} {'Seconds':>9} {'Rows/s':>8}")
+    for point in points:
+        print(f"{point['scraper']:<15} {point['candidates']:>10} {point['rows']:>8} {point['seconds']:>8.1f}s "
+              f"{point['rows_per_second']:>8.1f}{'' if point['ok'] else '  FAILED'}")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "points": points}, f, indent=2)
+    print(f"Measurements saved to {args.output}")
+    return 0 if all(point["ok"] for point in points) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+import time
+
+import pandas as pd
+
+from datasets import read_input
+
+# How each scraper's all_data_<state>.csv maps onto the combined columns.
+#
+# An adapter is plain data; transform() applies it in this order:
+#
+#   usecols     only read these columns
+#   filter      keep rows whose column is one of the listed values
+#   join        build a column from several others, joined with a space
+#   split_name  split a full-name column into two (on sep, or on whitespace when sep is None)
+#   rename      source column -> combined column
+#   constants   combined columns with a fixed value
+#
+# after which the combined columns are selected.  DATA_INTEGRATION.py runs the
+# adapters in a process pool, concatenates the results and converts them to the
+# canonical form (canonical_frame) once, then merges them in one step.  Bump an
+# adapter's version when its mapping changes, so an unchanged input file is
+# merged again (see input_manifest.py).
+
+final_columns = [
+    "First Name", "Last Name", "Email Address", "Phone Number",
+    "Political Title", "State", "Address", "Party Affiliation"
+]
+
+ADAPTERS = [
+    {
+        "name": "florida",
+        "label": "Florida",
+        "file": "all_data_florida.csv",
+        "version": 2,
+        "filter": {"StatusDesc": ["Elected", "Defeated", "Qualified"]},
+        "join": {"NameFirst": ["NameFirst", "NameMiddle"]},
+        "rename": {
+            "NameFirst": "First Name",
+            "NameLast": "Last Name",
+            "Email": "Email Address",
+            "Phone": "Phone Number",
+            "OfficeDesc": "Political Title",
+            "Addr1": "Address",
+            "PartyCode": "Party Affiliation"
+        },
+    },
+    {
+        "name": "georgia",
+        "label": "Georgia",
+        "file": "all_data_georgia.csv",
+        "version": 2,
+        "split_name": {"column": "Name", "sep": ",", "into": ["Last Name", "First Name"]},
+        "rename": {
+            "Candidate Email": "Email Address",
+            "Office": "Political Title",
+            "Candidate Address": "Address"
+        },
+        "constants": {"Phone Number": "", "State": "Georgia", "Party Affiliation": ""},
+    },
+    {
+        "name": "louisiana",
+        "label": "Louisiana",
+        "file": "all_data_louisiana.csv",
+        "version": 2,
+        "usecols": ["BallotFirstName", "BallotLastName", "Email Address", "Phone",
+                    "OfficeTitle", "State", "Address", "Party"],
+        "rename": {
+            "BallotFirstName": "First Name",
+            "BallotLastName": "Last Name",
+            "Phone": "Phone Number",
+            "OfficeTitle": "Political Title",
+            "Party": "Party Affiliation"
+        },
+    },
+    {
+        "name": "putman",
+        "label": "Putman",
+        "file": "all_data_Putman.csv",
+        "version": 2,
+        "usecols": ["name", "email", "phone", "address", "party"],
+        "split_name": {"column": "name", "sep": None, "into": ["First Name", "Last Name"]},
+        "rename": {
+            "email": "Email Address",
+            "phone": "Phone Number",
+            "address": "Address",
+            "party": "Party Affiliation"
+        },
+        "constants": {"Political Title": "", "State": ""},
+    },
+    {
+        "name": "shawnee",
+        "label": "Shawnee",
+        "file": "all_data_shawnee.csv",
+        "version": 2,
+        "usecols": ["name", "email", "phone", "office", "city", "address"],
+        "split_name": {"column": "name", "sep": None, "into": ["First Name", "Last Name"]},
+        "rename": {
+            "email": "Email Address",
+            "phone": "Phone Number",
+            "office": "Political Title",
+            "city": "State",
+            "address": "Address"
+        },
+        "constants": {"Party Affiliation": ""},
+    },
+    {
+        "name": "southcarolina",
+        "label": "South Carolina",
+        "file": "all_data_SouthCarolina.csv",
+        "version": 2,
+        "usecols": ["Candidate First Name", "Candidate Last Name", "Contact Email",
+                    "Contact Phone Number", "Office", "Associated Counties", "Contact Address", "Party"],
+        "rename": {
+            "Candidate First Name": "First Name",
+            "Candidate Last Name": "Last Name",
+            "Contact Email": "Email Address",
+            "Contact Phone Number": "Phone Number",
+            "Office": "Political Title",
+            "Associated Counties": "State",
+            "Contact Address": "Address",
+            "Party": "Party Affiliation"
+        },
+    },
+    {
+        # The Texas scraper already writes the combined columns
+        "name": "texas",
+        "label": "Texas",
+        "file": "all_data_texas.csv",
+        "version": 2,
+        "usecols": final_columns,
+    },
+    {
+        "name": "virginia",
+        "label": "Virginia",
+        "file": "all_data_virginia.csv",
+        "version": 2,
+        "split_name": {"column": "Candidate Name", "sep": None, "into": ["First Name", "Last Name"]},
+        "rename": {
+            "Email": "Email Address",
+            "Phone": "Phone Number",
+            "Office Title": "Political Title",
+            "Political Party": "Party Affiliation"
+        },
+    },
+]
+
+ADAPTERS_BY_NAME = {adapter["name"]: adapter for adapter in ADAPTERS}
+
+# The canonical in-memory form of combined records: pandas string columns with
+# real missing values (<NA>, never '' or 'nan'), and categoricals for the
+# columns with few distinct values.  Row fingerprints (row_index.py) are taken
+# over this form, so bump CANONICAL_VERSION whenever it changes; the index is
+# rebuilt once then.
+#
+# Masters written before the inputs were read as strings hold numbers the way
+# pandas inferred them, as floats ("5551234567.0" next to a new "5551234567"),
+# so an integral ".0" is dropped from numeric values.
+CANONICAL_VERSION = 3
+CATEGORICAL_COLUMNS = ["Political Title", "State", "Party Affiliation"]
+MISSING_VALUES = ["", "nan", "NaN", "None"]
+INTEGRAL_FLOAT = r"^(-?\d+)\.0$"
+
+
+def canonical_frame(df):
+    """
+    Convert records to the canonical form (build it once per frame, it is kept through the run)
+
+    Args:
+        df (DataFrame): Records with final_columns, any dtypes
+
+    Returns:
+        DataFrame: final_columns only, string / category dtypes, missing values as <NA>
+    """
+    columns = {}
+    for column in final_columns:
+        values = df[column].astype("string")
+        values = values.mask(values.isin(MISSING_VALUES))
+        values = values.str.replace(INTEGRAL_FLOAT, r"\1", regex=True)
+        if column in CATEGORICAL_COLUMNS:
+            values = values.astype("category")
+        columns[column] = values.array
+    return pd.DataFrame(columns, index=df.index)
+
+
+def apply_adapter(adapter, df):
+    """Map a state's rows onto final_columns as described by adapter"""
+    for column, values in adapter.get("filter", {}).items():
+        df = df[df[column].isin(values)]
+    df = df.copy()
+    for column, sources in adapter.get("join", {}).items():
+        joined = df[sources[0]].fillna('')
+        for source in sources[1:]:
+            joined = joined + " " + df[source].fillna('')
+        df[column] = joined.str.strip()
+    split = adapter.get("split_name")
+    if split:
+        parts = df[split["column"]].str.strip().str.split(split["sep"], n=1, expand=True)
+        parts = parts.reindex(columns=range(2))
+        for position, column in enumerate(split["into"]):
+            df[column] = parts[position].str.strip()
+    df = df.rename(columns=adapter.get("rename", {}))
+    for column, value in adapter.get("constants", {}).items():
+        df[column] = value
+    return df[final_columns]
+
+
+def transform(adapter):
+    """
+    Read and map one state's input (runs in a worker process)
+
+    Returns:
+        tuple: (adapter name, DataFrame or None, error message or None,
+                seconds per stage: {"parse": ..., "normalize": ...} for the parent to record)
+    """
+    timings = {}
+    try:
+        start = time.perf_counter()
+        df = read_input(adapter["file"], adapter.get("usecols"))
+        timings["parse"] = time.perf_counter() - start
+        start = time.perf_counter()
+        df = apply_adapter(adapter, df)
+        timings["normalize"] = time.perf_counter() - start
+        return adapter["name"], df, None, timings
+    except Exception as e:
+        return adapter["name"], None, str(e), timings
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datasets  # noqa: E402
+import DATA_INTEGRATION  # noqa: E402
+from state_adapters import canonical_frame, final_columns  # noqa: E402
+
+STORAGES = ["csv", pytest.param("parquet", marks=pytest.mark.skipif(datasets.pa is None, reason="needs pyarrow"))]
+
+
+def write_baseline_master(path):
+    """all_data.csv the way the baseline wrote it: numbers inferred as floats, missing values empty"""
+    df = pd.DataFrame([["T1", "X", "t@x", 5551234567.0, "Mayor", "Texas", "1 Main", float("nan")],
+                       ["T2", "Y", "y@x", float("nan"), "Clerk", "Texas", "2 Main", "R"]],
+                      columns=final_columns)
+    df.to_csv(path, index=False)
+
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_baseline_master_rows_are_not_appended_again(tmp_path, monkeypatch, storage):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(datasets, "STORAGE", storage)
+    monkeypatch.delenv("SCRAPER_FRESH_RUN", raising=False)
+    write_baseline_master("all_data.csv")
+    # The same two candidates plus a new one, as the Texas scraper writes them now
+    pd.DataFrame([["T1", "X", "t@x", "5551234567", "Mayor", "Texas", "1 Main", ""],
+                  ["T2", "Y", "y@x", "", "Clerk", "Texas", "2 Main", "R"],
+                  ["T3", "Z", "z@x", "5550000000", "Judge", "Texas", "3 Main", "D"]],
+                 columns=final_columns).to_csv("all_data_texas.csv", index=False)
+
+    DATA_INTEGRATION.main()
+
+    master = datasets.Dataset("all_data.csv", final_columns).read()
+    assert sorted(master["First Name"]) == ["T1", "T2", "T3"]
+    assert set(canonical_frame(master)["Phone Number"].dropna()) == {"5551234567", "5550000000"}
+    if storage != "csv":
+        # The imported master is stored in the canonical form; a CSV master keeps its text
+        assert set(master["Phone Number"].dropna()) == {"5551234567", "5550000000"}
+
+    # A second run with unchanged inputs adds nothing
+    os.remove("integration_manifest.json")
+    DATA_INTEGRATION.main()
+    assert len(datasets.Dataset("all_data.csv", final_columns).read()) == 3
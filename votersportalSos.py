@@ -1,74 +1,40 @@
-from selenium import webdriver # done 
-from selenium.webdriver.common.by import By
+from selenium.webdriver.common.by import By # done 
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-import time
 import os
 import glob
+import deadline
+from driver_pool import acquire_driver, release_driver
+from waits import wait_for_dom_ready, wait_for_network_idle
+from downloads import DownloadWatcher
+from network_capture import CAPTURE_EXPORTS, capture_click
 
 def setup_chrome_driver():
-    """Setup Chrome driver with download preferences"""
-    chrome_options = Options()
-    # Uncomment the line below to run in headless mode
-    # chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    
-    # Set download directory to current working directory
-    current_dir = os.getcwd()
-    prefs = {
-        "download.default_directory": current_dir,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True
-    }
-    chrome_options.add_experimental_option("prefs", prefs)
-    
-    service = Service(ChromeDriverManager().install())
-    return webdriver.Chrome(service=service, options=chrome_options)
+    """Borrow a Chrome driver from the shared pool, downloading to the current directory"""
+    # Set headless=True to run without a visible browser
+    return acquire_driver(download_dir=os.getcwd(), headless=False)
 
-def wait_for_download_and_rename(download_dir, target_filename, timeout=30):
-    """Wait for CSV download to complete and rename it"""
+def wait_for_download_and_rename(watcher, target_filename, timeout=30):
+    """Wait for the CSV download seen by watcher to complete and rename it"""
     print(f"Waiting for download to complete and renaming to '{target_filename}'...")
     
-    # Get initial CSV files
-    initial_csv_files = set(glob.glob(os.path.join(download_dir, "*.csv")))
+    downloaded_file = watcher.wait_for_download(deadline.cap(timeout))
+    if downloaded_file is None:
+        print("Timeout waiting for download to complete")
+        return False
     
-    # Wait for new CSV file to appear
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        current_csv_files = set(glob.glob(os.path.join(download_dir, "*.csv")))
-        new_files = current_csv_files - initial_csv_files
-        
-        if new_files:
-            # Get the newest CSV file
-            newest_file = max(new_files, key=os.path.getctime)
-            
-            # Wait a bit more to ensure download is complete
-            time.sleep(2)
-            
-            # Rename the file
-            target_path = os.path.join(download_dir, target_filename)
-            
-            # Remove target file if it already exists
-            if os.path.exists(target_path):
-                os.remove(target_path)
-                print(f"Removed existing file: {target_filename}")
-            
-            os.rename(newest_file, target_path)
-            print(f"File renamed to: {target_filename}")
-            return True
-        
-        time.sleep(1)
+    # Rename the file
+    target_path = os.path.join(watcher.directory, target_filename)
+    
+    # Replace the target file if it already exists
+    if os.path.exists(target_path):
+        print(f"Replacing existing file: {target_filename}")
     
-    print("Timeout waiting for download to complete")
-    return False
+    os.replace(downloaded_file, target_path)
+    print(f"File renamed to: {target_filename}")
+    return True
 
-def scrape_louisiana_candidates():
+def scrape_louisiana_candidates(capture_export=CAPTURE_EXPORTS):
     """Main function to scrape candidate data from Louisiana voter portal"""
     driver = setup_chrome_driver()
     wait = WebDriverWait(driver, 10)
@@ -78,7 +44,7 @@ def scrape_louisiana_candidates():
         driver.get("https://voterportal.sos.la.gov/candidateinquiry")
         
         # Wait for page to load
-        time.sleep(3)
+        wait_for_dom_ready(driver, "louisiana")
         
         print("Step 1: Clicking 'Select All' button...")
         # Find and click the "Select All" button
@@ -88,8 +54,8 @@ def scrape_louisiana_candidates():
         select_all_button.click()
         print(" Select All clicked successfully")
         
-        # Wait a moment for selection to process
-        time.sleep(2)
+        # Wait for selection to process
+        wait_for_network_idle(driver, "louisiana")
         
         print("Step 2: Clicking 'View Candidates for Selected Race(s)' button...")
         # Find and click the "View Candidates" button - try multiple selectors
@@ -114,19 +80,33 @@ def scrape_louisiana_candidates():
         print(" View Candidates clicked successfully")
         
         # Wait for the candidate data to load
-        time.sleep(5)
+        wait_for_network_idle(driver, "louisiana")
         
         print("Step 3: Clicking 'Export to CSV' button...")
         # Find and click the "Export to CSV" button
         export_csv_button = wait.until(
             EC.element_to_be_clickable((By.ID, "exportCSV"))
         )
-        export_csv_button.click()
-        print(" Export to CSV clicked successfully")
-        
-        # Wait for download to complete and rename the file
         current_dir = os.getcwd()
-        success = wait_for_download_and_rename(current_dir, "all_data_louisiana.csv")
+        
+        # The watcher starts before the one click on export, so an export that isn't
+        # captured is picked up as the download of that same click
+        with DownloadWatcher(current_dir, extensions=(".csv",)) as watcher:
+            if capture_export:
+                # Read the export straight from the browser when capture is enabled
+                payload = capture_click(driver, export_csv_button, timeout=deadline.cap(30), keep_downloads=True)
+                if payload is not None:
+                    with open(os.path.join(current_dir, "all_data_louisiana.csv"), "wb") as f:
+                        f.write(payload)
+                    print(" Export captured in memory and saved as 'all_data_louisiana.csv'")
+                    return
+                print(" Export was not captured, waiting for it to download instead")
+            else:
+                export_csv_button.click()
+                print(" Export to CSV clicked successfully")
+            
+            # Wait for download to complete and rename the file
+            success = wait_for_download_and_rename(watcher, "all_data_louisiana.csv")
         
         if success:
             print(" Script completed successfully! File saved as 'all_data_louisiana.csv'")
@@ -153,8 +133,8 @@ def scrape_louisiana_candidates():
         print("Screenshot saved as 'error_screenshot.png' for debugging")
         
     finally:
-        print("Closing browser...")
-        driver.quit()
+        print("Releasing browser...")
+        release_driver(driver)
 
 if __name__ == "__main__":
     # Install required packages first
@@ -0,0 +1,274 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+from selenium.common.exceptions import (
+    JavascriptException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    WebDriverException,
+)
+
+import deadline
+import instrumentation
+
+# Condition-based waits shared by the scrapers.
+#
+# Instead of sleeping a fixed number of seconds, the scrapers wait for something
+# concrete (document ready, no requests in flight, an element count that has
+# stopped changing) and every wait records how long it actually took.  The
+# summary is printed at the end of a run and written to wait_times.json so the
+# per-site timeouts below can be tuned from real numbers.
+
+# Maximum seconds a single wait may take on each site
+SITE_TIMEOUTS = {
+    "default": 10,
+    "florida": 15,
+    "georgia": 60,
+    "louisiana": 20,
+    "putman": 10,
+    "shawnee": 10,
+    "southcarolina": 15,
+    "texas": 20,
+    "virginia": 15,
+}
+
+POLL_INTERVAL = 0.1
+
+# Counts XHR/fetch requests still in flight so network-idle can be detected.
+# Installed on every new document through the DevTools protocol.
+REQUEST_TRACKER_JS = """
+(function() {
+    if (window.__pendingRequests !== undefined) { return; }
+    window.__pendingRequests = 0;
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        window.__pendingRequests++;
+        this.addEventListener('loadend', function() { window.__pendingRequests--; });
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function() {
+            window.__pendingRequests++;
+            return originalFetch.apply(this, arguments).finally(function() {
+                window.__pendingRequests--;
+            });
+        };
+    }
+})();
+"""
+
+NETWORK_STATE_JS = """
+return [
+    document.readyState,
+    window.__pendingRequests || 0,
+    (window.jQuery && window.jQuery.active) || 0,
+    performance.getEntriesByType('resource').length
+];
+"""
+
+
+class WaitStats:
+    def __init__(self):
+        """Collects the duration of every wait, grouped by site and wait name"""
+        self.lock = threading.Lock()
+        self.records = {}
+
+    def record(self, site, name, elapsed, ok, timeout):
+        with self.lock:
+            entry = self.records.setdefault((site, name), {
+                "durations": [], "timeouts": 0, "timeout_limit": timeout
+            })
+            entry["durations"].append(elapsed)
+            entry["timeout_limit"] = timeout
+            if not ok:
+                entry["timeouts"] += 1
+
+    def summary(self):
+        """Return a list of per (site, wait) statistics"""
+        rows = []
+        with self.lock:
+            for (site, name), entry in sorted(self.records.items()):
+                durations = sorted(entry["durations"])
+                count = len(durations)
+                rows.append({
+                    "site": site,
+                    "wait": name,
+                    "count": count,
+                    "total_seconds": round(sum(durations), 3),
+                    "mean_seconds": round(sum(durations) / count, 3),
+                    "p95_seconds": round(durations[min(count - 1, int(count * 0.95))], 3),
+                    "max_seconds": round(durations[-1], 3),
+                    "timeouts": entry["timeouts"],
+                    "timeout_limit": entry["timeout_limit"],
+                })
+        return rows
+
+    def reset(self):
+        with self.lock:
+            self.records = {}
+
+
+stats = WaitStats()
+
+
+def site_timeout(site, timeout=None):
+    """Return the timeout to use for a wait on the given site"""
+    if timeout is not None:
+        return timeout
+    return SITE_TIMEOUTS.get(site, SITE_TIMEOUTS["default"])
+
+
+def poll_until(site, name, check, timeout=None, poll_interval=POLL_INTERVAL):
+    """
+    Call check() until it returns something truthy or the site timeout expires
+
+    Args:
+        site (str): Site key used for the timeout and the statistics
+        name (str): Name of this wait in the statistics
+        check (callable): Condition to evaluate
+        timeout (float): Override the site timeout
+
+    Returns:
+        The last value returned by check() (falsy on timeout)
+    """
+    limit = site_timeout(site, timeout)
+    # Never wait past the scraper's (or the work unit's) deadline
+    stop_after = deadline.cap(limit)
+    start = time.time()
+    result = None
+    while True:
+        try:
+            result = check()
+        except (StaleElementReferenceException, NoSuchElementException, JavascriptException):
+            result = None
+        if result or time.time() - start >= stop_after:
+            break
+        time.sleep(poll_interval)
+    elapsed = time.time() - start
+    stats.record(site, name, elapsed, bool(result), limit)
+    instrumentation.add(site, "wait", elapsed)
+    return result
+
+
+def install_request_tracker(driver):
+    """Make every page loaded by this driver count its in-flight XHR/fetch requests"""
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": REQUEST_TRACKER_JS})
+    except WebDriverException:
+        pass
+
+
+def wait_for_dom_ready(driver, site="default", timeout=None):
+    """Wait until document.readyState is 'complete'"""
+    return poll_until(
+        site, "dom_ready",
+        lambda: driver.execute_script("return document.readyState") == "complete",
+        timeout
+    )
+
+
+def wait_for_network_idle(driver, site="default", idle_time=0.5, timeout=None):
+    """
+    Wait until the page is loaded and no requests have been made for idle_time seconds
+
+    Uses the request tracker counter, jQuery.active and the number of resource
+    timing entries, so it works for XHR driven pages as well as plain page loads.
+    """
+    state = {"last": None, "since": time.time()}
+
+    def idle():
+        ready, pending, active, resources = driver.execute_script(NETWORK_STATE_JS)
+        current = (ready, pending, active, resources)
+        if current != state["last"]:
+            state["last"] = current
+            state["since"] = time.time()
+            return False
+        return ready == "complete" and pending == 0 and active == 0 \
+            and time.time() - state["since"] >= idle_time
+
+    return poll_until(site, "network_idle", idle, timeout)
+
+
+def wait_for_stable_count(driver, locator, site="default", min_count=1, settle=0.5, timeout=None, name=None):
+    """
+    Wait until at least min_count elements match locator and the count stops changing
+
+    Returns:
+        list: The matching elements (empty list on timeout)
+    """
+    state = {"count": -1, "since": time.time(), "elements": []}
+
+    def stable():
+        elements = driver.find_elements(*locator)
+        if len(elements) != state["count"]:
+            state["count"] = len(elements)
+            state["since"] = time.time()
+            state["elements"] = elements
+            return False
+        state["elements"] = elements
+        return len(elements) >= min_count and time.time() - state["since"] >= settle
+
+    if poll_until(site, name or "stable_count", stable, timeout):
+        return state["elements"]
+    return []
+
+
+def wait_for_element(driver, locator, site="default", timeout=None, name=None):
+    """Wait until an element matching locator is present and return it (None on timeout)"""
+    def present():
+        elements = driver.find_elements(*locator)
+        return elements[0] if elements else None
+
+    return poll_until(site, name or "element", present, timeout)
+
+
+def wait_for_staleness(driver, element, site="default", timeout=None, name=None):
+    """Wait until element has been removed from the DOM (e.g. after a page change)"""
+    def stale():
+        try:
+            element.is_enabled()
+            return False
+        except StaleElementReferenceException:
+            return True
+
+    return poll_until(site, name or "staleness", stale, timeout)
+
+
+def wait_for_page_change(driver, old_root, site="default", timeout=None):
+    """Wait for a navigation that replaces old_root (the previous <html> element) to finish"""
+    wait_for_staleness(driver, old_root, site, timeout, name="page_change")
+    return wait_for_dom_ready(driver, site, timeout)
+
+
+def print_summary():
+    """Print where the waiting time went"""
+    rows = stats.summary()
+    if not rows:
+        return
+    print("\n=== Wait Time Summary ===")
+    print(f"{'Site':<15} {'Wait':<18} {'Count':>6} {'Total':>9} {'Mean':>7} {'p95':>7} {'Max':>7} {'T/O':>5} {'Limit':>6}")
+    for row in rows:
+        print(f"{row['site']:<15} {row['wait']:<18} {row['count']:>6} {row['total_seconds']:>8.1f}s "
+              f"{row['mean_seconds']:>6.2f}s {row['p95_seconds']:>6.2f}s {row['max_seconds']:>6.2f}s "
+              f"{row['timeouts']:>5} {row['timeout_limit']:>5}s")
+
+
+def write_report(path="wait_times.json"):
+    """Write the wait statistics to a JSON file"""
+    rows = stats.summary()
+    if not rows:
+        return None
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "waits": rows}, f, indent=2)
+    return path
+
+
+@atexit.register
+def _report_at_exit():
+    if stats.records:
+        print_summary()
+        write_report(os.path.join(os.getcwd(), "wait_times.json"))
@@ -0,0 +1,459 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request as urlrequest
+from urllib.error import HTTPError, URLError
+
+# Work queue for splitting one scraping job across several machines.
+#
+# A job is a set of independent units (Georgia detail URLs, South Carolina
+# dates, Texas elections, Florida election/office pairs), each with a key and
+# a JSON payload.  Every node adds the full set (adding is idempotent) and then
+# leases units one at a time, so each node drives its own browser through a
+# different part of the job:
+#
+#     queue = work_queue.from_env()        # None when SCRAPER_WORK_QUEUE isn't set
+#     queue.put_many(job, [(url, {"url": url}) for url in urls])
+#     work_queue.drain(queue, job, scrape_one)
+#     results = queue.results(job)         # every node's results, by key
+#
+# A lease expires after lease_seconds unless it is extended (drain() does that
+# in the background), so the units of a crashed node are picked up by the
+# others.  A failed unit is retried with backoff up to max_attempts times.
+# Results are written once: when two nodes finish the same unit (after an
+# expired lease) the first result is kept.
+#
+# Backends:
+#   SqliteQueue   a SQLite file, shared by processes on one host
+#   HttpQueue     the same interface over HTTP, served by
+#                 python work_queue.py serve --db queue.sqlite --port 8780
+#
+# SCRAPER_WORK_QUEUE selects the queue: a path (or sqlite:///path) or an
+# http:// URL.  SCRAPER_WORK_JOB names the job (default: today's date), so
+# every node of one run must use the same value; SCRAPER_WORK_QUEUE_TOKEN is a
+# shared secret the server checks.
+
+QUEUE_ENV = "SCRAPER_WORK_QUEUE"
+JOB_ENV = "SCRAPER_WORK_JOB"
+TOKEN_ENV = "SCRAPER_WORK_QUEUE_TOKEN"
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 30      # seconds before the first retry, doubled for each further one
+POLL_INTERVAL = 5       # seconds between lease attempts while other nodes hold the last units
+DEFAULT_PORT = 8780
+
+
+class Task:
+    def __init__(self, job, key, payload, attempts, lease_token, worker=None):
+        """A leased unit of work (pass it back to complete(), fail() or extend())"""
+        self.job = job
+        self.key = key
+        self.payload = payload
+        self.attempts = attempts
+        self.lease_token = lease_token
+        self.worker = worker
+
+    def to_dict(self):
+        return {"job": self.job, "key": self.key, "payload": self.payload, "attempts": self.attempts,
+                "lease_token": self.lease_token, "worker": self.worker}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["job"], data["key"], data["payload"], data["attempts"], data["lease_token"],
+                   data.get("worker"))
+
+
+class SqliteQueue:
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Work queue in a SQLite file
+
+        Args:
+            path (str): Database file (created if missing)
+            max_attempts (int): Leases a unit gets before it is marked failed
+        """
+        self.path = os.path.abspath(path)
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                job TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL DEFAULT 0,
+                lease_token TEXT,
+                lease_owner TEXT,
+                lease_expires REAL,
+                result TEXT,
+                completed_by TEXT,
+                last_error TEXT,
+                updated_at REAL,
+                PRIMARY KEY (job, key)
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (job, state, available_at)")
+
+    def _transaction(self, work):
+        """Run work(cursor) in a write transaction (BEGIN IMMEDIATE locks out other processes)"""
+        with self.lock:
+            cursor = self.db.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                value = work(cursor)
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+            return value
+
+    def put_many(self, job, items):
+        """
+        Add units to a job; units whose key is already there are left alone
+
+        Args:
+            job (str): Job name
+            items (list): (key, payload) pairs, payloads must be JSON serialisable
+
+        Returns:
+            int: Number of units that were new
+        """
+        now = time.time()
+        rows = [(job, str(key), json.dumps(payload), now) for key, payload in items]
+
+        def insert(cursor):
+            before = self.db.total_changes
+            cursor.executemany("INSERT OR IGNORE INTO tasks (job, key, payload, updated_at) VALUES (?, ?, ?, ?)", rows)
+            return self.db.total_changes - before
+        return self._transaction(insert)
+
+    def put(self, job, key, payload):
+        return self.put_many(job, [(key, payload)])
+
+    def lease(self, job, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Take the next available unit of a job
+
+        Returns:
+            Task: The leased unit, or None when nothing is available right now
+        """
+        def take(cursor):
+            now = time.time()
+            # Units whose lease ran out have used up an attempt
+            cursor.execute("""UPDATE tasks SET state = 'failed', last_error = 'lease expired', updated_at = ?
+                              WHERE job = ? AND state = 'leased' AND lease_expires < ? AND attempts >= ?""",
+                           (now, job, now, self.max_attempts))
+            row = cursor.execute("""SELECT key, payload, attempts FROM tasks
+                                    WHERE job = ? AND ((state = 'pending' AND available_at <= ?)
+                                                       OR (state = 'leased' AND lease_expires < ?))
+                                    ORDER BY rowid LIMIT 1""", (job, now, now)).fetchone()
+            if row is None:
+                return None
+            key, payload, attempts = row
+            token = uuid.uuid4().hex
+            cursor.execute("""UPDATE tasks SET state = 'leased', attempts = attempts + 1, lease_token = ?,
+                              lease_owner = ?, lease_expires = ?, updated_at = ? WHERE job = ? AND key = ?""",
+                           (token, worker, now + lease_seconds, now, job, key))
+            return Task(job, key, json.loads(payload), attempts + 1, token, worker)
+        return self._transaction(take)
+
+    def extend(self, task, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Keep holding a unit; returns False if the lease was lost (expired and taken over)"""
+        def renew(cursor):
+            now = time.time()
+            cursor.execute("""UPDATE tasks SET lease_expires = ?, updated_at = ?
+                              WHERE job = ? AND key = ? AND state = 'leased' AND lease_token = ?""",
+                           (now + lease_seconds, now, task.job, task.key, task.lease_token))
+            return cursor.rowcount == 1
+        return self._transaction(renew)
+
+    def complete(self, task, result):
+        """
+        Store the result of a unit
+
+        Idempotent: a unit that is already done keeps its first result.
+
+        Returns:
+            bool: True if this call stored the result
+        """
+        def finish(cursor):
+            now = time.time()
+            cursor.execute("""UPDATE tasks SET state = 'done', result = ?, completed_by = ?, lease_token = NULL,
+                              lease_expires = NULL, updated_at = ? WHERE job = ? AND key = ? AND state != 'done'""",
+                           (json.dumps(result), task.worker, now, task.job, task.key))
+            return cursor.rowcount == 1
+        return self._transaction(finish)
+
+    def fail(self, task, error):
+        """Give a unit back after an error; it is retried later unless it used up its attempts"""
+        def release(cursor):
+            now = time.time()
+            retry = task.attempts < self.max_attempts
+            cursor.execute("""UPDATE tasks SET state = ?, available_at = ?, last_error = ?, lease_token = NULL,
+                              lease_expires = NULL, updated_at = ?
+                              WHERE job = ? AND key = ? AND state = 'leased' AND lease_token = ?""",
+                           ("pending" if retry else "failed", now + RETRY_BACKOFF * 2 ** (task.attempts - 1),
+                            str(error)[:1000], now, task.job, task.key, task.lease_token))
+            return retry
+        return self._transaction(release)
+
+    def results(self, job):
+        """Return {key: result} of every finished unit of a job"""
+        with self.lock:
+            rows = self.db.execute("SELECT key, result FROM tasks WHERE job = ? AND state = 'done' ORDER BY rowid",
+                                   (job,)).fetchall()
+        return {key: json.loads(result) for key, result in rows}
+
+    def stats(self, job):
+        """Return the number of units per state ({"pending": 3, "leased": 1, ...})"""
+        with self.lock:
+            rows = self.db.execute("SELECT state, COUNT(*) FROM tasks WHERE job = ? GROUP BY state", (job,)).fetchall()
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class HttpQueue:
+    def __init__(self, url, token=None, timeout=30):
+        """
+        Client for a queue served by QueueServer (same methods as SqliteQueue)
+
+        Args:
+            url (str): Base URL of the server, e.g. http://10.0.0.5:8780
+            token (str): Shared secret (default: SCRAPER_WORK_QUEUE_TOKEN)
+        """
+        self.url = url.rstrip("/")
+        self.token = token if token is not None else os.environ.get(TOKEN_ENV)
+        self.timeout = timeout
+
+    def _call(self, method, **arguments):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        req = urlrequest.Request(f"{self.url}/{method}", data=json.dumps(arguments).encode("utf-8"),
+                                 headers=headers, method="POST")
+        try:
+            with urlrequest.urlopen(req, timeout=self.timeout) as response:
+                return json.loads(response.read())["value"]
+        except HTTPError as e:
+            raise RuntimeError(f"Work queue {method} failed: {e.code} {e.read().decode('utf-8', 'replace')}") from e
+
+    def put_many(self, job, items):
+        return self._call("put_many", job=job, items=[[str(key), payload] for key, payload in items])
+
+    def put(self, job, key, payload):
+        return self.put_many(job, [(key, payload)])
+
+    def lease(self, job, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        task = self._call("lease", job=job, worker=worker, lease_seconds=lease_seconds)
+        return Task.from_dict(task) if task else None
+
+    def extend(self, task, lease_seconds=DEFAULT_LEASE_SECONDS):
+        return self._call("extend", task=task.to_dict(), lease_seconds=lease_seconds)
+
+    def complete(self, task, result):
+        return self._call("complete", task=task.to_dict(), result=result)
+
+    def fail(self, task, error):
+        return self._call("fail", task=task.to_dict(), error=str(error))
+
+    def results(self, job):
+        return self._call("results", job=job)
+
+    def stats(self, job):
+        return self._call("stats", job=job)
+
+    def close(self):
+        pass
+
+
+class QueueHandler(BaseHTTPRequestHandler):
+    """JSON-over-HTTP front end of a SqliteQueue: POST /<method> with the arguments as a JSON object"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, value):
+        body = json.dumps(value).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        queue = self.server.queue
+        token = self.server.token
+        if token and self.headers.get("Authorization") != f"Bearer {token}":
+            self._reply(401, {"error": "bad token"})
+            return
+        try:
+            arguments = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            method = self.path.strip("/")
+            if method in ("extend", "complete", "fail"):
+                arguments["task"] = Task.from_dict(arguments["task"])
+            if method == "lease":
+                task = queue.lease(**arguments)
+                value = task.to_dict() if task else None
+            elif method in ("put_many", "extend", "complete", "fail", "results", "stats"):
+                value = getattr(queue, method)(**arguments)
+            else:
+                self._reply(404, {"error": f"unknown method {method}"})
+                return
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": str(e)})
+            return
+        self._reply(200, {"value": value})
+
+
+class QueueServer:
+    def __init__(self, queue, host="127.0.0.1", port=DEFAULT_PORT, token=None):
+        """Serve a SqliteQueue to other machines (port 0 picks a free port)"""
+        self.server = ThreadingHTTPServer((host, port), QueueHandler)
+        self.server.daemon_threads = True
+        self.server.queue = queue
+        self.server.token = token if token is not None else os.environ.get(TOKEN_ENV)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread (tests, or a node that also hosts the queue)"""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def open_queue(spec):
+    """Return the queue described by spec: an http(s):// URL, sqlite:///path or a plain path"""
+    if spec.startswith(("http://", "https://")):
+        return HttpQueue(spec)
+    if spec.startswith("sqlite:///"):
+        spec = spec[len("sqlite:///"):]
+    return SqliteQueue(spec)
+
+
+def from_env():
+    """The queue named by SCRAPER_WORK_QUEUE, or None for a normal single-node run"""
+    spec = os.environ.get(QUEUE_ENV)
+    return open_queue(spec) if spec else None
+
+
+def job_name(name):
+    """Job name shared by every node of a run (name plus SCRAPER_WORK_JOB or today's date)"""
+    return f"{name}:{os.environ.get(JOB_ENV) or time.strftime('%Y-%m-%d')}"
+
+
+def worker_id():
+    """Identifies this node and process in the queue"""
+    return f"{os.uname().nodename if hasattr(os, 'uname') else os.environ.get('COMPUTERNAME', 'node')}:{os.getpid()}"
+
+
+def drain(queue, job, handle, lease_seconds=DEFAULT_LEASE_SECONDS, stop=None, worker=None):
+    """
+    Work through a job until no unit is left for this node
+
+    Units leased by other nodes are waited for (their lease may expire), so
+    drain() returns once every unit is done or failed, or when stop() is true.
+
+    Args:
+        queue: SqliteQueue or HttpQueue
+        job (str): Job name
+        handle (callable): handle(payload) -> JSON serialisable result; an
+                           exception fails the unit (it is retried)
+        lease_seconds (float): Lease length; renewed while handle() runs
+        stop (callable): Checked between units, e.g. deadline.expired
+
+    Returns:
+        dict: Units this node completed and failed ({"done": n, "failed": n})
+    """
+    worker = worker or worker_id()
+    counts = {"done": 0, "failed": 0}
+    while not (stop and stop()):
+        task = queue.lease(job, worker, lease_seconds)
+        if task is None:
+            stats = queue.stats(job)
+            if not stats["pending"] and not stats["leased"]:
+                break
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        # Renew the lease in the background while the unit is being worked on
+        finished = threading.Event()
+
+        def heartbeat():
+            while not finished.wait(lease_seconds / 3):
+                try:
+                    if not queue.extend(task, lease_seconds):
+                        return
+                except (OSError, RuntimeError, URLError, sqlite3.Error):
+                    continue
+
+        renewer = threading.Thread(target=heartbeat, daemon=True)
+        renewer.start()
+        try:
+            result = handle(task.payload)
+        except Exception as e:
+            print(f"{task.key} failed (attempt {task.attempts}): {e}")
+            queue.fail(task, e)
+            counts["failed"] += 1
+            continue
+        finally:
+            finished.set()
+            renewer.join()
+        queue.complete(task, result)
+        counts["done"] += 1
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve or inspect a scraper work queue")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    serve = subcommands.add_parser("serve", help="Serve a SQLite queue over HTTP to other nodes")
+    serve.add_argument("--db", default="work_queue.sqlite", help="SQLite file")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    status = subcommands.add_parser("status", help="Print the state of a job")
+    status.add_argument("job", help="Job name (e.g. georgia-details:2025-06-01)")
+    status.add_argument("--queue", default=os.environ.get(QUEUE_ENV, "work_queue.sqlite"),
+                        help="Queue path or URL (default: SCRAPER_WORK_QUEUE)")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = QueueServer(SqliteQueue(args.db), args.host, args.port)
+        print(f"Serving {args.db} on {server.url}")
+        try:
+            server.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    counts = open_queue(args.queue).stats(args.job)
+    print(" ".join(f"{state}: {count}" for state, count in counts.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())